@@ -0,0 +1,77 @@
+"""BotBase.progress_command のコマンド探索のマイクロベンチマーク
+
+コマンドの数を変えながら、以前の探索(コマンド毎に Context を作成し、re.search / str.find を行う)と
+CommandIndex を使う現在の探索の、メンション一件あたりの時間を比較します。
+
+    python benchmarks/command_benchmark.py [mentions]
+"""
+
+import asyncio
+import re
+import sys
+import time
+
+from mi.ext import commands
+
+
+class Message:
+    def __init__(self, content):
+        self.content = content
+
+
+async def noop(ctx, *args):
+    pass
+
+
+def make_bot(count):
+    bot = commands.Bot()
+    for i in range(count):
+        bot.add_command(commands.mention_command(text=f'text{i}')(noop), None)
+        bot.add_command(commands.mention_command(regex=rf'regex{i} (\d+)')(noop), None)
+    return bot
+
+
+async def legacy_match(bot, message):
+    """変更前の progress_command と同じ探索を行い、一致したコマンドの数を返します"""
+    hits = 0
+    for cmd in bot.all_commands:
+        ctx = await bot.get_context(message, cmd)
+        if cmd.cmd_type == 'regex':
+            if re.search(cmd.key, message.content):
+                ctx.args = re.findall(cmd.key, message.content)
+                hits += 1
+        elif message.content.find(cmd.key) != -1:
+            hits += 1
+    return hits
+
+
+async def indexed_match(bot, message):
+    hits = 0
+    for cmd, _ in bot._get_command_index().match(message.content):
+        await bot.get_context(message, cmd)
+        hits += 1
+    return hits
+
+
+async def measure(func, bot, messages):
+    start = time.perf_counter()
+    hits = 0
+    for message in messages:
+        hits += await func(bot, message)
+    return (time.perf_counter() - start) / len(messages), hits
+
+
+async def main(count):
+    texts = ['@bot hello there, how are you doing today?', '@bot please run text7 now', '@bot regex3 42']
+    messages = [Message(texts[i % len(texts)]) for i in range(count)]
+    print(f'{"commands":>8} {"legacy":>12} {"indexed":>12} {"speedup":>8}')
+    for command_count in (10, 50, 100, 500, 1000):
+        bot = make_bot(command_count // 2)
+        legacy, legacy_hits = await measure(legacy_match, bot, messages)
+        indexed, indexed_hits = await measure(indexed_match, bot, messages)
+        assert legacy_hits == indexed_hits, (legacy_hits, indexed_hits)
+        print(f'{command_count:>8} {legacy * 1e6:>10.1f}us {indexed * 1e6:>10.1f}us {legacy / indexed:>7.1f}x')
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 3000))
@@ -0,0 +1,66 @@
+"""Client.dispatch のマイクロベンチマーク
+
+以前のディスパッチ(イベント毎に importlib / dir() を使う)と、
+事前に作成したディスパッチテーブルを使う現在の実装の毎秒イベント数を比較します。
+
+    python benchmarks/dispatch_benchmark.py [events]
+"""
+
+import asyncio
+import importlib
+import inspect
+import sys
+import time
+
+from mi.ext import commands
+
+
+class Cog(commands.Cog):
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        pass
+
+
+class BenchBot(commands.Bot):
+    async def on_message(self, message):
+        pass
+
+
+def legacy_dispatch(bot, event_name, *args, **kwargs):
+    """変更前の BotBase.dispatch と同じ探索を行い、イベントをレーンに積みます"""
+    ev = f"on_{event_name}"
+    lane = bot._lanes.get_lane(event_name)
+    for event in bot.extra_events.get(ev, []):
+        if inspect.ismethod(event):
+            coro = event
+            event = event.__name__
+        else:
+            foo = importlib.import_module(event.__module__)
+            coro = getattr(foo, ev)
+        lane.put(coro, event, args, kwargs)
+    if ev in dir(bot):
+        lane.put(getattr(bot, ev), ev, args, kwargs)
+
+
+async def run(dispatch, bot, events: int) -> float:
+    lane = bot._lanes.get_lane('message')
+    started_at = time.perf_counter()
+    for i in range(events):
+        dispatch('message', i)
+        if i % 1000 == 0:
+            await lane._queue.join()
+    await lane._queue.join()
+    return events / (time.perf_counter() - started_at)
+
+
+async def main(events: int) -> None:
+    bot = BenchBot(lanes={'timeline': 8})
+    bot.add_cog(Cog())
+    legacy = await run(lambda *args: legacy_dispatch(bot, *args), bot, events)
+    current = await run(bot.dispatch, bot, events)
+    print(f'legacy  : {legacy:12.0f} events/s')
+    print(f'current : {current:12.0f} events/s ({current / legacy:.2f}x)')
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000))
@@ -0,0 +1,47 @@
+"""FakeMisskey を使ったエンドツーエンドのベンチマーク
+
+ローカルで起動したMisskeyの代わりにBotを接続し、タイムラインのノートとメンションを送り続け、
+メンションへの返信が届くまでの時間と一秒あたりの応答数を計測します。
+
+    python benchmarks/e2e_benchmark.py [seconds] [note_rate] [mention_rate]
+"""
+
+import asyncio
+import sys
+
+from mi.framework.router import Router
+from mi.ext import commands
+from mi.framework.http import HTTPSession
+from mi.testing import FakeMisskey, LoadGenerator
+
+
+class BenchBot(commands.Bot):
+    async def on_ready(self, ws):
+        await Router(ws).connect_channel(['main', 'global'])
+
+    async def on_message(self, note):
+        pass
+
+    async def on_mention(self, note):
+        await note.reply('pong')
+
+
+async def main(duration: float, note_rate: float, mention_rate: float) -> None:
+    async with FakeMisskey() as server:
+        bot = BenchBot(cmd_prefix='/')
+        task = asyncio.create_task(bot.start(server.url, server.token))
+        try:
+            report = await LoadGenerator(server, note_rate=note_rate, mention_rate=mention_rate).run(duration)
+        finally:
+            task.cancel()
+            await HTTPSession.close_session()
+    result = report.to_dict()
+    print(f"sent: {result['sent']}, responses: {result['responses']}, throughput: {result['throughput']:.1f}/s")
+    print(f"latency p50: {result['p50'] * 1000:.1f}ms, p95: {result['p95'] * 1000:.1f}ms, "
+          f"p99: {result['p99'] * 1000:.1f}ms, max: {result['max'] * 1000:.1f}ms")
+    print(f'lanes: {bot.lane_stats()}')
+
+
+if __name__ == '__main__':
+    args = [float(i) for i in sys.argv[1:4]]
+    asyncio.run(main(*(args + [10, 200, 20][len(args):])))
@@ -1,3 +1,4 @@
 from .chat import *
 from .ext import *
 from .note import *
+from .transport import *
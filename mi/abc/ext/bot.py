@@ -67,7 +67,7 @@ class AbstractBotBase:
             event_name: str,
             *args: tuple[Any],
             **kwargs: Dict[Any, Any],
-    ) -> asyncio.Task[Any]:
+    ) -> asyncio.Future[Any]:
         pass
 
     @abstractmethod
@@ -0,0 +1,80 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple
+
+__all__ = ('AbstractTransport', 'AbstractSocket')
+
+
+class AbstractSocket(ABC):
+    """
+    MisskeyWebSocketとRouterが使うWebSocketの操作
+
+    Attributes
+    ----------
+    channels : Dict[str, str]
+        Routerで接続したチャンネルのIDとチャンネル名
+    """
+
+    channels: Dict[str, str]
+
+    @abstractmethod
+    async def receive(self, timeout: Optional[float] = None) -> Any:
+        """
+        メッセージを一つ受信します
+
+        Returns
+        -------
+        aiohttp.WSMessage
+            切断された場合は ``aiohttp.http.WS_CLOSED_MESSAGE``
+        """
+
+    @abstractmethod
+    async def send_json(self, data: Any, **kwargs: Any) -> None:
+        pass
+
+    @abstractmethod
+    async def close(self, **kwargs: Any) -> bool:
+        pass
+
+
+class AbstractTransport(ABC):
+    """
+    HTTPClientがHTTPリクエストとWebSocketの接続に使う通信部分
+    """
+
+    @abstractmethod
+    async def start(self) -> None:
+        """通信を開始する前の準備を行います"""
+
+    @abstractmethod
+    async def request(self, method: str, url: str, *, headers: Dict[str, str], **kwargs: Any) -> Tuple[int, Any]:
+        """
+        HTTPリクエストを送信します
+
+        Parameters
+        ----------
+        method : str
+        url : str
+        headers : Dict[str, str]
+        **kwargs : Any
+            ``json`` または ``data``
+
+        Returns
+        -------
+        Tuple[int, Any]
+            ステータスコードと、JSONの場合は解析したレスポンス
+        """
+
+    @abstractmethod
+    async def ws_connect(self, url: str, *, headers: Dict[str, str], compress: int = 0) -> AbstractSocket:
+        """
+        WebSocketに接続します
+
+        Raises
+        ------
+        ClientConnectorError
+            接続できなかった場合
+        """
+
+    @abstractmethod
+    async def close(self) -> None:
+        pass
@@ -1,12 +1,19 @@
-from typing import Optional
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
 
 from mi.framework.http import HTTPSession
+from mi.framework.iterators import InstanceIterator
 from mi.framework.router import Route
 from mi.wrapper.ad import AdminAdvertisingManager
 from mi.wrapper.emoji import AdminEmojiManager
 from mi.wrapper.moderator import AdminModeratorManager
 from mi.wrapper.user import AdminUserManager
 
+if TYPE_CHECKING:
+    from mi.framework.models.user import User
+    from mi.framework.pagination import OffsetPaginator
+
 
 class AdminActions:
     def __init__(self):
@@ -22,3 +29,19 @@ class AdminActions:
     @staticmethod
     async def get_invite() -> bool:
         return bool(await HTTPSession.request(Route('POST', '/api/admin/invite')))
+
+    @staticmethod
+    def get_users(limit: int = 10, *, offset: int = 0, sort: Optional[str] = None, state: str = 'all',
+                  origin: str = 'local', username: Optional[str] = None, hostname: Optional[str] = None,
+                  get_all: bool = False, concurrency: int = 1, ordered: bool = True) -> OffsetPaginator[User]:
+        """
+        インスタンスのユーザーを取得します。引数は ``InstanceIterator.get_users`` と同じです
+
+        Returns
+        -------
+        OffsetPaginator[User]
+        """
+
+        return InstanceIterator.get_users(limit, offset=offset, sort=sort, state=state, origin=origin,
+                                          username=username, hostname=hostname, get_all=get_all,
+                                          concurrency=concurrency, ordered=ordered)
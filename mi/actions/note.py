@@ -5,6 +5,7 @@ from typing import List, Optional
 from mi.exception import ContentRequired
 from mi.framework.http import HTTPSession
 from mi.framework.models.note import Note, NoteReaction, Poll
+from mi.framework.pagination import CursorPaginator
 from mi.framework.router import Route
 from mi.utils import check_multi_arg, remove_dict_empty
 from mi.wrapper.favorite import FavoriteManager
@@ -270,6 +271,36 @@ class NoteActions:
                                         auth=True, lower=True)
         return [Note(RawNote(i)) for i in res]
 
+    def iter_replies(
+            self,
+            note_id: Optional[str] = None,
+            *,
+            limit: Optional[int] = None,
+            direction: str = 'older',
+            since_id: Optional[str] = None,
+            until_id: Optional[str] = None
+    ) -> CursorPaginator[Note]:
+        """
+        ノートに対する返信を、次のページを先読みしながら一件ずつ取得します
+
+        Parameters
+        ----------
+        note_id : Optional[str], default=None
+            返信を取得したいノートのID
+        limit : Optional[int], default=None
+            取得する上限。Noneの場合は全て取得します
+        direction : str, default='older'
+        since_id : Optional[str], default=None
+        until_id : Optional[str], default=None
+
+        Returns
+        -------
+        CursorPaginator[Note]
+        """
+
+        return CursorPaginator('/api/notes/replies', {'noteId': note_id or self.__note_id}, lambda i: Note(RawNote(i)),
+                               limit=limit, direction=direction, since_id=since_id, until_id=until_id)
+
     async def get_reaction(self, reaction: str, note_id: Optional[str] = None) -> List[NoteReaction]:
         note_id = note_id or self.__note_id
         return await ReactionManager(note_id=note_id).get_reaction(reaction)
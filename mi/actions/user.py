@@ -1,11 +1,15 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, List, Optional
+from datetime import datetime
+from typing import TYPE_CHECKING, List, Optional, Union
 
 from aiocache import Cache, cached
 from mi.exception import NotExistRequiredData, NotExistRequiredParameters
+from mi.framework.export import ExportStats, NoteExporter
 from mi.framework.http import HTTPSession
+from mi.framework.loader import UserLoaderSession
 from mi.framework.models.note import Note
+from mi.framework.pagination import CursorPaginator
 from mi.framework.router import Route
 from mi.utils import check_multi_arg, get_cache_key, key_builder, remove_dict_empty
 from mi.wrapper.chat import ChatManager
@@ -58,10 +62,31 @@ class UserActions:
             ユーザー情報
         """
 
+        if user_id is not None and username is None:
+            # 同じタイミングで要求された他のユーザーと一度のリクエストにまとめる
+            return await UserLoaderSession.load(user_id)
         field = remove_dict_empty({"userId": user_id, "username": username, "host": host})
         data = await HTTPSession.request(Route('POST', '/api/users/show'), json=field, auth=True, lower=True)
         return User(RawUser(data))
 
+    async def get_many(self, user_ids: List[str]) -> List[User]:
+        """
+        複数のユーザーのプロフィールを取得します。
+        ``userIds`` を指定したリクエストにまとめ、数秒以内に取得したユーザーはサーバーにアクセスせずに返します
+
+        Parameters
+        ----------
+        user_ids : List[str]
+            取得したいユーザーのID
+
+        Returns
+        -------
+        List[User]
+            user_idsの順のユーザー。存在しないユーザーは含まれません
+        """
+
+        return await UserLoaderSession.load_many(user_ids)
+
     @get_cache_key
     async def fetch(self, user_id: Optional[str] = None, username: Optional[str] = None,
                     host: Optional[str] = None, **kwargs) -> User:
@@ -89,7 +114,9 @@ class UserActions:
         data = await HTTPSession.request(Route('POST', '/api/users/show'), json=field, auth=True, lower=True)
         old_cache = Cache(namespace='get_user')
         await old_cache.delete(kwargs['cache_key'].format('get_user'))
-        return User(RawUser(data))
+        user = User(RawUser(data))
+        UserLoaderSession.prime(user)
+        return user
 
     async def get_notes(
             self,
@@ -122,6 +149,101 @@ class UserActions:
         res = await HTTPSession.request(Route('POST', '/api/users/notes'), json=data, auth=True, lower=True)
         return [Note(RawNote(i)) for i in res]
 
+    def iter_notes(
+            self,
+            user_id: Optional[str] = None,
+            *,
+            limit: Optional[int] = None,
+            direction: str = 'older',
+            since_id: Optional[str] = None,
+            until_id: Optional[str] = None,
+            since_date: Optional[Union[datetime, int]] = None,
+            until_date: Optional[Union[datetime, int]] = None,
+            include_replies: bool = True,
+            include_my_renotes: bool = True,
+            with_files: bool = False,
+            file_type: Optional[List[str]] = None,
+            exclude_nsfw: bool = True
+    ) -> CursorPaginator[Note]:
+        """
+        ユーザーのノートを、次のページを先読みしながら一件ずつ取得します
+
+        Parameters
+        ----------
+        user_id : Optional[str], default=None
+            ユーザーのID
+        limit : Optional[int], default=None
+            取得する上限。Noneの場合は全て取得します
+        direction : str, default='older'
+            ``older`` は新しいノートから、 ``newer`` は古いノートから取得します
+        since_id : Optional[str], default=None
+        until_id : Optional[str], default=None
+        since_date : Optional[Union[datetime, int]], default=None
+            この時刻より後のノートだけを取得します
+        until_date : Optional[Union[datetime, int]], default=None
+            この時刻より前のノートだけを取得します
+
+        Returns
+        -------
+        CursorPaginator[Note]
+            ``async for`` で一件ずつ、 ``await`` でlistとして取得できます
+        """
+
+        params = {
+            'userId': user_id or self.__user.id,
+            'includeReplies': include_replies,
+            'includeMyRenotes': include_my_renotes,
+            'withFiles': with_files,
+            'fileType': file_type,
+            'excludeNsfw': exclude_nsfw
+        }
+        return CursorPaginator('/api/users/notes', params, lambda i: Note(RawNote(i)), limit=limit,
+                               direction=direction, since_id=since_id, until_id=until_id, since_date=since_date,
+                               until_date=until_date)
+
+    async def export_notes(
+            self,
+            path: str,
+            user_id: Optional[str] = None,
+            *,
+            since_date: Optional[Union[datetime, int]] = None,
+            until_date: Optional[Union[datetime, int]] = None,
+            windows: int = 1,
+            compress: Optional[bool] = None,
+            checkpoint_path: Optional[str] = None,
+            include_replies: bool = True,
+            include_my_renotes: bool = True
+    ) -> ExportStats:
+        """
+        ユーザーのノートを受け取ったままのJSONでJSON Linesのファイルに書き出します。
+        中断した場合は、同じ引数で再度実行するとチェックポイントから再開します
+
+        Parameters
+        ----------
+        path : str
+            書き出すファイル。 ``.gz`` で終わる場合はgzipで圧縮します
+        user_id : Optional[str], default=None
+            ユーザーのID
+        since_date : Optional[Union[datetime, int]], default=None
+            この時刻より後のノートだけを書き出します
+        until_date : Optional[Union[datetime, int]], default=None
+            この時刻より前のノートだけを書き出します
+        windows : int, default=1
+            期間を等分して並行して取得する数
+        compress : Optional[bool], default=None
+        checkpoint_path : Optional[str], default=None
+
+        Returns
+        -------
+        ExportStats
+            書き出したノートの数と速度
+        """
+
+        exporter = NoteExporter(user_id or self.__user.id, path, compress=compress, checkpoint_path=checkpoint_path,
+                                since_date=since_date, until_date=until_date, windows=windows,
+                                includeReplies=include_replies, includeMyRenotes=include_my_renotes)
+        return await exporter.run()
+
     def get_mention(self, user: Optional[User] = None) -> str:
         """
         Get mention name of user.
@@ -6,8 +6,11 @@ __all__ = (
     "CommandInvokeError",
     "CommandRegistrationError",
     "ExtensionAlreadyLoaded",
+    "ExtensionNotLoaded",
     "ExtensionFailed",
     "CheckFailure",
+    "CommandOnCooldown",
+    "MaxConcurrencyReached",
     "ExtensionNotFound",
     "NoEntryPointError",
     "InvalidCogPath",
@@ -119,6 +122,12 @@ class ExtensionAlreadyLoaded(Exception):
     """
 
 
+class ExtensionNotLoaded(Exception):
+    """
+    cogが読み込まれていない
+    """
+
+
 class ExtensionFailed(Exception):
     """
     cog周りのエラー
@@ -161,6 +170,40 @@ class CheckFailure(Exception):
     """
 
 
+class CommandOnCooldown(CommandError):
+    """
+    コマンドがクールダウン中の場合の例外
+
+    Attributes
+    ----------
+    cooldown : Cooldown
+    retry_after : float
+        実行できるようになるまでの時間(秒)
+    """
+
+    def __init__(self, cooldown, retry_after: float):
+        self.cooldown = cooldown
+        self.retry_after: float = retry_after
+        super().__init__(f'コマンドはクールダウン中です。{retry_after:.2f}秒後に再度実行してください')
+
+
+class MaxConcurrencyReached(CommandError):
+    """
+    コマンドの同時実行数が上限に達した場合の例外
+
+    Attributes
+    ----------
+    number : int
+        同時に実行できる数
+    per : BucketType
+    """
+
+    def __init__(self, number: int, per):
+        self.number: int = number
+        self.per = per
+        super().__init__(f'コマンドは同時に{number}個までしか実行できません')
+
+
 class InvalidCogPath(Exception):
     """
     cogのパスが不正
@@ -1,4 +1,5 @@
 from .bot import *
 from .cog import *
 from .context import *
+from .cooldowns import *
 from .core import *
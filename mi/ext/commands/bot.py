@@ -4,24 +4,28 @@ from __future__ import annotations
 
 import asyncio
 import importlib
-import inspect
-import re
 import sys
+import time
 import traceback
-from types import ModuleType
-from typing import TYPE_CHECKING, Any, Callable, Coroutine, Dict, List, Optional, Tuple, Union
+from types import MappingProxyType, ModuleType
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, Dict, List, Mapping, Optional, Tuple, Union
 
 from mi.abc.ext.bot import AbstractBotBase
 from mi.exception import (
     CogNameDuplicate,
+    CommandOnCooldown,
     ExtensionAlreadyLoaded,
     ExtensionFailed,
     ExtensionNotFound,
+    ExtensionNotLoaded,
     InvalidCogPath,
+    MaxConcurrencyReached,
     NoEntryPointError,
 )
 from mi.ext.commands.context import Context
 from mi.ext.commands.core import CommandManager
+from mi.ext.commands.executor import ExecutorPool
+from mi.ext.commands.lazy import ExtensionStats, LazyExtension, scan_extension
 from mi.framework.client import Client
 from mi.framework.models.user import User
 from mi.utils import get_module_logger
@@ -44,9 +48,14 @@ class BotBase(CommandManager, AbstractBotBase):
         self.token: Optional[str] = None
         self.origin_uri: Optional[str] = None
         self.__extensions: Dict[str, Any] = {}
+        self.__lazy_extensions: Dict[str, LazyExtension] = {}
+        self.__extension_stats: Dict[str, ExtensionStats] = {}
+        self.lazy_extensions: bool = options.get('lazy_extensions', False)
         self.user: User = None
         self.__cogs: Dict[str, Cog] = {}
         self.strip_after_prefix = options.get("strip_after_prefix", False)
+        self.executors: ExecutorPool = ExecutorPool(thread_workers=options.get('thread_workers'),
+                                                    process_workers=options.get('process_workers'))
         self.logger = get_module_logger(__name__)
         self.loop = asyncio.get_event_loop()
 
@@ -78,6 +87,7 @@ class BotBase(CommandManager, AbstractBotBase):
             self.special_events[name].append(func)
         else:
             self.special_events[name] = [func]
+        self._invalidate_listeners()
 
     def listen(self, name: Optional[str] = None):
         def decorator(func: Coroutine[Any, Any, Any]):
@@ -95,6 +105,28 @@ class BotBase(CommandManager, AbstractBotBase):
             self.extra_events[name].append(func)
         else:
             self.extra_events[name] = [func]
+        self._invalidate_listeners()
+
+    def remove_listener(self, func: Callable[..., Any], name: Optional[str] = None) -> None:
+        """
+        リスナーを削除します
+
+        Parameters
+        ----------
+        func : Callable[..., Any]
+            add_listenerで登録した関数
+        name : Optional[str], default=None
+            登録した際のイベント名
+        """
+
+        name = func.__name__ if name is None else name
+        listeners = self.extra_events.get(name)
+        if listeners is None or func not in listeners:
+            return
+        listeners.remove(func)
+        if not listeners:
+            del self.extra_events[name]
+        self._invalidate_listeners()
 
     async def event_dispatch(self, event_name: str, *args: Tuple[Any], **kwargs: Dict[Any, Any]) -> bool:
         """
@@ -110,27 +142,19 @@ class BotBase(CommandManager, AbstractBotBase):
         -------
 
         """
-        ev = f"on_{event_name}"
-        for event in self.special_events.get(ev, []):
-            foo = importlib.import_module(event.__module__)
-            coro = getattr(foo, ev)
-            await self.schedule_event(coro, event, *args, **kwargs)
-        if ev in dir(self):
-            await self.schedule_event(getattr(self, ev), ev, *args, **kwargs)
-        return ev in dir(self)
-
-    def dispatch(self, event_name: str, *args: tuple[Any], **kwargs: Dict[Any, Any]):
-        ev = f"on_{event_name}"
-        for event in self.extra_events.get(ev, []):
-            if inspect.ismethod(event):
-                coro = event
-                event = event.__name__
-            else:
-                foo = importlib.import_module(event.__module__)
-                coro = getattr(foo, ev)
-            self.schedule_event(coro, event, *args, **kwargs)
-        if ev in dir(self):
-            self.schedule_event(getattr(self, ev), ev, *args, **kwargs)
+        handlers = self._get_special_table().get(event_name, ())
+        lane = self._lanes.get_lane(event_name)
+        for coro, event in handlers:
+            await lane.put(coro, event, args, kwargs)
+        return bool(handlers)
+
+    def dispatch(self, event_name: str, *args: Any, lane_key: Optional[str] = None, **kwargs: Any):
+        handlers = self._get_dispatch_table().get(event_name)
+        if not handlers:
+            return
+        lane = self._lanes.get_lane(lane_key or event_name)
+        for coro, event in handlers:
+            lane.put(coro, event, args, kwargs)
 
     def add_cog(self, cog: Cog, override: bool = False) -> None:
         cog_name = cog.__cog_name__
@@ -138,21 +162,86 @@ class BotBase(CommandManager, AbstractBotBase):
         if existing is not None:
             if not override:
                 raise CogNameDuplicate()
-            self.remove_cog(cog_name)  # TODO: 作る
+            self.remove_cog(cog_name)
 
         cog = cog._inject(self)
         self.__cogs[cog_name] = cog
 
-    def remove_cog(self, name: str):  # TODO: Optional[Cog]を返すように
-        """Cogを削除します"""
-        cog = self.__cogs.get(name)
+    def remove_cog(self, name: str) -> Optional[Cog]:
+        """
+        Cogと、そのコマンドとリスナーを削除します
+
+        Parameters
+        ----------
+        name : str
+            Cogの名前
+
+        Returns
+        -------
+        Optional[Cog]
+            削除したCog。存在しない場合はNone
+        """
+
+        cog = self.__cogs.pop(name, None)
         if cog is None:
-            return
+            return None
 
         cog._eject(self)
 
         return cog
 
+    @property
+    def cogs(self) -> Mapping[str, Cog]:
+        """読み込まれているCog"""
+        return MappingProxyType(self.__cogs)
+
+    @property
+    def extensions(self) -> Mapping[str, ModuleType]:
+        """読み込まれている拡張"""
+        return MappingProxyType(self.__extensions)
+
+    @staticmethod
+    def _is_submodule(parent: str, child: Optional[str]) -> bool:
+        return child is not None and (parent == child or child.startswith(parent + '.'))
+
+    def _remove_module_references(self, name: str) -> None:
+        # 拡張のモジュールで定義されたCog, コマンド, リスナーを削除する
+        for cog_name, cog in list(self.__cogs.items()):
+            if self._is_submodule(name, type(cog).__module__):
+                self.remove_cog(cog_name)
+
+        self._remove_commands(lambda cmd: self._is_submodule(name, getattr(cmd.func.callback, '__module__', None)))
+
+        changed = False
+        for events in (self.extra_events, self.special_events):
+            for event_name, funcs in list(events.items()):
+                remaining = [f for f in funcs if not self._is_submodule(name, getattr(f, '__module__', None))]
+                if len(remaining) != len(funcs):
+                    changed = True
+                    if remaining:
+                        events[event_name] = remaining
+                    else:
+                        del events[event_name]
+        if changed:
+            self._invalidate_listeners()
+
+    def _call_module_finalizers(self, lib: ModuleType, key: str) -> None:
+        try:
+            teardown = getattr(lib, 'teardown')
+        except AttributeError:
+            pass
+        else:
+            try:
+                teardown(self)
+            except Exception:
+                self.logger.exception('%s のteardownで例外が発生しました', key)
+        finally:
+            self.__extensions.pop(key, None)
+            sys.modules.pop(key, None)
+            for module in list(sys.modules):
+                if self._is_submodule(key, module):
+                    del sys.modules[module]
+
     def _load_from_module(self, spec: ModuleType, key: str) -> None:
         try:
             setup = spec.setup
@@ -162,6 +251,7 @@ class BotBase(CommandManager, AbstractBotBase):
         try:
             setup(self)
         except Exception as e:
+            self._remove_module_references(spec.__name__)
             raise ExtensionFailed(key, e) from e
         else:
             self.__extensions[key] = spec
@@ -174,7 +264,7 @@ class BotBase(CommandManager, AbstractBotBase):
             raise ExtensionNotFound(name) from e
 
     def load_extension(self, name: str, *,
-                       package: Optional[str] = None) -> None:
+                       package: Optional[str] = None, lazy: Optional[bool] = None) -> None:
         """拡張をロードする
 
         Parameters
@@ -183,27 +273,150 @@ class BotBase(CommandManager, AbstractBotBase):
             [description]
         package : Optional[str], optional
             [description], by default None
+        lazy : Optional[bool], default=None
+            Trueの場合、拡張をimportせずにソースコードからコマンドとリスナーを調べて登録し、
+            いずれかが初めて実行された際に読み込みます。静的に調べられない場合はすぐに読み込みます。
+            Noneの場合は ``lazy_extensions`` オプションに従います
         """
         name = self._resolve_name(name, package)
-        if name in self.__extensions:
+        if name in self.__extensions or name in self.__lazy_extensions:
             raise ExtensionAlreadyLoaded
+        lazy = self.lazy_extensions if lazy is None else lazy
+        stats = ExtensionStats(lazy=lazy)
+        if lazy:
+            started_at = time.perf_counter()
+            manifest = scan_extension(name)
+            stats.scan = time.perf_counter() - started_at
+            if manifest is not None:
+                extension = LazyExtension(self, name, manifest, stats)
+                self.__lazy_extensions[name] = extension
+                self.__extension_stats[name] = stats
+                extension.install()
+                return
+            self.logger.debug('extension %s cannot be loaded lazily', name)
+            stats.lazy = False
+        self._import_extension(name, stats)
+
+    def _import_extension(self, name: str, stats: ExtensionStats) -> None:
+        self.__extension_stats[name] = stats
+        started_at = time.perf_counter()
         try:
             module = importlib.import_module(name)
         except ModuleNotFoundError as e:
             raise InvalidCogPath(f"cog: {name} へのパスが無効です") from e
+        stats.import_time = time.perf_counter() - started_at
+        started_at = time.perf_counter()
         self._load_from_module(module, name)
+        stats.setup = time.perf_counter() - started_at
+        stats.loaded = True
+
+    def _get_lazy_extension(self, name: str) -> Optional[LazyExtension]:
+        return self.__lazy_extensions.get(name)
+
+    def _pop_lazy_extension(self, name: str) -> Optional[LazyExtension]:
+        return self.__lazy_extensions.pop(name, None)
+
+    def extension_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        拡張ごとの読み込みにかかった時間を返します
+
+        Returns
+        -------
+        Dict[str, Dict[str, Any]]
+            拡張の名前と、解析、import、setupにかかった時間(秒)等
+        """
+
+        return {name: stats.to_dict() for name, stats in self.__extension_stats.items()}
+
+    def unload_extension(self, name: str, *, package: Optional[str] = None) -> None:
+        """
+        拡張を取り除きます。拡張のモジュールで定義されたCog, コマンド, リスナーは削除され、
+        ``teardown`` 関数が存在する場合は呼び出されます
+
+        Parameters
+        ----------
+        name : str
+            load_extensionに渡した名前
+        package : Optional[str], default=None
+
+        Raises
+        ------
+        ExtensionNotLoaded
+            拡張が読み込まれていない場合
+        """
+
+        name = self._resolve_name(name, package)
+        pending = self.__lazy_extensions.pop(name, None)
+        if pending is not None:
+            pending.uninstall()
+            self.__extension_stats.pop(name, None)
+            return
+        lib = self.__extensions.get(name)
+        if lib is None:
+            raise ExtensionNotLoaded(name)
+        self.__extension_stats.pop(name, None)
+        self._remove_module_references(lib.__name__)
+        self._call_module_finalizers(lib, name)
+
+    def reload_extension(self, name: str, *, package: Optional[str] = None) -> None:
+        """
+        拡張を取り除き、モジュールを読み込み直します。WebSocketの接続はそのまま維持されます。
+        読み込みに失敗した場合は、Cog, コマンド, リスナーとモジュールを元の状態に戻して例外を送出します
+
+        Parameters
+        ----------
+        name : str
+            load_extensionに渡した名前
+        package : Optional[str], default=None
+
+        Raises
+        ------
+        ExtensionNotLoaded
+            拡張が読み込まれていない場合
+        """
+
+        name = self._resolve_name(name, package)
+        pending = self.__lazy_extensions.get(name)
+        if pending is not None:
+            pending.load('reload')  # まだ読み込まれていない拡張は、読み込むだけで最新の状態になる
+            return
+        lib = self.__extensions.get(name)
+        if lib is None:
+            raise ExtensionNotLoaded(name)
+
+        modules = {key: module for key, module in sys.modules.items() if self._is_submodule(name, key)}
+        cogs = dict(self.__cogs)
+        commands = list(self.all_commands)
+        extra_events = {key: list(funcs) for key, funcs in self.extra_events.items()}
+        special_events = {key: list(funcs) for key, funcs in self.special_events.items()}
+        try:
+            self._remove_module_references(lib.__name__)
+            self._call_module_finalizers(lib, name)
+            # 既に使われていた拡張なので、lazy_extensionsに関わらずすぐに読み込み直す
+            self.load_extension(name, lazy=False)
+        except Exception:
+            # 元の状態に戻す。Cogは_ejectされているが、コマンドとリスナーの一覧ごと戻すので登録し直す必要は無い
+            for key in [key for key in sys.modules if self._is_submodule(name, key)]:
+                del sys.modules[key]
+            sys.modules.update(modules)
+            self.__cogs.clear()
+            self.__cogs.update(cogs)
+            self.all_commands = commands
+            self.extra_events = extra_events
+            self.special_events = special_events
+            self.__extensions[name] = lib
+            self._invalidate_commands()
+            self._invalidate_listeners()
+            raise
 
     def schedule_event(
             self,
             coro: Callable[..., Coroutine[Any, Any, Any]],
             event_name: str,
-            *args: tuple[Any],
-            **kwargs: Dict[Any, Any],
-    ) -> asyncio.Task[Any]:
-        return asyncio.create_task(
-            self._run_event(coro, event_name, *args, **kwargs),
-            name=f"MI.py: {event_name}",
-        )
+            *args: Any,
+            **kwargs: Any,
+    ) -> asyncio.Future[Any]:
+        return self._lanes.schedule(event_name, coro, event_name, args, kwargs)
 
     async def _run_event(
             self,
@@ -213,7 +426,7 @@ class BotBase(CommandManager, AbstractBotBase):
             **kwargs: Any,
     ) -> None:
         try:
-            await coro(*args, **kwargs)
+            await self._profiler.run(coro, *args, **kwargs)
         except asyncio.CancelledError:
             pass
         except Exception:
@@ -237,23 +450,32 @@ class BotBase(CommandManager, AbstractBotBase):
         return cls(message=message, bot=self, cmd=cmd)
 
     async def progress_command(self, message):
-        for cmd in self.all_commands:
+        content = message.content
+        if content is None:
+            return
+        for cmd, args in self._get_command_index().match(content):
             ctx = await self.get_context(message, cmd)
-            if cmd.cmd_type == 'regex':
-                if re.search(cmd.key, message.content):
-                    hit_list = re.findall(cmd.key, message.content)
-                    if isinstance(hit_list[0], tuple):
-                        hit_list = tuple(i for i in hit_list[0] if len(i.rstrip()) > 0)
-                    ctx.args = hit_list
-                    await cmd.func.invoke(ctx)
-            elif message.content.find(cmd.key) != -1:
+            if args is not None:
+                ctx.args = args
+            try:
                 await cmd.func.invoke(ctx)
-            else:
-                continue
+            except (CommandOnCooldown, MaxConcurrencyReached) as e:
+                self.dispatch('command_rejected', ctx, e)
 
     async def on_mention(self, message):
         await self.progress_command(message)
 
+    async def close(self) -> None:
+        """
+        接続を閉じ、エグゼキューターを停止します
+        """
+
+        try:
+            await super().close()
+        finally:
+            # 実行中のハンドラーを待つ間、イベントループを止めない
+            await asyncio.get_running_loop().run_in_executor(None, self.executors.shutdown)
+
 
 class Bot(BotBase, Client):
     pass
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import inspect
-from typing import TYPE_CHECKING, Any, ClassVar, Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Callable, ClassVar, Coroutine, Dict, List, Optional, Tuple
 
 from mi.ext.commands._types import _BaseCommand
 from mi.ext.commands.core import Command
@@ -10,6 +10,17 @@ if TYPE_CHECKING:
     from mi.ext import Bot
 
 
+def _offloaded_listener(bot: Bot, executor: str, func: Callable[..., Any]) -> Callable[..., Coroutine[Any, Any, Any]]:
+    async def listener(*args: Any) -> Any:
+        # 回数とイベントループ上の時間は_run_eventで同じ名前の統計に記録される
+        return await bot.executors.run(executor, func, *args, stats=bot._profiler.get_for(func))
+
+    listener.__module__ = func.__module__
+    listener.__name__ = func.__name__
+    listener.__qualname__ = func.__qualname__
+    return listener
+
+
 class CogMeta(type):
     __cog_name__: str
 
@@ -38,7 +49,7 @@ class CogMeta(type):
                 # 関数をvalueに !valueが重要
                 if isinstance(value, _BaseCommand):
                     commands[elem] = value
-                elif inspect.iscoroutinefunction(value):
+                elif inspect.iscoroutinefunction(value) or getattr(value, '__cog_listener_executor__', None):
                     try:
                         value.__cog_listener__
                     except AttributeError:
@@ -77,13 +88,30 @@ class Cog(metaclass=CogMeta):
         return self
 
     @classmethod
-    def listener(cls, name: Optional[str] = None):
+    def listener(cls, name: Optional[str] = None, *, executor: Optional[str] = None):
+        """
+        Cogのメソッドをリスナーとして登録するデコレータ
+
+        Parameters
+        ----------
+        name : Optional[str], default=None
+            イベント名。Noneの場合はメソッド名
+        executor : Optional[str], default=None
+            ``thread`` , ``process`` または ``Bot.executors.register`` で登録した名前。
+            指定した場合、リスナーはコルーチンではないstaticmethodで定義し、
+            NoteやUserは値だけを複製したNoteSnapshot, UserSnapshotとして渡されます
+        """
+
         def decorator(func: Cog):
             actual = func
             if isinstance(actual, staticmethod):
                 actual = actual.__func__
-            if not inspect.iscoroutinefunction(actual):
+            if executor is None and not inspect.iscoroutinefunction(actual):
                 raise TypeError('Listener function must be a coroutine function.')
+            if executor is not None:
+                if inspect.iscoroutinefunction(actual):
+                    raise TypeError('Listener function run in an executor must not be a coroutine function.')
+                actual.__cog_listener_executor__ = executor
             actual.__cog_listener__ = True
             to_assign = name or actual.__name__
             try:
@@ -102,7 +130,23 @@ class Cog(metaclass=CogMeta):
         for command in self.__cog_commands__:
             bot.add_command(command, self.__cog_name__)
 
+        injected: List[Tuple[str, Any]] = []
         for name, method_func in self.__cog_listeners__:
-            bot.add_listener(getattr(self, name), name)
+            executor = getattr(method_func, '__cog_listener_executor__', None)
+            if executor is None:
+                listener = getattr(self, name)
+            else:
+                listener = _offloaded_listener(bot, executor, method_func)
+            bot.add_listener(listener, name)
+            injected.append((name, listener))
+        self.__cog_injected_listeners__ = injected
 
         return self
+
+    def _eject(self, bot: Bot):
+        """_injectで登録したコマンドとリスナーを削除します"""
+
+        commands = set(map(id, self.__cog_commands__))
+        bot._remove_commands(lambda cmd: cmd.cog_name == self.__cog_name__ and id(cmd.func) in commands)
+        for name, listener in getattr(self, '__cog_injected_listeners__', ()):
+            bot.remove_listener(listener, name)
@@ -0,0 +1,248 @@
+"""コマンドのクールダウンと同時実行数の制限"""
+
+from __future__ import annotations
+
+import asyncio
+import enum
+import time
+from collections import OrderedDict, deque
+from typing import TYPE_CHECKING, Any, Deque, Dict, Hashable, Optional
+
+from mi.exception import CommandOnCooldown, MaxConcurrencyReached
+
+if TYPE_CHECKING:
+    from mi.ext.commands.context import Context
+
+__all__ = ('BucketType', 'Cooldown', 'MaxConcurrency', 'cooldown', 'max_concurrency')
+
+
+class BucketType(enum.Enum):
+    """
+    クールダウンと同時実行数を数える単位
+
+    default
+        全てのユーザーで共通
+    user
+        ユーザー毎
+    host
+        インスタンス毎。ローカルのユーザーは一つのインスタンスとして数えます
+    """
+
+    default = 0
+    user = 1
+    host = 2
+
+    def get_key(self, ctx: Context) -> Hashable:
+        if self is BucketType.user:
+            return ctx.author.id
+        if self is BucketType.host:
+            return ctx.author.host
+        return None
+
+
+class _Bucket:
+    __slots__ = ('tokens', 'window')
+
+    def __init__(self, tokens: int, window: float):
+        self.tokens: int = tokens
+        self.window: float = window
+
+
+class Cooldown:
+    """
+    ``per`` 秒の間に ``rate`` 回までコマンドを実行できるようにします
+
+    使われていない単位の状態は期限が切れた物から破棄され、 ``max_size`` を超えた場合は最も古い物から破棄されます
+
+    Parameters
+    ----------
+    rate : int
+        実行できる回数
+    per : float
+        回数を数える期間(秒)
+    type : BucketType, default=BucketType.default
+        回数を数える単位
+    max_size : int, default=10000
+        記憶しておく単位の数の上限
+    """
+
+    def __init__(self, rate: int, per: float, type: BucketType = BucketType.default, *, max_size: int = 10000):
+        self.rate: int = rate
+        self.per: float = per
+        self.type: BucketType = type
+        self.max_size: int = max_size
+        self._buckets: OrderedDict[Hashable, _Bucket] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _purge(self, now: float) -> None:
+        # 更新された単位は末尾に移動する為、先頭から期限が切れている物を破棄する
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if now < bucket.window + self.per and len(self._buckets) <= self.max_size:
+                break
+            del self._buckets[key]
+
+    def update_rate_limit(self, key: Hashable, now: Optional[float] = None) -> Optional[float]:
+        """
+        実行できるかを確認し、できる場合は回数を一回消費します
+
+        Parameters
+        ----------
+        key : Hashable
+            BucketType.get_keyで取得した単位
+        now : Optional[float], default=None
+
+        Returns
+        -------
+        Optional[float]
+            実行できない場合は、実行できるようになるまでの時間(秒)
+        """
+
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(self.rate, now)
+        else:
+            self._buckets.move_to_end(key)
+            if now >= bucket.window + self.per:
+                # 期間が過ぎた単位は回数を戻す。_purgeで現在の単位が破棄されないよう先に更新する
+                bucket.tokens = self.rate
+                bucket.window = now
+        self._purge(now)
+        if bucket.tokens == 0:
+            return self.per - (now - bucket.window)
+        if bucket.tokens == self.rate:
+            bucket.window = now
+        bucket.tokens -= 1
+        return None
+
+    def check(self, ctx: Context) -> None:
+        """
+        Raises
+        ------
+        CommandOnCooldown
+            クールダウン中の場合
+        """
+
+        retry_after = self.update_rate_limit(self.type.get_key(ctx))
+        if retry_after is not None:
+            raise CommandOnCooldown(self, retry_after)
+
+
+class MaxConcurrency:
+    """
+    コマンドを同時に実行できる数を制限します
+
+    Parameters
+    ----------
+    number : int
+        同時に実行できる数
+    per : BucketType, default=BucketType.default
+        数える単位
+    wait : bool, default=False
+        上限に達している場合に待つか。Falseの場合は MaxConcurrencyReached を送出します
+    """
+
+    def __init__(self, number: int, per: BucketType = BucketType.default, *, wait: bool = False):
+        if number < 1:
+            raise ValueError('number must be greater than 0')
+        self.number: int = number
+        self.per: BucketType = per
+        self.wait: bool = wait
+        # 実行中の数と待っているFutureは、実行中の物がある単位だけを記憶する
+        self._active: Dict[Hashable, int] = {}
+        self._waiters: Dict[Hashable, Deque[asyncio.Future[None]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._active)
+
+    async def acquire(self, ctx: Context) -> Hashable:
+        """
+        Returns
+        -------
+        Hashable
+            releaseに渡す単位
+
+        Raises
+        ------
+        MaxConcurrencyReached
+            上限に達していて、waitがFalseの場合
+        """
+
+        key = self.per.get_key(ctx)
+        active = self._active.get(key, 0)
+        if active < self.number:
+            self._active[key] = active + 1
+            return key
+        if not self.wait:
+            raise MaxConcurrencyReached(self.number, self.per)
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(key)  # 譲られた枠を次に渡す
+            raise
+        return key
+
+    def release(self, key: Hashable) -> None:
+        waiters = self._waiters.get(key)
+        while waiters:
+            future = waiters.popleft()
+            if not future.done():
+                future.set_result(None)  # 実行中の数はそのまま、枠を待っている物に譲る
+                return
+        self._waiters.pop(key, None)
+        active = self._active.get(key, 0) - 1
+        if active > 0:
+            self._active[key] = active
+        else:
+            self._active.pop(key, None)
+
+
+def _attach(func: Any, name: str, value: Any) -> Any:
+    from mi.ext.commands.core import Command
+
+    if isinstance(func, Command):
+        setattr(func, name, value)
+    else:
+        setattr(func, f'__commands{name}__', value)
+    return func
+
+
+def cooldown(rate: int, per: float, type: BucketType = BucketType.default):
+    """
+    コマンドにクールダウンを設定するデコレータ
+
+    Parameters
+    ----------
+    rate : int
+        ``per`` 秒の間に実行できる回数
+    per : float
+    type : BucketType, default=BucketType.default
+    """
+
+    def decorator(func: Any) -> Any:
+        return _attach(func, '_cooldown', Cooldown(rate, per, type))
+
+    return decorator
+
+
+def max_concurrency(number: int, per: BucketType = BucketType.default, *, wait: bool = False):
+    """
+    コマンドの同時実行数を制限するデコレータ
+
+    Parameters
+    ----------
+    number : int
+    per : BucketType, default=BucketType.default
+    wait : bool, default=False
+    """
+
+    def decorator(func: Any) -> Any:
+        return _attach(func, '_max_concurrency', MaxConcurrency(number, per, wait=wait))
+
+    return decorator
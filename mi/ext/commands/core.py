@@ -5,6 +5,8 @@ import functools
 from typing import TYPE_CHECKING, List, Optional
 
 from mi.ext.commands._types import _BaseCommand
+from mi.ext.commands.cooldowns import Cooldown, MaxConcurrency
+from mi.ext.commands.index import CommandIndex
 
 if TYPE_CHECKING:
     from mi.ext.commands import Context
@@ -30,14 +32,49 @@ class CMD:
 class CommandManager:
     def __init__(self, *args, **kwargs):
         self.all_commands: List[CMD] = []
+        self._command_index: Optional[CommandIndex] = None
         super().__init__(*args, **kwargs)  # Clientクラスを初期化する
 
+    def _invalidate_commands(self) -> None:
+        """コマンドが追加、削除された際に索引を破棄します。索引は次にコマンドを探す際に作成されます"""
+        self._command_index = None
+
+    def _get_command_index(self) -> CommandIndex:
+        if self._command_index is None:
+            self._command_index = CommandIndex(self.all_commands)
+        return self._command_index
+
     def add_command(self, command: 'Command', cog_name: str):
         if not isinstance(command, Command):
             raise TypeError(f'{command}はCommandクラスである必要があります')
         command_type = 'regex' if command.regex else 'text'
         command_key = command.regex or command.text
         self.all_commands.append(CMD(command_type, command_key, command, cog_name))
+        self._invalidate_commands()
+
+    def remove_command(self, command: 'Command') -> bool:
+        """
+        コマンドを削除します
+
+        Parameters
+        ----------
+        command : Command
+
+        Returns
+        -------
+        bool
+            削除したか否か
+        """
+
+        return self._remove_commands(lambda cmd: cmd.func is command) > 0
+
+    def _remove_commands(self, predicate) -> int:
+        remaining = [cmd for cmd in self.all_commands if not predicate(cmd)]
+        removed = len(self.all_commands) - len(remaining)
+        if removed:
+            self.all_commands = remaining
+            self._invalidate_commands()
+        return removed
 
 
 class Command(_BaseCommand):
@@ -46,12 +83,21 @@ class Command(_BaseCommand):
         return self
 
     def __init__(self, func, regex: str, text: str, **kwargs):
-        if not asyncio.iscoroutinefunction(func):
+        if isinstance(func, staticmethod):
+            func = func.__func__  # Python 3.9のstaticmethodは呼び出せない
+        self.executor: Optional[str] = kwargs.get('executor')
+        if self.executor is None and not asyncio.iscoroutinefunction(func):
             raise TypeError(f'{func}はコルーチンでなければなりません')
+        if self.executor is not None and asyncio.iscoroutinefunction(func):
+            raise TypeError(f'エグゼキューターで実行する{func}はコルーチンであってはいけません')
         self.regex: str = regex
         self.text: str = text
         self.callback = func
         self.cog = None
+        self._on_result = None
+        self._cooldown: Optional[Cooldown] = kwargs.get('cooldown') or getattr(func, '__commands_cooldown__', None)
+        self._max_concurrency: Optional[MaxConcurrency] = kwargs.get('max_concurrency') or getattr(
+            func, '__commands_max_concurrency__', None)
 
     @property
     def qualified_name(self) -> str:
@@ -60,19 +106,100 @@ class Command(_BaseCommand):
     def __str__(self):
         return self.qualified_name
 
+    def result(self, coro):
+        """
+        エグゼキューターで実行したコマンドの戻り値を受け取るコルーチンを登録するデコレータ。
+        コルーチンはイベントループ上で ``(ctx, result)`` (Cogの場合は ``(self, ctx, result)`` )で呼ばれます
+        """
+
+        if not asyncio.iscoroutinefunction(coro):
+            raise TypeError(f'{coro}はコルーチンでなければなりません')
+        self._on_result = coro
+        return coro
+
+    async def _run_callback(self, ctx: Context):
+        profiler = ctx.bot._profiler
+        if self.executor is None:
+            ctx = await self._parse_arguments(ctx)
+            await profiler.run(self.callback, *ctx.args, **ctx.kwargs)
+            return
+        stats = profiler.get_for(self.callback)
+        if stats is not None:
+            stats.calls += 1
+        try:
+            result = await ctx.bot.executors.run(self.executor, self.callback, ctx, *ctx.args, stats=stats)
+        except Exception:
+            if stats is not None:
+                stats.errors += 1
+            raise
+        if self._on_result is not None:
+            args = (ctx, result) if ctx.cog is None else (ctx.cog, ctx, result)
+            await self._on_result(*args)
+
     @staticmethod
     async def _parse_arguments(ctx: Context):
-        args = [ctx] if ctx.cog is None else (ctx.cog, ctx)
-        ctx.args = args + ctx.args
+        args = (ctx,) if ctx.cog is None else (ctx.cog, ctx)
+        ctx.args = args + tuple(ctx.args)
         return ctx
 
     async def invoke(self, ctx: Context, *args, **kwargs):
-        ctx = await self._parse_arguments(ctx)
-        await self.callback(*ctx.args, **ctx.kwargs)
-
+        """
+        Raises
+        ------
+        CommandOnCooldown
+            クールダウン中の場合
+        MaxConcurrencyReached
+            同時実行数が上限に達している場合
+        """
+
+        if self._cooldown is not None:
+            self._cooldown.check(ctx)
+        if self._max_concurrency is None:
+            await self._run_callback(ctx)
+            return
+        key = await self._max_concurrency.acquire(ctx)
+        try:
+            await self._run_callback(ctx)
+        finally:
+            self._max_concurrency.release(key)
+
+
+def mention_command(regex: Optional[str] = None, text: Optional[str] = None, *, cooldown: Optional[Cooldown] = None,
+                    max_concurrency: Optional[MaxConcurrency] = None, executor: Optional[str] = None):
+    """
+    メンションに反応するコマンドを作成するデコレータ
+
+    Parameters
+    ----------
+    regex : Optional[str], default=None
+        本文に一致させる正規表現
+    text : Optional[str], default=None
+        本文に含まれている場合に実行する文字列
+    cooldown : Optional[Cooldown], default=None
+        コマンドのクールダウン。 ``commands.cooldown`` デコレータでも設定できます
+    max_concurrency : Optional[MaxConcurrency], default=None
+        コマンドの同時実行数の制限。 ``commands.max_concurrency`` デコレータでも設定できます
+    executor : Optional[str], default=None
+        ``thread`` , ``process`` または ``Bot.executors.register`` で登録した名前。
+        指定した場合、コマンドはコルーチンではない関数で定義し、 ``(OffloadedContext, *args)`` で呼ばれます。
+        Cogはエグゼキューターに渡されない為、Cogに定義する場合は ``self`` を受け取らないstaticmethodにしてください。
+        戻り値は ``Command.result`` で登録したコルーチンで受け取れます
+
+    Examples
+    --------
+    ::
+
+        class Heavy(commands.Cog):
+            @commands.mention_command(text='render', executor='process')
+            @staticmethod
+            def render(ctx):
+                return draw(ctx.message.text)
+    """
 
-def mention_command(regex: Optional[str] = None, text: Optional[str] = None):
     def decorator(func, **kwargs):
+        kwargs.setdefault('cooldown', cooldown)
+        kwargs.setdefault('max_concurrency', max_concurrency)
+        kwargs.setdefault('executor', executor)
         return Command(func, regex=regex, text=text, **kwargs)
 
     return decorator
@@ -0,0 +1,222 @@
+"""CPU負荷の高いコマンドやリスナーを、スレッドまたはプロセスのエグゼキューターで実行する仕組み"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import importlib
+import pickle
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from mi.framework.blocking import HandlerStats
+from mi.framework.models.note import Note
+from mi.framework.models.user import User
+
+if TYPE_CHECKING:
+    from mi.ext.commands.context import Context
+
+__all__ = ('ExecutorPool', 'OffloadedContext', 'NoteSnapshot', 'UserSnapshot', 'snapshot')
+
+
+class UserSnapshot:
+    """エグゼキューターに渡す為に、Userの値だけを複製した物"""
+
+    __slots__ = ('id', 'username', 'nickname', 'host', 'is_bot')
+
+    def __init__(self, user: User):
+        self.id: str = user.id
+        self.username: str = user.name
+        self.nickname: Optional[str] = user.nickname
+        self.host: Optional[str] = user.host
+        self.is_bot: bool = user.is_bot
+
+
+class NoteSnapshot:
+    """エグゼキューターに渡す為に、Noteの値だけを複製した物"""
+
+    __slots__ = ('id', 'created_at', 'content', 'cw', 'visibility', 'reply_id', 'renote_id', 'file_ids', 'author')
+
+    def __init__(self, note: Note):
+        self.id: str = note.id
+        self.created_at: datetime = note.created_at
+        self.content: Optional[str] = note.content
+        self.cw: Optional[str] = note.cw
+        self.visibility: Optional[str] = note.visibility
+        self.reply_id: Optional[str] = note.reply_id
+        self.renote_id: Optional[str] = note.renote_id
+        self.file_ids: List[str] = list(note.file_ids or [])
+        self.author: UserSnapshot = UserSnapshot(note.author)
+
+
+class OffloadedContext:
+    """
+    エグゼキューターで実行するコマンドが、Contextの代わりに受け取る物
+
+    Attributes
+    ----------
+    command : str
+        コマンドの名前
+    args : Tuple[Any, ...]
+    message : NoteSnapshot
+    author : UserSnapshot
+    """
+
+    __slots__ = ('command', 'args', 'message', 'author')
+
+    def __init__(self, ctx: Context):
+        self.command: str = ctx.command.qualified_name
+        self.args: Tuple[Any, ...] = tuple(snapshot(arg) for arg in ctx.args)
+        self.message: NoteSnapshot = NoteSnapshot(ctx.message)
+        self.author: UserSnapshot = self.message.author
+
+    @property
+    def content(self) -> Optional[str]:
+        return self.message.content
+
+
+def snapshot(value: Any) -> Any:
+    """
+    イベントループの外に渡せるように、Note, User, Contextを値だけの複製に置き換えます
+
+    Parameters
+    ----------
+    value : Any
+
+    Returns
+    -------
+    Any
+        list, tuple, dictの中身も置き換えた物
+    """
+
+    from mi.ext.commands.context import Context
+
+    if value is None or isinstance(value, (str, int, float, bool, bytes, datetime)):
+        return value
+    if isinstance(value, Note):
+        return NoteSnapshot(value)
+    if isinstance(value, User):
+        return UserSnapshot(value)
+    if isinstance(value, Context):
+        return OffloadedContext(value)
+    if isinstance(value, (list, tuple)):
+        return type(value)(snapshot(i) for i in value)
+    if isinstance(value, dict):
+        return {k: snapshot(v) for k, v in value.items()}
+    return value
+
+
+class _FunctionReference:
+    # デコレータでCommandに置き換えられた関数は名前から引けずにpickleできない為、モジュールと名前で送る
+    __slots__ = ('module', 'qualname')
+
+    def __init__(self, func: Callable[..., Any]):
+        if '<locals>' in func.__qualname__:
+            raise TypeError(f'{func.__qualname__} はプロセスで実行できません。モジュールの直下かクラスに定義してください')
+        self.module: str = func.__module__
+        self.qualname: str = func.__qualname__
+
+    def __call__(self, *args: Any) -> Any:
+        return _resolve(self.module, self.qualname)(*args)
+
+
+@functools.lru_cache(maxsize=None)
+def _resolve(module: str, qualname: str) -> Callable[..., Any]:
+    target: Any = importlib.import_module(module)
+    for name in qualname.split('.'):
+        target = getattr(target, name)
+        if isinstance(target, staticmethod):
+            target = target.__func__
+    return getattr(target, 'callback', target)  # Commandの場合は元の関数
+
+
+class ExecutorPool:
+    """
+    ハンドラーを実行するエグゼキューターを名前で管理します。
+    ``thread`` と ``process`` は初めて使われた際に作成され、 ``register`` で任意のエグゼキューターを追加できます
+
+    Parameters
+    ----------
+    thread_workers : Optional[int], default=None
+        ``thread`` のスレッド数
+    process_workers : Optional[int], default=None
+        ``process`` のプロセス数
+    """
+
+    def __init__(self, *, thread_workers: Optional[int] = None, process_workers: Optional[int] = None):
+        self._factories: Dict[str, Callable[[], Executor]] = {
+            'thread': lambda: ThreadPoolExecutor(thread_workers, thread_name_prefix='mi-executor'),
+            'process': lambda: ProcessPoolExecutor(process_workers),
+        }
+        self._executors: Dict[str, Executor] = {}
+
+    def register(self, name: str, executor: Executor) -> None:
+        """
+        エグゼキューターを追加、または置き換えます
+
+        Parameters
+        ----------
+        name : str
+            ``mention_command`` や ``Cog.listener`` の ``executor`` に指定する名前
+        executor : Executor
+        """
+
+        self._executors[name] = executor
+
+    def get(self, name: str) -> Executor:
+        executor = self._executors.get(name)
+        if executor is None:
+            if name not in self._factories:
+                raise ValueError(f'エグゼキューター {name} は登録されていません')
+            executor = self._executors[name] = self._factories[name]()
+        return executor
+
+    async def run(self, name: str, func: Callable[..., Any], *args: Any, stats: Optional[HandlerStats] = None) -> Any:
+        """
+        funcをエグゼキューターで実行し、結果を返します。
+        引数はsnapshotで値だけの複製に置き換えられ、プロセスで実行する場合は送信する前にpickleできるかを確認します
+
+        Parameters
+        ----------
+        name : str
+            エグゼキューターの名前
+        func : Callable[..., Any]
+            コルーチン関数ではない関数
+        *args : Any
+        stats : Optional[HandlerStats], default=None
+            実行にかかった時間を記録する先
+
+        Returns
+        -------
+        Any
+            funcの戻り値
+
+        Raises
+        ------
+        TypeError
+            引数や関数をプロセスに送れない場合
+        """
+
+        executor = self.get(name)
+        args = snapshot(args)
+        if isinstance(executor, ProcessPoolExecutor):
+            func = _FunctionReference(func)
+            try:
+                pickle.dumps(args)
+            except Exception as e:
+                raise TypeError(f'{func.qualname} の引数はプロセスに送れません: {e}') from e
+        started_at = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        finally:
+            if stats is not None:
+                stats.offloaded += time.perf_counter() - started_at
+
+    def shutdown(self, wait: bool = True) -> None:
+        """作成したエグゼキューターを全て停止します"""
+
+        for executor in self._executors.values():
+            executor.shutdown(wait=wait)
+        self._executors.clear()
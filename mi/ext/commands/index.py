@@ -0,0 +1,157 @@
+"""メンションの本文に一致するコマンドを、一度の走査で探す為の索引"""
+
+from __future__ import annotations
+
+import re
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional, Pattern, Set, Tuple
+
+if TYPE_CHECKING:
+    from mi.ext.commands.core import CMD
+
+__all__ = ('CommandIndex', 'TextAutomaton')
+
+_BACKREFERENCE = re.compile(r'\\[1-9]|\(\?P=')
+
+
+class TextAutomaton:
+    """
+    複数の文字列を本文から一度の走査で探すAho-Corasick法のオートマトン
+
+    Parameters
+    ----------
+    keys : List[str]
+        探す文字列。空文字列は含めないでください
+    """
+
+    __slots__ = ('_goto', '_fail', '_out')
+
+    def __init__(self, keys: List[str]):
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        for index, key in enumerate(keys):
+            state = 0
+            for char in key:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto.append({})
+                    outputs.append([])
+                    goto[state][char] = next_state
+                state = next_state
+            outputs[state].append(index)
+
+        fail = [0] * len(goto)
+        queue: Deque[int] = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                outputs[next_state].extend(outputs[fail[next_state]])
+
+        self._goto: List[Dict[str, int]] = goto
+        self._fail: List[int] = fail
+        self._out: List[Tuple[int, ...]] = [tuple(output) for output in outputs]
+
+    def search(self, text: str) -> Set[int]:
+        """
+        本文に含まれている文字列の番号を返します
+
+        Parameters
+        ----------
+        text : str
+
+        Returns
+        -------
+        Set[int]
+            keysでの番号
+        """
+
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[int] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class CommandIndex:
+    """
+    コマンドの一覧から作成する索引。テキストのコマンドはTextAutomatonで、
+    正規表現のコマンドはコンパイル済みのパターンと、それらを一つにまとめたパターンで探します
+
+    Parameters
+    ----------
+    commands : List[CMD]
+        CommandManager.all_commands
+    """
+
+    def __init__(self, commands: List[CMD]):
+        self.commands: List[CMD] = list(commands)
+        text_keys: List[str] = []
+        self._text_positions: List[int] = []
+        self._always: List[int] = []  # 空文字列のテキストコマンドは常に一致する
+        self._patterns: List[Tuple[int, Pattern[str]]] = []
+        combinable: List[str] = []
+        self._unfiltered: List[Tuple[int, Pattern[str]]] = []
+        for position, cmd in enumerate(self.commands):
+            if cmd.cmd_type == 'regex':
+                pattern = re.compile(cmd.key)
+                self._patterns.append((position, pattern))
+                # 名前付きグループや後方参照はまとめると意味が変わる為、個別に確認する
+                if pattern.groupindex or _BACKREFERENCE.search(cmd.key):
+                    self._unfiltered.append((position, pattern))
+                else:
+                    combinable.append(f'(?:{cmd.key})')
+            elif cmd.key:
+                text_keys.append(cmd.key)
+                self._text_positions.append(position)
+            else:
+                self._always.append(position)
+        self._automaton: Optional[TextAutomaton] = TextAutomaton(text_keys) if text_keys else None
+        self._combined: Optional[Pattern[str]] = None
+        if combinable:
+            try:
+                self._combined = re.compile('|'.join(combinable))
+            except re.error:
+                self._unfiltered = self._patterns
+
+    def match(self, content: str) -> List[Tuple[CMD, Optional[Tuple[str, ...]]]]:
+        """
+        本文に一致するコマンドを登録された順に返します
+
+        Parameters
+        ----------
+        content : str
+            メンションの本文
+
+        Returns
+        -------
+        List[Tuple[CMD, Optional[Tuple[str, ...]]]]
+            一致したコマンドと、正規表現のコマンドの場合は一致した文字列
+        """
+
+        hits: Dict[int, Optional[Tuple[str, ...]]] = dict.fromkeys(self._always)
+        if self._automaton is not None:
+            for index in self._automaton.search(content):
+                hits[self._text_positions[index]] = None
+        # まとめたパターンに一致しない場合、それに含まれるどのパターンにも一致しない
+        candidates = self._patterns if self._combined is not None and self._combined.search(content) \
+            else self._unfiltered
+        for position, pattern in candidates:
+            hit_list = pattern.findall(content)
+            if not hit_list:
+                continue
+            if isinstance(hit_list[0], tuple):
+                hits[position] = tuple(i for i in hit_list[0] if len(i.rstrip()) > 0)
+            else:
+                hits[position] = tuple(hit_list)
+        return [(self.commands[position], hits[position]) for position in sorted(hits)]
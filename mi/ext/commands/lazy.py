@@ -0,0 +1,327 @@
+"""拡張を読み込まずにコマンドとリスナーを登録し、初めて使われた際に読み込む仕組み"""
+
+from __future__ import annotations
+
+import ast
+import importlib.util
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from mi.ext.commands.core import CMD, Command
+
+if TYPE_CHECKING:
+    from mi.ext.commands.bot import BotBase
+    from mi.ext.commands.context import Context
+
+__all__ = ('ExtensionManifest', 'ExtensionStats', 'LazyExtension', 'scan_extension')
+
+MANIFEST_NAME = '__mi_extension__'
+
+
+class ExtensionManifest:
+    """
+    拡張を読み込まずに分かる、拡張が登録するコマンドとリスナー
+
+    拡張のモジュールに ``__mi_extension__ = {'commands': [{'text': 'ping'}, {'regex': r'calc (\\d+)'}], 'events': ['on_message']}``
+    のようなリテラルを書いた場合はそれを使い、無い場合はデコレータから探します。
+    リテラルを書く場合は、サブモジュール等の他のモジュールで定義されたコマンドとリスナーも含めてください
+
+    Attributes
+    ----------
+    commands : List[Tuple[str, str]]
+        コマンドの種類( ``text`` または ``regex`` )とキー
+    events : List[str]
+        ``on_message`` 等のイベント名
+    """
+
+    def __init__(self, commands: Optional[List[Tuple[str, str]]] = None, events: Optional[List[str]] = None):
+        self.commands: List[Tuple[str, str]] = commands or []
+        self.events: List[str] = events or []
+
+    def __bool__(self) -> bool:
+        return bool(self.commands or self.events)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> ExtensionManifest:
+        commands = []
+        for command in data.get('commands', []):
+            if command.get('regex'):
+                commands.append(('regex', command['regex']))
+            else:
+                commands.append(('text', command['text']))
+        return cls(commands, list(data.get('events', [])))
+
+
+class _Unresolvable(Exception):
+    pass
+
+
+def _decorator_name(node: ast.expr) -> Optional[str]:
+    if isinstance(node, ast.Call):
+        node = node.func
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    if isinstance(node, ast.Name):
+        return node.id
+    return None
+
+
+def _literal(node: Optional[ast.expr]) -> Any:
+    if node is None:
+        return None
+    if isinstance(node, ast.Constant):
+        return node.value
+    raise _Unresolvable()
+
+
+def _argument(call: ast.Call, position: int, keyword: str) -> Optional[ast.expr]:
+    for kw in call.keywords:
+        if kw.arg == keyword:
+            return kw.value
+    return call.args[position] if len(call.args) > position else None
+
+
+def _imports_own_package(node: ast.AST, module: str) -> bool:
+    # 同じパッケージのモジュールで定義されたコマンドやCogは、このモジュールを解析しても見つからない
+    package = module.split('.')[0]
+    if isinstance(node, ast.ImportFrom):
+        if node.level:
+            return True
+        modules = [node.module or '']
+    elif isinstance(node, ast.Import):
+        modules = [alias.name for alias in node.names]
+    else:
+        return False
+    return any(module == package or module.startswith(package + '.') for module in modules)
+
+
+def _find_literal_manifest(tree: ast.Module) -> Optional[ast.Assign]:
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+                isinstance(target, ast.Name) and target.id == MANIFEST_NAME for target in node.targets):
+            return node
+    return None
+
+
+def _scan_tree(tree: ast.Module, module: str = '') -> Optional[ExtensionManifest]:
+    literal = _find_literal_manifest(tree)
+    if literal is not None:
+        try:
+            return ExtensionManifest.from_dict(ast.literal_eval(literal.value))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+    manifest = ExtensionManifest()
+    classes = {node.name for node in ast.walk(tree) if isinstance(node, ast.ClassDef)}
+    try:
+        for node in ast.walk(tree):
+            if module and _imports_own_package(node, module):
+                return None
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                for decorator in node.decorator_list:
+                    name = _decorator_name(decorator)
+                    if name == 'loop':
+                        return None  # タスクはsetupで開始される為、読み込みを遅らせられない
+                    if name == 'mention_command' and isinstance(decorator, ast.Call):
+                        regex = _literal(_argument(decorator, 0, 'regex'))
+                        text = _literal(_argument(decorator, 1, 'text'))
+                        manifest.commands.append(('regex', regex) if regex else ('text', text or ''))
+                    elif name in ('listener', 'listen', 'event'):
+                        event = _literal(_argument(decorator, 0, 'name')) if isinstance(decorator, ast.Call) else None
+                        manifest.events.append(event or node.name)
+            elif isinstance(node, ast.Call) and _decorator_name(node) in ('add_listener', 'add_event'):
+                event = _literal(_argument(node, 1, 'name'))
+                if event is None:
+                    func = _argument(node, 0, 'func')
+                    if not isinstance(func, ast.Name):
+                        return None
+                    event = func.id
+                manifest.events.append(event)
+            elif isinstance(node, ast.Call) and _decorator_name(node) == 'add_cog':
+                # このモジュールで定義されていないCogのコマンドは調べられない
+                cog = _argument(node, 0, 'cog')
+                if not (isinstance(cog, ast.Call) and isinstance(cog.func, ast.Name) and cog.func.id in classes):
+                    return None
+    except _Unresolvable:
+        return None
+    return manifest or None
+
+
+def scan_extension(name: str) -> Optional[ExtensionManifest]:
+    """
+    拡張のソースコードを実行せずに解析し、登録されるコマンドとリスナーを返します
+
+    Parameters
+    ----------
+    name : str
+        拡張のモジュール名
+
+    Returns
+    -------
+    Optional[ExtensionManifest]
+        コマンドのキーやイベント名がリテラルではない、パッケージや同じパッケージの他のモジュールを読み込んでいる等、
+        静的に全てを調べられない場合はNone
+    """
+
+    spec = importlib.util.find_spec(name)
+    if spec is None or not spec.origin or not spec.origin.endswith('.py'):
+        return None
+    with open(spec.origin, encoding='utf-8') as f:
+        source = f.read()
+    try:
+        tree = ast.parse(source, spec.origin)
+    except SyntaxError:
+        return None
+    if spec.submodule_search_locations is not None and _find_literal_manifest(tree) is None:
+        return None  # パッケージのサブモジュールは__init__.pyからは調べられない
+    return _scan_tree(tree, name)
+
+
+class ExtensionStats:
+    """
+    拡張の読み込みにかかった時間
+
+    Attributes
+    ----------
+    lazy : bool
+        読み込みを遅らせたか
+    scan : float
+        ソースコードの解析にかかった時間(秒)
+    import_time : float
+        モジュールのimportにかかった時間(秒)
+    setup : float
+        setup関数の実行にかかった時間(秒)
+    loaded : bool
+        モジュールを読み込んだか
+    trigger : Optional[str]
+        読み込むきっかけになったコマンドやイベント
+    """
+
+    __slots__ = ('lazy', 'scan', 'import_time', 'setup', 'loaded', 'trigger')
+
+    def __init__(self, lazy: bool = False):
+        self.lazy: bool = lazy
+        self.scan: float = 0.0
+        self.import_time: float = 0.0
+        self.setup: float = 0.0
+        self.loaded: bool = False
+        self.trigger: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'lazy': self.lazy,
+            'scan': self.scan,
+            'import': self.import_time,
+            'setup': self.setup,
+            'loaded': self.loaded,
+            'trigger': self.trigger,
+        }
+
+
+class _LazyCommand(Command):
+    # 初めて一致した際に拡張を読み込み、同じキーの本物のコマンドを実行する
+    def __init__(self, extension: LazyExtension, cmd_type: str, key: str):
+        async def placeholder(ctx: Context):
+            pass
+
+        super().__init__(placeholder, regex=key if cmd_type == 'regex' else None,
+                         text=key if cmd_type == 'text' else None)
+        self.extension: LazyExtension = extension
+        self.cmd_type: str = cmd_type
+        self.key: str = key
+
+    async def invoke(self, ctx: Context, *args, **kwargs):
+        bot = ctx.bot
+        self.extension.load(f'command {self.key}')
+        for cmd in list(bot.all_commands):
+            if (cmd.cmd_type, cmd.key) != (self.cmd_type, self.key) or not self.extension.owns(cmd.func.callback):
+                continue
+            real_ctx = await bot.get_context(ctx.message, cmd)
+            real_ctx.args = ctx.args
+            await cmd.func.invoke(real_ctx)
+
+
+class LazyExtension:
+    """
+    読み込みを遅らせている拡張。
+    ExtensionManifestのコマンドとイベントの代わりを登録し、いずれかが初めて実行された際に拡張を読み込みます
+
+    Parameters
+    ----------
+    bot : BotBase
+    name : str
+        拡張のモジュール名
+    manifest : ExtensionManifest
+    stats : ExtensionStats
+    """
+
+    def __init__(self, bot: BotBase, name: str, manifest: ExtensionManifest, stats: ExtensionStats):
+        self.name: str = name
+        self.manifest: ExtensionManifest = manifest
+        self.stats: ExtensionStats = stats
+        self._bot: BotBase = bot
+        self._commands: List[_LazyCommand] = []
+        self._listeners: List[Tuple[str, Callable[..., Any]]] = []
+
+    def owns(self, func: Any) -> bool:
+        module = getattr(func, '__module__', None)
+        return module is not None and (module == self.name or module.startswith(self.name + '.'))
+
+    def install(self) -> None:
+        """代わりのコマンドとリスナーを登録します"""
+
+        # 同じキーの代わりが複数あると、本物のコマンドが代わりの数だけ実行される
+        for cmd_type, key in dict.fromkeys(self.manifest.commands):
+            command = _LazyCommand(self, cmd_type, key)
+            self._bot.all_commands.append(CMD(cmd_type, key, command, None))
+            self._commands.append(command)
+        self._bot._invalidate_commands()
+        for event in dict.fromkeys(self.manifest.events):
+            listener = self._make_listener(event)
+            self._bot.add_listener(listener, event)
+            self._listeners.append((event, listener))
+
+    def uninstall(self) -> None:
+        """代わりのコマンドとリスナーを削除します"""
+
+        commands = set(map(id, self._commands))
+        self._bot._remove_commands(lambda cmd: id(cmd.func) in commands)
+        for event, listener in self._listeners:
+            self._bot.remove_listener(listener, event)
+        self._commands, self._listeners = [], []
+
+    def _make_listener(self, event: str) -> Callable[..., Any]:
+        name = event[3:] if event.startswith('on_') else event
+
+        async def listener(*args: Any, **kwargs: Any) -> None:
+            self.load(f'event {event}')
+            # きっかけになったイベントを、拡張がadd_listenerやeventで登録したハンドラーに通常と同じレーンで渡す。
+            # 拡張以外のハンドラーは既に受け取っている為、dispatchし直さない
+            bot = self._bot
+            handlers = bot._get_dispatch_table().get(name, ()) + bot._get_special_table().get(name, ())
+            lane = bot._lanes.get_lane(name)
+            for coro, ev in dict.fromkeys(handlers):
+                if self.owns(coro):
+                    lane.put(coro, ev, args, kwargs)
+
+        listener.__name__ = event
+        return listener
+
+    def load(self, trigger: str) -> None:
+        """
+        まだ読み込まれていない場合は、拡張を読み込んでから代わりのコマンドとリスナーを削除します。
+        読み込みに失敗した場合は代わりを残したまま例外を送出し、次に実行された際にもう一度読み込みます
+
+        Parameters
+        ----------
+        trigger : str
+            読み込むきっかけ。ExtensionStats.triggerに記録されます
+        """
+
+        if self._bot._get_lazy_extension(self.name) is not self:
+            return
+        self._bot._import_extension(self.name, self.stats)
+        self._bot._pop_lazy_extension(self.name)
+        self.uninstall()
+        self.stats.trigger = trigger
+        self._bot.logger.debug('loaded extension %s on %s in %.3fs', self.name, trigger,
+                               self.stats.import_time + self.stats.setup)
@@ -1,21 +1,150 @@
 import asyncio
-from typing import Any, Callable, Coroutine, Dict, Optional
+import random
+import sys
+import time
+import traceback
+from datetime import tzinfo
+from typing import Any, Callable, Coroutine, Dict, Optional, Set, Union
 
 from mi.exception import TaskNotRunningError
+from mi.utils import get_module_logger
 
-__all__ = ["Loop", "loop"]
+from .scheduler import *
+
+__all__ = ["Loop", "loop", "Cron", "Scheduler", "get_scheduler"]
+
+_MODES = ('fixed_rate', 'fixed_delay')
+_OVERLAPS = ('skip', 'queue', 'concurrent')
+
+
+class LoopStats:
+    __slots__ = ('runs', 'failures', 'skipped', 'queued', 'runtime', 'max_runtime', 'last_runtime', 'drift',
+                 'max_drift')
+
+    def __init__(self):
+        self.runs: int = 0
+        self.failures: int = 0
+        self.skipped: int = 0
+        self.queued: int = 0
+        self.runtime: float = 0.0
+        self.max_runtime: float = 0.0
+        self.last_runtime: float = 0.0
+        self.drift: float = 0.0
+        self.max_drift: float = 0.0
 
 
 class Loop:
-    def __init__(self, func: Callable[..., Coroutine[Any, Any, Any]], seconds: int = 60,
-                 custom_loop: Optional[asyncio.AbstractEventLoop] = None):
-        self.seconds: int = seconds
+    """
+    関数を一定の間隔、またはcron形式の時刻で繰り返し実行します。
+    全てのLoopはイベントループごとに一つのSchedulerを共有し、Loopごとにタスクを作成して待つことはありません
+
+    Parameters
+    ----------
+    func : Callable[..., Coroutine[Any, Any, Any]]
+    seconds : float, default=60
+        実行する間隔(秒)
+    custom_loop : Optional[asyncio.AbstractEventLoop], default=None
+    mode : str, default='fixed_rate'
+        ``fixed_rate`` は開始時刻から一定の間隔で、関数の実行時間に関わらず時刻がずれません。
+        ``fixed_delay`` は関数が終了してから ``seconds`` 秒後に次を実行します
+    cron : Optional[Union[str, Cron]], default=None
+        指定した場合はsecondsの代わりにcron形式の時刻で実行します
+    jitter : float, default=0
+        実行する時刻を0からjitter秒の間でランダムに遅らせます。時刻のずれは蓄積されません
+    overlap : str, default='skip'
+        前回の実行が終わっていない場合の動作。 ``skip`` は今回を飛ばし、 ``queue`` は前回が終わった後に実行し、
+        ``concurrent`` は並行して実行します
+    backoff : float, default=1
+        例外が発生した場合、次の実行を ``backoff * 2 ** (連続した失敗の回数 - 1)`` 秒後にします。0の場合は通常通り実行します
+    max_backoff : float, default=300
+    count : Optional[int], default=None
+        実行する回数。Noneの場合は停止するまで繰り返します
+    """
+
+    def __init__(self, func: Callable[..., Coroutine[Any, Any, Any]], seconds: float = 60,
+                 custom_loop: Optional[asyncio.AbstractEventLoop] = None, *, mode: str = 'fixed_rate',
+                 cron: Optional[Union[str, Cron]] = None, tz: Optional[tzinfo] = None, jitter: float = 0,
+                 overlap: str = 'skip', backoff: float = 1, max_backoff: float = 300, count: Optional[int] = None):
+        if not asyncio.iscoroutinefunction(func):
+            raise TypeError(f'{func}はコルーチンでなければなりません')
+        if mode not in _MODES:
+            raise ValueError(f'mode must be one of {_MODES}')
+        if overlap not in _OVERLAPS:
+            raise ValueError(f'overlap must be one of {_OVERLAPS}')
+        if cron is None and seconds <= 0:
+            raise ValueError('seconds must be greater than 0')
+        self.seconds: float = seconds
         self.func: Callable[..., Coroutine[Any, Any, Any]] = func
-        self._task: Optional[asyncio.Task[Any]] = None
+        self.mode: str = mode
+        self.cron: Optional[Cron] = Cron(cron, tz) if isinstance(cron, str) else cron
+        self.jitter: float = jitter
+        self.overlap: str = overlap
+        self.backoff: float = backoff
+        self.max_backoff: float = max_backoff
+        self.count: Optional[int] = count
         self.stop_next_iteration = None
         self._loop: Optional[asyncio.AbstractEventLoop] = custom_loop
+        self._options: Dict[str, Any] = {
+            'mode': mode, 'cron': self.cron, 'jitter': jitter, 'overlap': overlap, 'backoff': backoff,
+            'max_backoff': max_backoff, 'count': count
+        }
+        self._instance: Any = None
+        self._name: Optional[str] = None
+        self._error_handler: Optional[Callable[..., Coroutine[Any, Any, Any]]] = None
+        self._scheduler: Optional[Scheduler] = None
+        self._timer = None
+        self._due: float = 0.0
+        self._args: tuple = ()
+        self._kwargs: Dict[str, Any] = {}
+        self._running: Set[asyncio.Task[Any]] = set()
+        self._pending: int = 0
+        self._consecutive_failures: int = 0
+        self._started: int = 0
+        self._task: Optional[asyncio.Future[None]] = None
+        self._stats: LoopStats = LoopStats()
+        self.logger = get_module_logger(__name__)
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self._name = name
+
+    def __get__(self, instance: Any, owner: type) -> 'Loop':
+        # クラスに定義されたLoopは、インスタンスごとにメソッドとして束縛した物を作成する
+        if instance is None:
+            return self
+        bound = Loop(self.func, self.seconds, self._loop, **self._options)
+        bound._instance = instance
+        bound._error_handler = self._error_handler
+        if self._name is not None:
+            setattr(instance, self._name, bound)
+        return bound
 
-    def start(self, *args: tuple[Any], **kwargs: Dict[Any, Any]) -> asyncio.Task[Any]:
+    def error(self, coro: Callable[..., Coroutine[Any, Any, Any]]) -> Callable[..., Coroutine[Any, Any, Any]]:
+        """
+        関数で例外が発生した際に、例外を受け取るコルーチンを登録するデコレータ
+
+        Parameters
+        ----------
+        coro : Callable[..., Coroutine[Any, Any, Any]]
+            ``(exception)`` 、クラスに定義した場合は ``(self, exception)`` で呼ばれます
+        """
+
+        if not asyncio.iscoroutinefunction(coro):
+            raise TypeError(f'{coro}はコルーチンでなければなりません')
+        self._error_handler = coro
+        return coro
+
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def next_iteration(self) -> Optional[float]:
+        """次に実行するまでの秒数"""
+
+        if self._timer is None or self._scheduler is None:
+            return None
+        return max(0.0, self._timer.when - self._scheduler.time())
+
+    def start(self, *args: tuple[Any], **kwargs: Dict[Any, Any]) -> asyncio.Future[None]:
         """
         タスクを開始する
 
@@ -26,15 +155,29 @@ class Loop:
 
         Returns
         -------
-        _task : asyncio.Task[Any]
+        _task : asyncio.Future[None]
+            ループが停止した際に完了します
         """
+
+        if self.is_running():
+            raise RuntimeError('タスクは既に起動しています')
         _loop = asyncio.get_running_loop() if self._loop is None else self._loop  # self._loop が無いなら取得
-        self._task = _loop.create_task(self.task(*args, **kwargs))
+        self._scheduler = get_scheduler(_loop)
+        self._args = args if self._instance is None else (self._instance, *args)
+        self._kwargs = kwargs
+        self.stop_next_iteration = None
+        self._started = 0
+        self._pending = 0
+        self._consecutive_failures = 0
+        self._task = _loop.create_future()
+        self._task.add_done_callback(self._on_task_done)
+        now = self._scheduler.time()
+        self._arm(now + self.cron.delay() if self.cron is not None else now)
         return self._task
 
     def stop(self):
         """
-        タスクを停止
+        タスクを停止。実行中の関数は最後まで実行されます
         """
 
         if self._task is None:
@@ -42,17 +185,179 @@ class Loop:
 
         if not self._task.done():
             self.stop_next_iteration = True
+            self._cancel_timer()
+            self._pending = 0
+            self._finish_if_idle()
+
+    def cancel(self) -> None:
+        """タスクを停止し、実行中の関数もキャンセルします"""
+
+        if self._task is None:
+            raise TaskNotRunningError('タスクは起動していません')
+        self.stop()
+        for task in list(self._running):
+            task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        実行回数や実行時間の統計を返します
+
+        Returns
+        -------
+        Dict[str, Any]
+            runtimeは関数の実行時間、driftは予定した時刻から実際に開始するまでの遅れ(秒)
+        """
+
+        s = self._stats
+        return {
+            'runs': s.runs,
+            'failures': s.failures,
+            'skipped': s.skipped,
+            'queued': s.queued,
+            'mean_runtime': s.runtime / s.runs if s.runs else 0.0,
+            'max_runtime': s.max_runtime,
+            'last_runtime': s.last_runtime,
+            'mean_drift': s.drift / s.runs if s.runs else 0.0,
+            'max_drift': s.max_drift,
+            'next_iteration': self.next_iteration,
+            'running': len(self._running),
+        }
+
+    def _on_task_done(self, future: asyncio.Future[None]) -> None:
+        if future.cancelled():  # start が返したFutureがキャンセルされた場合はループも止める
+            self.stop_next_iteration = True
+            self._cancel_timer()
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._scheduler.cancel(self._timer)
+            self._timer = None
 
-    async def task(self, *args: tuple[Any], **kwargs: Dict[Any, Any]):
+    def _finish_if_idle(self) -> None:
+        if self.stop_next_iteration and not self._running and self._task is not None and not self._task.done():
+            self._task.set_result(None)
+
+    def _exhausted(self) -> bool:
+        return self.count is not None and self._started >= self.count
+
+    def _arm(self, due: float) -> None:
+        self._due = due
+        fire_at = due + (random.uniform(0, self.jitter) if self.jitter > 0 else 0)
+        self._timer = self._scheduler.call_at(fire_at, self._tick)
+
+    def _next_due(self, after: float) -> float:
+        now = self._scheduler.time()
+        if self.cron is not None:
+            return now + self.cron.delay()
+        if self.mode == 'fixed_delay':
+            return now + self.seconds
+        # 予定した時刻を基準に進めるので、関数の実行時間の分だけずれることは無い。遅れた分は飛ばす
+        due = after + self.seconds
+        if due <= now:
+            missed = int((now - due) // self.seconds) + 1
+            self._stats.skipped += missed
+            due += missed * self.seconds
+        return due
+
+    def _tick(self) -> None:
+        self._timer = None
+        if self.stop_next_iteration or self._exhausted():
+            return
+        due = self._due
+        if self._running and self.overlap != 'concurrent':
+            if self.overlap == 'skip':
+                self._stats.skipped += 1
+            else:
+                self._pending += 1
+                self._stats.queued += 1
+        else:
+            self._spawn(due)
+        if self.mode == 'fixed_rate' or self.cron is not None:
+            if not self._exhausted():
+                self._arm(self._next_due(due))
+
+    def _spawn(self, due: float) -> None:
+        self._started += 1
+        task = asyncio.ensure_future(self._run(due), loop=self._scheduler._loop)
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, due: float) -> None:
         while True:
-            if self.stop_next_iteration:
-                return
-            await self.func(self.seconds, *args, **kwargs)
-            await asyncio.sleep(self.seconds)
+            started_at = self._scheduler.time()
+            drift = max(0.0, started_at - due)
+            failed = False
+            clock = time.perf_counter()
+            try:
+                await self.func(*self._args, **self._kwargs)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failed = True
+                await self._handle_error(e)
+            finally:
+                runtime = time.perf_counter() - clock
+                s = self._stats
+                s.runs += 1
+                s.runtime += runtime
+                s.last_runtime = runtime
+                s.max_runtime = max(s.max_runtime, runtime)
+                s.drift += drift
+                s.max_drift = max(s.max_drift, drift)
+            self._after_run(failed)
+            if not self._pending or self.stop_next_iteration or self._exhausted():
+                break
+            self._pending -= 1
+            self._started += 1
+            due = self._scheduler.time()
+        self._running.discard(asyncio.current_task())
+        if self._exhausted() and not self._running:
+            self.stop_next_iteration = True
+        self._finish_if_idle()
+
+    def _after_run(self, failed: bool) -> None:
+        if self.stop_next_iteration or self._exhausted():
+            return
+        if failed:
+            self._consecutive_failures += 1
+            self._stats.failures += 1
+        if failed and self.backoff > 0:
+            delay = min(self.max_backoff, self.backoff * 2 ** (self._consecutive_failures - 1))
+            self._cancel_timer()
+            self._arm(self._scheduler.time() + delay)
+            return
+        if not failed:
+            self._consecutive_failures = 0
+        # fixed_rateのタイマーは_tickで設定済みで、バックオフの後も_tickで元の間隔に戻る
+        if self.mode == 'fixed_delay' and self.cron is None:
+            self._arm(self._next_due(self._due))
+
+    async def _handle_error(self, exception: Exception) -> None:
+        if self._error_handler is None:
+            print(f'Unhandled exception in task {self.func.__qualname__}', file=sys.stderr)
+            traceback.print_exception(type(exception), exception, exception.__traceback__)
+            return
+        args = (exception,) if self._instance is None else (self._instance, exception)
+        try:
+            await self._error_handler(*args)
+        except Exception:
+            self.logger.exception('error handler of %s failed', self.func.__qualname__)
+
+
+def loop(n: float = 60, custom_loop: Optional[asyncio.AbstractEventLoop] = None, **options: Any):
+    """
+    関数をLoopに変換するデコレータ
 
+    Parameters
+    ----------
+    n : float, default=60
+        実行する間隔(秒)
+    custom_loop : Optional[asyncio.AbstractEventLoop], default=None
+    **options : Any
+        mode, cron, tz, jitter, overlap, backoff, max_backoff, count。詳細はLoopを参照してください
+    """
 
-def loop(n: int, custom_loop: Optional[asyncio.AbstractEventLoop] = None):
     def _deco(f: Callable[..., Coroutine[Any, Any, Any]]) -> Loop:
-        return Loop(f, n, custom_loop=custom_loop)
+        return Loop(f, n, custom_loop=custom_loop, **options)
 
     return _deco
@@ -0,0 +1,235 @@
+"""全てのLoopが共有するタイマーと、cron形式の実行時刻"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import weakref
+from datetime import datetime, timedelta, tzinfo
+from typing import Callable, FrozenSet, List, Optional, Tuple
+
+__all__ = ('Cron', 'Scheduler', 'get_scheduler')
+
+
+class _Timer:
+    __slots__ = ('when', 'callback', 'cancelled')
+
+    def __init__(self, when: float, callback: Callable[[], None]):
+        self.when: float = when
+        self.callback: Callable[[], None] = callback
+        self.cancelled: bool = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class Scheduler:
+    """
+    一つのイベントループで、全てのLoopのタイマーをヒープで管理します。
+    イベントループに登録するタイマーは最も早い物の一つだけです
+
+    Parameters
+    ----------
+    loop : asyncio.AbstractEventLoop
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop: asyncio.AbstractEventLoop = loop
+        self._heap: List[Tuple[float, int, _Timer]] = []
+        self._counter = itertools.count()
+        self._cancelled: int = 0
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._handle_when: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._heap) - self._cancelled
+
+    def time(self) -> float:
+        return self._loop.time()
+
+    def call_at(self, when: float, callback: Callable[[], None]) -> _Timer:
+        """
+        イベントループの時刻whenにcallbackを呼び出します
+
+        Parameters
+        ----------
+        when : float
+            loop.time()と同じ基準の時刻
+        callback : Callable[[], None]
+
+        Returns
+        -------
+        _Timer
+            cancelで取り消せます
+        """
+
+        timer = _Timer(when, callback)
+        heapq.heappush(self._heap, (when, next(self._counter), timer))
+        self._arm()
+        return timer
+
+    def cancel(self, timer: _Timer) -> None:
+        if timer.cancelled:
+            return
+        timer.cancel()
+        self._cancelled += 1
+        # 取り消されたタイマーが半分を超えたら作り直し、ヒープが大きくなり続けないようにする
+        if self._cancelled > 64 and self._cancelled * 2 > len(self._heap):
+            self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+        self._arm()
+
+    def _arm(self) -> None:
+        heap = self._heap
+        while heap and heap[0][2].cancelled:
+            heapq.heappop(heap)
+            self._cancelled -= 1
+        if not heap:
+            if self._handle is not None:
+                self._handle.cancel()
+                self._handle = self._handle_when = None
+            return
+        when = heap[0][0]
+        if self._handle is not None:
+            if self._handle_when == when:
+                return
+            self._handle.cancel()
+        self._handle_when = when
+        self._handle = self._loop.call_at(when, self._fire)
+
+    def _fire(self) -> None:
+        self._handle = self._handle_when = None
+        now = self._loop.time()
+        heap = self._heap
+        due: List[_Timer] = []
+        while heap and heap[0][0] <= now:
+            timer = heapq.heappop(heap)[2]
+            if timer.cancelled:
+                self._cancelled -= 1
+            else:
+                due.append(timer)
+        for timer in due:
+            timer.cancelled = True  # 実行済みのタイマーをcancelしても数がずれないようにする
+            timer.callback()
+        self._arm()
+
+
+_schedulers: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Scheduler] = weakref.WeakKeyDictionary()
+
+
+def get_scheduler(loop: Optional[asyncio.AbstractEventLoop] = None) -> Scheduler:
+    """
+    イベントループで共有するSchedulerを返します
+
+    Parameters
+    ----------
+    loop : Optional[asyncio.AbstractEventLoop], default=None
+        Noneの場合は実行中のイベントループ
+
+    Returns
+    -------
+    Scheduler
+    """
+
+    loop = asyncio.get_running_loop() if loop is None else loop
+    scheduler = _schedulers.get(loop)
+    if scheduler is None:
+        scheduler = _schedulers[loop] = Scheduler(loop)
+    return scheduler
+
+
+def _parse_field(field: str, minimum: int, maximum: int) -> FrozenSet[int]:
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f'invalid step: {field}')
+        if part == '*':
+            start, end = minimum, maximum
+        elif '-' in part:
+            start_text, end_text = part.split('-', 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = int(part)
+            end = maximum if step != 1 else start
+        if start < minimum or end > maximum or start > end:
+            raise ValueError(f'{field} is out of range {minimum}-{maximum}')
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class Cron:
+    """
+    ``分 時 日 月 曜日`` のcron形式で実行する時刻を表します。
+    各項目には ``*`` , ``*/5`` , ``1-5`` , ``0,30`` 等を指定でき、曜日は0(または7)が日曜日です
+
+    Parameters
+    ----------
+    expression : str
+        例: ``0 9 * * 1-5`` (平日の9時)
+    tz : Optional[tzinfo], default=None
+        時刻のタイムゾーン。Noneの場合はローカル時刻
+    """
+
+    def __init__(self, expression: str, tz: Optional[tzinfo] = None):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f'cron expression must have 5 fields: {expression}')
+        self.expression: str = expression
+        self.tz: Optional[tzinfo] = tz
+        self.minutes = _parse_field(fields[0], 0, 59)
+        self.hours = _parse_field(fields[1], 0, 23)
+        self.days = _parse_field(fields[2], 1, 31)
+        self.months = _parse_field(fields[3], 1, 12)
+        self.weekdays = frozenset(day % 7 for day in _parse_field(fields[4], 0, 7))
+        self._any_day = fields[2] == '*'
+        self._any_weekday = fields[4] == '*'
+
+    def __repr__(self) -> str:
+        return f'<Cron {self.expression!r}>'
+
+    def _day_matches(self, dt: datetime) -> bool:
+        day = dt.day in self.days
+        weekday = (dt.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday  # 日と曜日の両方が指定された場合はどちらかに一致すれば良い
+
+    def next_after(self, dt: datetime) -> datetime:
+        """
+        dtより後で、最初に一致する時刻を返します
+
+        Parameters
+        ----------
+        dt : datetime
+
+        Returns
+        -------
+        datetime
+        """
+
+        dt = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        for _ in range(100000):
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+            elif dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+            elif dt.minute not in self.minutes:
+                later = [minute for minute in self.minutes if minute > dt.minute]
+                dt = dt.replace(minute=min(later)) if later else dt.replace(minute=0) + timedelta(hours=1)
+            else:
+                return dt
+        raise ValueError(f'{self.expression} never matches')
+
+    def delay(self) -> float:
+        """次に一致する時刻までの秒数"""
+
+        now = datetime.now(self.tz)
+        return (self.next_after(now) - now).total_seconds()
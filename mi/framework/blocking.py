@@ -0,0 +1,170 @@
+"""ハンドラーがイベントループを止めていた時間の計測"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Coroutine, Dict, Generator, Optional
+
+__all__ = ('HandlerStats', 'HandlerProfiler', 'measure_blocking')
+
+
+class HandlerStats:
+    """
+    一つのハンドラーの統計
+
+    Attributes
+    ----------
+    calls : int
+        実行された回数
+    errors : int
+        例外で終了した回数
+    blocking : float
+        イベントループ上で処理していた時間の合計(秒)。awaitで待っていた時間と、
+        コマンド等の中で別に計測されたハンドラーの時間は含みません
+    max_blocking : float
+        一度の処理でイベントループを止めていた最長の時間(秒)
+    offloaded : float
+        エグゼキューターで実行していた時間の合計(秒)
+    """
+
+    __slots__ = ('calls', 'errors', 'blocking', 'max_blocking', 'offloaded')
+
+    def __init__(self):
+        self.calls: int = 0
+        self.errors: int = 0
+        self.blocking: float = 0.0
+        self.max_blocking: float = 0.0
+        self.offloaded: float = 0.0
+
+    def record_step(self, elapsed: float) -> None:
+        self.blocking += elapsed
+        if elapsed > self.max_blocking:
+            self.max_blocking = elapsed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'blocking': self.blocking,
+            'max_blocking': self.max_blocking,
+            'mean_blocking': self.blocking / self.calls if self.calls else 0.0,
+            'offloaded': self.offloaded,
+        }
+
+
+class _Nesting(threading.local):
+    # 実行中のsend/throwの中で、入れ子の_MeasuredCoroutineが計測した時間
+    inner: float = 0.0
+
+
+_nesting = _Nesting()
+
+
+class _MeasuredCoroutine:
+    # コルーチンを一段ずつ進め、send/throwにかかった時間をイベントループを止めていた時間として数える。
+    # on_mentionから実行されるコマンドのように入れ子で計測される場合、内側の時間は外側に数えない
+    __slots__ = ('_coro', '_stats')
+
+    def __init__(self, coro: Coroutine[Any, Any, Any], stats: HandlerStats):
+        self._coro = coro
+        self._stats = stats
+
+    def __await__(self) -> Generator[Any, Any, Any]:
+        coro, stats = self._coro, self._stats
+        stats.calls += 1
+        value: Any = None
+        error: Optional[BaseException] = None
+        nesting = _nesting
+        while True:
+            outer, nesting.inner = nesting.inner, 0.0
+            started_at = time.perf_counter()
+            try:
+                if error is None:
+                    yielded = coro.send(value)
+                else:
+                    yielded = coro.throw(error)
+            except StopIteration as e:
+                self._record(started_at, outer)
+                return e.value
+            except BaseException:
+                self._record(started_at, outer)
+                stats.errors += 1
+                raise
+            self._record(started_at, outer)
+            try:
+                value, error = (yield yielded), None
+            except BaseException as e:
+                value, error = None, e
+
+    def _record(self, started_at: float, outer: float) -> None:
+        elapsed = time.perf_counter() - started_at
+        self._stats.record_step(elapsed - _nesting.inner)
+        _nesting.inner = outer + elapsed
+
+
+def measure_blocking(coro: Coroutine[Any, Any, Any], stats: HandlerStats) -> _MeasuredCoroutine:
+    """
+    コルーチンの実行中にイベントループを止めていた時間をstatsに記録します
+
+    Parameters
+    ----------
+    coro : Coroutine
+        実行するコルーチン
+    stats : HandlerStats
+        記録先
+
+    Returns
+    -------
+    Awaitable
+        coroの代わりにawaitする物
+    """
+
+    return _MeasuredCoroutine(coro, stats)
+
+
+class HandlerProfiler:
+    """
+    ハンドラーの名前ごとにHandlerStatsを保持します
+
+    Parameters
+    ----------
+    enabled : bool, default=False
+        Trueの場合のみ計測します。Falseの場合はそのまま実行します
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled: bool = enabled
+        self._stats: Dict[str, HandlerStats] = {}
+
+    @staticmethod
+    def handler_name(func: Callable[..., Any]) -> str:
+        return f'{getattr(func, "__module__", None)}.{getattr(func, "__qualname__", repr(func))}'
+
+    def get(self, name: str) -> HandlerStats:
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = HandlerStats()
+        return stats
+
+    async def run(self, func: Callable[..., Coroutine[Any, Any, Any]], *args: Any, **kwargs: Any) -> Any:
+        """funcを実行し、イベントループを止めていた時間を記録します"""
+
+        if not self.enabled:
+            return await func(*args, **kwargs)
+        return await measure_blocking(func(*args, **kwargs), self.get(self.handler_name(func)))
+
+    def get_for(self, func: Callable[..., Any]) -> Optional[HandlerStats]:
+        """計測する場合はfuncのHandlerStatsを、しない場合はNoneを返します"""
+
+        return self.get(self.handler_name(func)) if self.enabled else None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns
+        -------
+        Dict[str, Dict[str, Any]]
+            ハンドラーの名前と統計
+        """
+
+        return {name: stats.to_dict() for name, stats in self._stats.items()}
@@ -6,7 +6,7 @@ import inspect
 import re
 import sys
 import traceback
-from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Coroutine, Dict, List, Optional, Tuple, Union
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, Dict, List, Optional, Tuple, Union
 from mi.exception import WebSocketRecconect
 
 import mi.framework.http
@@ -16,20 +16,32 @@ from mi import config
 from mi.framework.models.chat import Chat
 from mi.framework.models.instance import Instance, InstanceMeta
 from mi.framework.models.note import Note
+from mi.framework.models.notification import Notification
+from mi.framework.blocking import HandlerProfiler
+from mi.framework.filters import NoteFilter
+from mi.framework.lanes import LaneScheduler
+from mi.framework.loader import UserLoaderSession
+from mi.framework.notifications import NotificationReadBatcher
+from mi.framework.pagination import CursorPaginator
+from mi.framework.recorder import FrameRecorder, FrameReplayer
 from mi.framework.models.user import User
 from mi.framework.state import ConnectionState
 from mi.utils import get_module_logger
+from mi.wrapper.models.note import RawNote
 from mi.wrapper.models.user import RawUser
 
 from .gateway import MisskeyWebSocket
+from .polling import PollingEventSource
 
 if TYPE_CHECKING:
     from . import File
 
 
 class Client:
-    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None, **options: Dict[Any, Any]):
-        super().__init__(**options)
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None, **options: Any):
+        super().__init__()
+        self.options: Dict[str, Any] = options
+        self.transport: str = options.get('transport', 'websocket')
         self.url = None
         self.extra_events: Dict[str, Any] = {}
         self.special_events: Dict[str, Any] = {}
@@ -41,9 +53,21 @@ class Client:
         self.user: User = None
         self.logger = get_module_logger(__name__)
         self.ws: MisskeyWebSocket = None
+        self._lanes: LaneScheduler = LaneScheduler(self._run_event, lanes=options.get('lanes'),
+                                                   event_lanes=options.get('event_lanes'))
+        self._dispatch_table: Optional[Dict[str, Tuple[Tuple[Callable[..., Any], Any], ...]]] = None
+        self._special_table: Optional[Dict[str, Tuple[Tuple[Callable[..., Any], Any], ...]]] = None
+        self._profiler: HandlerProfiler = HandlerProfiler(options.get('track_handlers', False))
+        self.notification_reads: NotificationReadBatcher = NotificationReadBatcher(
+            interval=options.get('notification_read_interval', 1)
+        )
+        self.recorder: Optional[FrameRecorder] = FrameRecorder(options['record']) if options.get('record') else None
+        UserLoaderSession.configure(delay=options.get('user_batch_delay'), ttl=options.get('user_cache_ttl'))
+        if options.get('http_transport') is not None:
+            self.http.set_transport(options['http_transport'])
 
     def _get_state(self, **options: Any) -> ConnectionState:
-        return ConnectionState(dispatch=self.dispatch, loop=self.loop, client=self)
+        return ConnectionState(dispatch=self.dispatch, loop=self.loop, client=self, **options)
 
     async def on_ready(self, ws: ClientWebSocketResponse):
         """
@@ -70,6 +94,65 @@ class Client:
             self.special_events[name].append(func)
         else:
             self.special_events[name] = [func]
+        self._invalidate_listeners()
+
+    def _invalidate_listeners(self) -> None:
+        """リスナーが変更された際にディスパッチテーブルを破棄します"""
+        self._dispatch_table = None
+        self._special_table = None
+
+    @staticmethod
+    def _resolve_listener(ev: str, event: Any) -> Tuple[Callable[..., Any], Any]:
+        if inspect.ismethod(event):
+            return event, event.__name__
+        foo = importlib.import_module(event.__module__)
+        return getattr(foo, ev, event), event
+
+    def _build_dispatch_table(self) -> None:
+        """
+        イベント名ごとに呼び出すコルーチン関数のタプルを作成します。
+        リスナーやCogが変更されるまで再利用されます
+        """
+
+        dispatch_table: Dict[str, List[Tuple[Callable[..., Any], Any]]] = {}
+        special_table: Dict[str, List[Tuple[Callable[..., Any], Any]]] = {}
+        for ev, events in self.extra_events.items():
+            dispatch_table.setdefault(ev[3:], []).extend(self._resolve_listener(ev, event) for event in events)
+        for ev, events in self.special_events.items():
+            special_table.setdefault(ev[3:], []).extend(self._resolve_listener(ev, event) for event in events)
+        for ev in dir(self):
+            if ev.startswith('on_') and callable(method := getattr(self, ev, None)):
+                dispatch_table.setdefault(ev[3:], []).append((method, ev))
+                special_table.setdefault(ev[3:], []).append((method, ev))
+        self._dispatch_table = {name: tuple(handlers) for name, handlers in dispatch_table.items()}
+        self._special_table = {name: tuple(handlers) for name, handlers in special_table.items()}
+
+    def _get_dispatch_table(self) -> Dict[str, Tuple[Tuple[Callable[..., Any], Any], ...]]:
+        if self._dispatch_table is None:
+            self._build_dispatch_table()
+        return self._dispatch_table
+
+    def _get_special_table(self) -> Dict[str, Tuple[Tuple[Callable[..., Any], Any], ...]]:
+        if self._special_table is None:
+            self._build_dispatch_table()
+        return self._special_table
+
+    def is_listening(self, event_name: str) -> bool:
+        """
+        イベントを受け取るリスナーが存在するかを返します
+
+        Parameters
+        ----------
+        event_name : str
+            イベント名(on_ を除いたもの)
+
+        Returns
+        -------
+        bool
+            リスナーが存在するか否か
+        """
+
+        return event_name in self._get_dispatch_table() or event_name in self._get_special_table()
 
     def listen(self, name: Optional[str] = None):
         def decorator(func: Coroutine[Any, Any, Any]):
@@ -87,6 +170,7 @@ class Client:
             self.extra_events[name].append(func)
         else:
             self.extra_events[name] = [func]
+        self._invalidate_listeners()
 
     def event_dispatch(self, event_name: str, *args: Tuple[Any], **kwargs: Dict[Any, Any]) -> bool:
         """
@@ -103,39 +187,184 @@ class Client:
 
         """
 
-        ev = "on_" + event_name
-        for event in self.special_events.get(ev, []):
-            foo = importlib.import_module(event.__module__)
-            coro = getattr(foo, ev)
-            self.schedule_event(coro, event, *args, **kwargs)
-        if ev in dir(self):
-            self.schedule_event(getattr(self, ev), ev, *args, **kwargs)
-        return ev in dir(self)
-
-    def dispatch(self, event_name: str, *args: tuple[Any], **kwargs: Dict[Any, Any]):
-        ev = "on_" + event_name
-        for event in self.extra_events.get(ev, []):
-            if inspect.ismethod(event):
-                coro = event
-                event = event.__name__
-            else:
-                foo = importlib.import_module(event.__module__)
-                coro = getattr(foo, ev)
-            self.schedule_event(coro, event, *args, **kwargs)
-        if ev in dir(self):
-            self.schedule_event(getattr(self, ev), ev, *args, **kwargs)
+        handlers = self._get_special_table().get(event_name, ())
+        lane = self._lanes.get_lane(event_name)
+        for coro, event in handlers:
+            lane.put(coro, event, args, kwargs)
+        return bool(handlers)
+
+    def dispatch(self, event_name: str, *args: Any, lane_key: Optional[str] = None, **kwargs: Any):
+        """
+        イベントを発火させます
+
+        Parameters
+        ----------
+        event_name : str
+            イベント名(on_ を除いたもの)
+        lane_key : Optional[str], default=None
+            実行するレーンを選ぶ際のキー。指定しない場合はevent_nameが使われます
+        """
+
+        handlers = self._get_dispatch_table().get(event_name)
+        if not handlers:
+            return
+        lane = self._lanes.get_lane(lane_key or event_name)
+        for coro, event in handlers:
+            lane.put(coro, event, args, kwargs)
 
     def schedule_event(
             self,
             coro: Callable[..., Coroutine[Any, Any, Any]],
             event_name: str,
-            *args: tuple[Any],
-            **kwargs: Dict[Any, Any],
-    ) -> asyncio.Task[Any]:
-        return self.loop.create_task(
-            self._run_event(coro, event_name, *args, **kwargs),
-            name=f"MI.py: {event_name}",
-        )
+            *args: Any,
+            **kwargs: Any,
+    ) -> asyncio.Future[Any]:
+        return self._lanes.schedule(event_name, coro, event_name, args, kwargs)
+
+    def lane_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        イベントレーンごとの待ち時間などの統計を返します
+
+        Returns
+        -------
+        Dict[str, Dict[str, float]]
+            レーン名と統計
+        """
+
+        return self._lanes.stats()
+
+    def handler_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        ハンドラーごとの実行回数や、イベントループを止めていた時間の統計を返します
+
+        Returns
+        -------
+        Dict[str, Dict[str, Any]]
+            ハンドラーの名前と統計。 ``track_handlers`` オプションがTrueの場合のみ計測します
+        """
+
+        return self._profiler.stats()
+
+    def frame_stats(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """
+        WebSocketで受信したフレームのtypeごとの数を返します
+
+        Returns
+        -------
+        Dict[str, Dict[str, Dict[str, int]]]
+            処理した数、リスナーが無い為に省略した数、未知のtypeの数
+        """
+
+        return self._connection.frame_stats()
+
+    def start_recording(self, path: str, *, compress: Optional[bool] = None) -> FrameRecorder:
+        """
+        WebSocketで受信したフレームをファイルに記録し始めます
+
+        Parameters
+        ----------
+        path : str
+            記録するファイル。既に存在する場合は追記します
+        compress : Optional[bool], default=None
+            gzipで圧縮するか。Noneの場合はpathが ``.gz`` で終わる場合に圧縮します
+
+        Returns
+        -------
+        FrameRecorder
+        """
+
+        self.stop_recording()
+        self.recorder = FrameRecorder(path, compress=compress)
+        return self.recorder
+
+    def stop_recording(self) -> None:
+        """
+        フレームの記録を終了します。記録したフレームが全て書き込まれるまで待ちます
+        """
+
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    async def replay(self, path: str, *, speed: Optional[float] = 1, compress: Optional[bool] = None) -> int:
+        """
+        start_recordingで記録したフレームを再生し、受信した時と同じようにイベントを発火させます。
+        WebSocketに接続せずに使えます
+
+        Parameters
+        ----------
+        path : str
+            記録したファイル
+        speed : Optional[float], default=1
+            再生速度。Noneの場合はできるだけ速く再生します
+        compress : Optional[bool], default=None
+            gzipで圧縮されているか
+
+        Returns
+        -------
+        int
+            再生したフレームの数
+        """
+
+        return await FrameReplayer(path, self._connection, speed=speed, compress=compress).replay()
+
+    def overload_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        過負荷時の間引きの統計を返します
+
+        Returns
+        -------
+        Optional[Dict[str, Any]]
+            ``overload`` オプションが有効でない場合はNone
+        """
+
+        overload = self._connection.overload
+        return overload.stats() if overload is not None else None
+
+    def filter(self, **conditions: Any) -> NoteFilter:
+        """
+        タイムラインのノートに対するフィルターを登録します。
+        フィルターはノートのモデルを生成する前に判定され、登録されたフィルターのいずれにも一致しないノートは破棄されます
+
+        Parameters
+        ----------
+        **conditions : Any
+            ``channel`` , ``host`` , ``user_id`` , ``visibility`` , ``has_files`` , ``text_regex`` ,
+            ``exclude_bots`` , ``exclude_renotes`` 。詳細は NoteFilter を参照してください
+
+        Returns
+        -------
+        NoteFilter
+            登録したフィルター。 ``hits`` と ``misses`` で一致した数を確認できます
+
+        Examples
+        --------
+        >>> client.filter(channel='global', host=None, has_files=True, exclude_bots=True)
+        """
+
+        return self._connection.filters.add(NoteFilter(**conditions))
+
+    def remove_filter(self, note_filter: NoteFilter) -> None:
+        """
+        filterで登録したフィルターを削除します
+
+        Parameters
+        ----------
+        note_filter : NoteFilter
+        """
+
+        self._connection.filters.remove(note_filter)
+
+    def filter_stats(self) -> Dict[str, Any]:
+        """
+        フィルターごとの一致した数と、破棄したノートの数を返します
+
+        Returns
+        -------
+        Dict[str, Any]
+        """
+
+        return self._connection.filters.stats()
 
     async def _run_event(
             self,
@@ -145,7 +374,7 @@ class Client:
             **kwargs: Any,
     ) -> None:
         try:
-            await coro(*args, **kwargs)
+            await self._profiler.run(coro, *args, **kwargs)
         except asyncio.CancelledError:
             pass
         except Exception:
@@ -162,13 +391,64 @@ class Client:
     async def on_error(self, err):
         self.event_dispatch("error", err)
 
+    def _on_message(self, message):
+        self.dispatch('message', message)
+
+    async def capture_note(self, note: Union[Note, str]) -> None:
+        """
+        ノートをキャプチャし、リアクションや投票、削除を on_note_reacted 等のイベントで受け取れるようにします。
+        同じノートを複数回キャプチャした場合は、同じ回数 release_note を呼ぶまでキャプチャが続きます
+
+        Parameters
+        ----------
+        note : Union[Note, str]
+            キャプチャするノート、またはノートのID。Noteを渡した場合はそのノートのリアクション等も更新されます
+        """
+
+        if isinstance(note, str):
+            await self._connection.captures.capture(note)
+        else:
+            await self._connection.captures.capture(note.id, note)
+
+    async def release_note(self, note_id: str, *, force: bool = False) -> None:
+        """
+        capture_noteでキャプチャしたノートのキャプチャを解除します
+
+        Parameters
+        ----------
+        note_id : str
+        force : bool, default=False
+            キャプチャした回数に関わらず解除するか
+        """
+
+        await self._connection.captures.release(note_id, force=force)
+
+    def read_notification(self, notification: Union[Notification, str]) -> None:
+        """
+        通知を既読にします。既読は ``notification_read_interval`` 秒ごとにまとめて送信されます
+
+        Parameters
+        ----------
+        notification : Union[Notification, str]
+            既読にする通知、または通知のID
+        """
+
+        self.notification_reads.add(notification if isinstance(notification, str) else notification.id)
+
+    def read_all_notifications(self) -> None:
+        """
+        全ての通知を既読にします。既読は次の送信でまとめて送信されます
+        """
+
+        self.notification_reads.mark_all()
+
     # ここからクライアント操作
 
     @property
     def client(self) -> manager.ClientActions:
         return manager.ClientActions()
 
-    async def get_user_notes(
+    def get_user_notes(
             self,
             user_id: str,
             *,
@@ -183,11 +463,41 @@ class Client:
             file_type: Optional[List[str]] = None,
             since_date: int = 0,
             until_data: int = 0
-    ) -> AsyncIterator[Note]:
-        return self._connection.get_user_notes(user_id=user_id, since_id=since_id, include_my_renotes=include_my_renotes,
-                                               include_replies=include_replies, with_files=with_files,
-                                               until_id=until_id, limit=limit, get_all=get_all, exclude_nsfw=exclude_nsfw,
-                                               file_type=file_type, since_date=since_date, until_data=until_data)
+    ) -> CursorPaginator[Note]:
+        """
+        ユーザーのノートを取得します
+
+        Parameters
+        ----------
+        user_id : str
+            ユーザーのID
+        limit : int, default=10
+            取得する上限
+        get_all : bool, default=False
+            Trueの場合はlimitに関わらず全て取得します
+        since_date : int, default=0
+            UNIX時間(ミリ秒)。0の場合は指定しません
+        until_data : int, default=0
+            UNIX時間(ミリ秒)。0の場合は指定しません
+
+        Returns
+        -------
+        CursorPaginator[Note]
+            ``async for`` で一件ずつ、 ``await`` でlistとして取得できます。次のページは先読みされます
+        """
+
+        params = {
+            'userId': user_id,
+            'includeReplies': include_replies,
+            'includeMyRenotes': include_my_renotes,
+            'withFiles': with_files,
+            'fileType': file_type,
+            'excludeNsfw': exclude_nsfw
+        }
+        page_size = 100 if get_all else max(1, min(limit, 100))
+        return CursorPaginator('/api/users/notes', params, lambda i: Note(RawNote(i)), limit=None if get_all else limit,
+                               page_size=page_size, since_id=since_id, until_id=until_id,
+                               since_date=since_date or None, until_date=until_data or None)
 
     async def get_instance(self, host: Optional[str] = None) -> Union[Instance, InstanceMeta]:
         """
@@ -258,12 +568,18 @@ class Client:
 
     async def connect(self, *, reconnect: bool = True, timeout: int = 60, event_name: str='ready') -> None:
 
-        coro = MisskeyWebSocket.from_client(self, timeout=timeout, event_name=event_name)
+        source = PollingEventSource if self.transport == 'polling' else MisskeyWebSocket
+        coro = source.from_client(self, timeout=timeout, event_name=event_name)
         try:
             self.ws = await asyncio.wait_for(coro, timeout=60)
         except asyncio.exceptions.TimeoutError:
             await self.connect(reconnect=reconnect, timeout=timeout)
 
+        if event_name == 'reconnect':
+            await self._connection.captures.resubscribe()
+            if self._connection.resume is not None:
+                asyncio.create_task(self._connection.resume.backfill(), name='MI.py: resume')
+
         while True:
             try:
                 await self.ws.poll_event()
@@ -271,24 +587,8 @@ class Client:
                 await self.connect(event_name='reconnect')
 
 
-    async def start(self, url: str, token: str, *, debug: bool = False, reconnect: bool = True, timeout: int = 60,
-                    is_ayuskey: bool = False):
-        """
-        Starting Bot
-
-        Parameters
-        ----------
-        url: str
-            Misskey Instance Websocket URL (wss://example.com)
-        token: str
-            User Token
-        debug: bool, default False
-            debugging mode
-        reconnect: bool, default True
-            coming soon...
-        timeout: int, default 60
-            Time until websocket times out
-        """
+    def _configure(self, url: str, token: str, *, debug: bool = False, is_ayuskey: bool = False) -> None:
+        """接続先のURLとトークンを元に設定を行います"""
 
         self.token = token
         if _origin_uri := re.search(r"wss?://(.*)/streaming", url):
@@ -309,5 +609,48 @@ class Client:
         config.i = config.Config(**auth_i)
         config.debug = debug
         config.is_ayuskey = is_ayuskey
-        await self.login(token)
-        await self.connect(reconnect=reconnect, timeout=timeout)
+
+    async def start(self, url: str, token: str, *, debug: bool = False, reconnect: bool = True, timeout: int = 60,
+                    is_ayuskey: bool = False, transport: Optional[str] = None):
+        """
+        Starting Bot
+
+        Parameters
+        ----------
+        url: str
+            Misskey Instance Websocket URL (wss://example.com)
+        token: str
+            User Token
+        debug: bool, default False
+            debugging mode
+        reconnect: bool, default True
+            coming soon...
+        timeout: int, default 60
+            Time until websocket times out
+        transport: Optional[str], default None
+            'websocket' or 'polling'. If None, the transport option of Client is used
+        """
+
+        if transport is not None:
+            self.transport = transport
+        self._configure(url, token, debug=debug, is_ayuskey=is_ayuskey)
+        try:
+            await self.login(token)
+            await self.connect(reconnect=reconnect, timeout=timeout)
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """
+        接続を閉じてイベントの実行を止め、送信を待っている既読と記録を待っているフレームを書き出してからセッションを閉じます
+        """
+
+        if self.ws is not None:
+            await self.ws.socket.close()
+        self._lanes.close()
+        self._connection.captures.close()
+        if self.recorder is not None:
+            recorder, self.recorder = self.recorder, None
+            await asyncio.get_running_loop().run_in_executor(None, recorder.close)
+        await self.notification_reads.close()
+        await self.http.close_session()
@@ -0,0 +1,259 @@
+"""ユーザーのノートを、モデルを作らずにJSON Linesのファイルへ書き出す仕組み"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from typing import IO, Any, Dict, List, Optional
+
+from mi.framework.http import HTTPSession
+from mi.framework.pagination import CursorPaginator, DateLike, _created_millis, _to_millis
+from mi.framework.recorder import _open
+from mi.framework.router import Route
+from mi.utils import get_module_logger
+
+__all__ = ('ExportStats', 'NoteExporter')
+
+
+class _Window:
+    __slots__ = ('since', 'until', 'until_id', 'done', 'notes')
+
+    def __init__(self, since: Optional[int], until: Optional[int], until_id: Optional[str] = None,
+                 done: bool = False, notes: int = 0):
+        self.since: Optional[int] = since
+        self.until: Optional[int] = until
+        self.until_id: Optional[str] = until_id
+        self.done: bool = done
+        self.notes: int = notes
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'since': self.since, 'until': self.until, 'until_id': self.until_id, 'done': self.done,
+                'notes': self.notes}
+
+
+class ExportStats:
+    """
+    書き出しの進み具合
+
+    Attributes
+    ----------
+    notes : int
+        今回書き出したノートの数
+    bytes : int
+        今回書き出したバイト数(圧縮前)
+    pages : int
+        送信したリクエストの数
+    elapsed : float
+        経過時間(秒)
+    windows : int
+        期間の分割数
+    finished_windows : int
+        書き出しが終わった期間の数
+    resumed : bool
+        チェックポイントから再開したか
+    """
+
+    __slots__ = ('notes', 'bytes', 'pages', 'elapsed', 'windows', 'finished_windows', 'resumed')
+
+    def __init__(self) -> None:
+        self.notes: int = 0
+        self.bytes: int = 0
+        self.pages: int = 0
+        self.elapsed: float = 0.0
+        self.windows: int = 0
+        self.finished_windows: int = 0
+        self.resumed: bool = False
+
+    @property
+    def notes_per_second(self) -> float:
+        return self.notes / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'notes': self.notes,
+            'bytes': self.bytes,
+            'pages': self.pages,
+            'elapsed': self.elapsed,
+            'windows': self.windows,
+            'finished_windows': self.finished_windows,
+            'resumed': self.resumed,
+            'notes_per_second': self.notes_per_second,
+            'bytes_per_second': self.bytes_per_second,
+        }
+
+
+class NoteExporter:
+    """
+    ユーザーのノートを ``/api/users/notes`` から取得し、受け取ったままのJSONを一行ずつファイルに書き出します。
+    Noteは作らず、保持するのは期間ごとに最大で二ページ分です。
+
+    書き出したノートの位置(untilId)は定期的にチェックポイントファイルに保存され、
+    同じ引数で再度実行すると途中から再開します。圧縮しない場合は最後のチェックポイントより後に書かれた行を切り捨てますが、
+    gzipの場合は切り捨てられないため、中断した位置の前後のノートが重複することがあります。
+    全て書き出すとチェックポイントファイルは削除されます
+
+    Parameters
+    ----------
+    user_id : str
+        ユーザーのID
+    path : str
+        書き出すファイル。既にある場合は追記します
+    compress : Optional[bool], default=None
+        gzipで圧縮するか。Noneの場合はpathが ``.gz`` で終わる場合に圧縮します
+    checkpoint_path : Optional[str], default=None
+        チェックポイントファイル。Noneの場合は ``path + '.checkpoint'``
+    since_date : Optional[Union[datetime, int]], default=None
+        この時刻より後のノートだけを書き出します
+    until_date : Optional[Union[datetime, int]], default=None
+        この時刻より前のノートだけを書き出します
+    windows : int, default=1
+        期間を等分し、それぞれを並行して取得する数。2以上でsince_dateが無い場合はユーザーの作成日時から分割します
+    page_size : int, default=100
+        一度のリクエストで取得する件数
+    checkpoint_interval : int, default=1000
+        チェックポイントを保存する間隔(ノート数)
+    progress_interval : float, default=10
+        進み具合をログに出力する間隔(秒)
+    params : Any
+        ``includeReplies`` 等、 ``/api/users/notes`` に渡す他のパラメーター
+    """
+
+    def __init__(self, user_id: str, path: str, *, compress: Optional[bool] = None,
+                 checkpoint_path: Optional[str] = None, since_date: DateLike = None, until_date: DateLike = None,
+                 windows: int = 1, page_size: int = 100, checkpoint_interval: int = 1000,
+                 progress_interval: float = 10, **params: Any):
+        if windows < 1:
+            raise ValueError('windows must be greater than 0')
+        self.user_id: str = user_id
+        self.path: str = path
+        self.compress: bool = path.endswith('.gz') if compress is None else compress
+        self.checkpoint_path: str = checkpoint_path or path + '.checkpoint'
+        self.since_date: Optional[int] = _to_millis(since_date)
+        self.until_date: Optional[int] = _to_millis(until_date)
+        self.windows: int = windows
+        self.page_size: int = page_size
+        self.checkpoint_interval: int = checkpoint_interval
+        self.progress_interval: float = progress_interval
+        self.params: Dict[str, Any] = dict(params, userId=user_id)
+        self.stats: ExportStats = ExportStats()
+        self.logger = get_module_logger(__name__)
+        self._windows: List[_Window] = []
+        self._file: Optional[IO[str]] = None
+        self._unsaved: int = 0
+
+    async def _split(self) -> List[_Window]:
+        since, until = self.since_date, self.until_date
+        if self.windows == 1:
+            return [_Window(since, until)]
+        if since is None:
+            user = await HTTPSession.request(Route('POST', '/api/users/show'), json={'userId': self.user_id}, auth=True)
+            since = _created_millis(user) - 1
+        if until is None:
+            until = int(time.time() * 1000)
+        if since >= until:
+            return []
+        span = max((until - since) // self.windows, 1)
+        bounds = [since + span * i for i in range(self.windows)] + [until]
+        # 期間の両端は含まれない為、境界の時刻のノートが新しい方の期間に入るよう1ミリ秒ずらす
+        return [_Window(bounds[i] - 1 if i else bounds[i], bounds[i + 1]) for i in range(self.windows)
+                if bounds[i] < bounds[i + 1]]
+
+    def _load_checkpoint(self) -> Optional[List[_Window]]:
+        try:
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return None
+        if checkpoint.get('user_id') != self.user_id:
+            raise ValueError(f'{self.checkpoint_path} is a checkpoint of another user')
+        if not self.compress and os.path.exists(self.path):
+            # 最後のチェックポイントより後に書かれた行は、再開後にもう一度書かれる
+            with open(self.path, 'r+b') as f:
+                f.truncate(checkpoint['size'])
+        return [_Window(**window) for window in checkpoint['windows']]
+
+    def _save_checkpoint(self) -> None:
+        assert self._file is not None
+        self._file.flush()
+        checkpoint = {
+            'user_id': self.user_id,
+            'size': os.path.getsize(self.path),
+            'windows': [window.to_dict() for window in self._windows],
+        }
+        tmp = self.checkpoint_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp, self.checkpoint_path)
+        self._unsaved = 0
+
+    async def _export_window(self, window: _Window) -> None:
+        assert self._file is not None
+        paginator = CursorPaginator('/api/users/notes', self.params, lambda i: i, page_size=self.page_size,
+                                    until_id=window.until_id, since_date=window.since, until_date=window.until,
+                                    lower=False)
+        try:
+            async for note in paginator:
+                line = json.dumps(note, ensure_ascii=False, separators=(',', ':')) + '\n'
+                self._file.write(line)
+                window.until_id = note['id']
+                window.notes += 1
+                self.stats.notes += 1
+                self.stats.bytes += len(line.encode('utf-8'))
+                self._unsaved += 1
+                if self._unsaved >= self.checkpoint_interval:
+                    self._save_checkpoint()
+        finally:
+            self.stats.pages += paginator.pages
+        window.done = True
+        self.stats.finished_windows += 1
+        self._save_checkpoint()
+
+    async def _report(self, started: float) -> None:
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            self.stats.elapsed = time.perf_counter() - started
+            self.logger.info('exported %d notes of %s (%d/%d windows, %.1f notes/s)', self.stats.notes,
+                             self.user_id, self.stats.finished_windows, self.stats.windows,
+                             self.stats.notes_per_second)
+
+    async def run(self) -> ExportStats:
+        """
+        書き出しを開始し、全ての期間を書き出すまで待ちます
+
+        Returns
+        -------
+        ExportStats
+        """
+
+        started = time.perf_counter()
+        windows = self._load_checkpoint()
+        self.stats.resumed = windows is not None
+        self._windows = windows if windows is not None else await self._split()
+        self.stats.windows = len(self._windows)
+        self.stats.finished_windows = sum(window.done for window in self._windows)
+        self._file = _open(self.path, 'a', self.compress)
+        reporter = asyncio.ensure_future(self._report(started))
+        tasks = [asyncio.ensure_future(self._export_window(window)) for window in self._windows if not window.done]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._save_checkpoint()
+            raise
+        finally:
+            reporter.cancel()
+            self.stats.elapsed = time.perf_counter() - started
+            self._file.close()
+            self._file = None
+        if os.path.exists(self.checkpoint_path):  # 期間が一つも無い場合は作成されていない
+            os.remove(self.checkpoint_path)
+        self.logger.info('exported %d notes of %s in %.1fs', self.stats.notes, self.user_id, self.stats.elapsed)
+        return self.stats
@@ -0,0 +1,184 @@
+"""ノートのモデルを生成する前に、受信したデータのまま絞り込む為のフィルター"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Pattern, Tuple, Union
+
+from mi.framework.http import MISSING
+
+__all__ = ('NoteFilter', 'FilterSet')
+
+_Check = Callable[[Optional[str], Dict[str, Any]], bool]
+
+CHANNEL_ALIASES: Dict[str, str] = {
+    'global': 'globalTimeline',
+    'main': 'main',
+    'home': 'homeTimeline',
+    'local': 'localTimeline',
+    'hybrid': 'hybridTimeline',
+}
+
+
+def _as_tuple(value: Union[Any, Iterable[Any]]) -> Tuple[Any, ...]:
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(value)
+    return (value,)
+
+
+class NoteFilter:
+    """
+    ``Client.filter`` で作成される、受信したノートのデータに対する条件。
+    作成時に一度だけ条件を関数に変換し、以降はdictの参照と正規表現だけで判定します
+
+    指定されなかった条件は判定に使われません
+
+    Parameters
+    ----------
+    channel : Optional[Union[str, Iterable[str]]]
+        ``global`` , ``home`` 等、またはチャンネル名
+    host : Optional[Union[str, Iterable[Optional[str]]]]
+        投稿したユーザーのホスト。Noneの場合はローカルのユーザー
+    user_id : Optional[Union[str, Iterable[str]]]
+        投稿したユーザーのID
+    visibility : Optional[Union[str, Iterable[str]]]
+        ノートの公開範囲
+    has_files : Optional[bool]
+        ファイルが添付されているか
+    text_regex : Optional[Union[str, Pattern[str]]]
+        本文、または注釈に一致する正規表現
+    exclude_bots : bool, default=False
+        Botのノートを除外するか
+    exclude_renotes : bool, default=False
+        本文の無いRenoteを除外するか
+
+    Attributes
+    ----------
+    hits : int
+        条件に一致したノートの数
+    misses : int
+        条件に一致しなかったノートの数
+    """
+
+    def __init__(
+            self,
+            *,
+            channel: Any = MISSING,
+            host: Any = MISSING,
+            user_id: Any = MISSING,
+            visibility: Any = MISSING,
+            has_files: Optional[bool] = None,
+            text_regex: Optional[Union[str, Pattern[str]]] = None,
+            exclude_bots: bool = False,
+            exclude_renotes: bool = False
+    ):
+        self.hits: int = 0
+        self.misses: int = 0
+        self.channels: Optional[frozenset] = None
+        checks: List[_Check] = []
+        if channel is not MISSING:
+            self.channels = frozenset(CHANNEL_ALIASES.get(name, name) for name in _as_tuple(channel))
+            checks.append(lambda channel_name, note: channel_name in self.channels)
+        if host is not MISSING:
+            hosts = frozenset(_as_tuple(host))
+            checks.append(lambda channel_name, note: (note.get('user') or {}).get('host') in hosts)
+        if user_id is not MISSING:
+            user_ids = frozenset(_as_tuple(user_id))
+            checks.append(lambda channel_name, note: note.get('userId') in user_ids)
+        if visibility is not MISSING:
+            visibilities = frozenset(_as_tuple(visibility))
+            checks.append(lambda channel_name, note: note.get('visibility') in visibilities)
+        if exclude_bots:
+            checks.append(lambda channel_name, note: not (note.get('user') or {}).get('isBot'))
+        if exclude_renotes:
+            checks.append(lambda channel_name, note: not (note.get('renoteId') and note.get('text') is None))
+        if has_files is not None:
+            checks.append(lambda channel_name, note: bool(note.get('fileIds')) is has_files)
+        if text_regex is not None:
+            search = re.compile(text_regex).search
+            checks.append(
+                lambda channel_name, note: bool(search(note.get('text') or '') or search(note.get('cw') or ''))
+            )
+        self._checks: Tuple[_Check, ...] = tuple(checks)
+
+    def __call__(self, channel_name: Optional[str], note: Dict[str, Any]) -> bool:
+        """
+        ノートが条件に一致するかを返します
+
+        Parameters
+        ----------
+        channel_name : Optional[str]
+            ノートを受信したチャンネル名
+        note : Dict[str, Any]
+            受信したままのノートのデータ
+
+        Returns
+        -------
+        bool
+            全ての条件に一致した場合はTrue
+        """
+
+        for check in self._checks:
+            if not check(channel_name, note):
+                self.misses += 1
+                return False
+        self.hits += 1
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+class FilterSet:
+    """
+    登録されたNoteFilterのいずれかに一致するノートだけを通します。
+    フィルターが一つも登録されていない場合は全てのノートを通します
+
+    Attributes
+    ----------
+    filters : List[NoteFilter]
+        登録されているフィルター。登録された順に判定されます
+    dropped : int
+        どのフィルターにも一致せず、破棄したノートの数
+    """
+
+    def __init__(self):
+        self.filters: List[NoteFilter] = []
+        self.dropped: int = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.filters)
+
+    def add(self, note_filter: NoteFilter) -> NoteFilter:
+        self.filters.append(note_filter)
+        return note_filter
+
+    def remove(self, note_filter: NoteFilter) -> None:
+        if note_filter in self.filters:
+            self.filters.remove(note_filter)
+
+    def accept(self, channel_name: Optional[str], note: Dict[str, Any]) -> bool:
+        """
+        ノートがいずれかのフィルターに一致するかを返します
+
+        Parameters
+        ----------
+        channel_name : Optional[str]
+            ノートを受信したチャンネル名
+        note : Dict[str, Any]
+            受信したままのノートのデータ
+
+        Returns
+        -------
+        bool
+            処理するべきノートか否か
+        """
+
+        for note_filter in self.filters:
+            if note_filter(channel_name, note):
+                return True
+        self.dropped += 1
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {'dropped': self.dropped, 'filters': [note_filter.stats() for note_filter in self.filters]}
@@ -2,20 +2,22 @@ from __future__ import annotations
 import asyncio
 
 import json
-from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, TypeVar
+from typing import TYPE_CHECKING, Dict, Optional, TypeVar
 
 import aiohttp
 from mi import config
 from mi.exception import ClientConnectorError, WebSocketRecconect
-from mi.utils import str_lower
 
 if TYPE_CHECKING:
     from .client import Client
+    from .router import FrameRouter
 
 __all__ = ('MisskeyWebSocket', 'MisskeyClientWebSocketResponse')
 
 
 class MisskeyClientWebSocketResponse(aiohttp.ClientWebSocketResponse):
+    channels: Dict[str, str]  # Routerで接続したチャンネルのIDとチャンネル名
+
     async def close(self, *, code: int = 4000, message: bytes = b'') -> bool:
         return await super().close(code=code, message=message)
 
@@ -29,12 +31,14 @@ class MisskeyWebSocket:
         self._dispatch = lambda *args: None
         self._connection = None
         self.client = client
-        self._misskey_parsers: Optional[Dict[str, Callable[..., Any]]] = None
+        self._misskey_parsers: Optional[FrameRouter] = None
 
     @classmethod
     async def from_client(cls, client: Client, *, timeout: int = 60, event_name: str = 'ready'):
         try:
             socket = await client.http.ws_connect(f'{client.url}?i={config.i.token}')
+            client._connection.channels.clear()
+            socket.channels = client._connection.channels
             ws = cls(socket, client)
             ws._dispatch = client.dispatch
             ws._connection = client._connection
@@ -52,7 +56,7 @@ class MisskeyWebSocket:
         if isinstance(msg, bytes):
             msg = msg.decode()
 
-        self._misskey_parsers[str_lower(msg['type']).upper()](msg)
+        self._misskey_parsers.route(msg['type'], msg)
 
     async def poll_event(self, *, timeout: int = 60):
 
@@ -63,4 +67,6 @@ class MisskeyWebSocket:
             raise WebSocketRecconect()
 
         elif msg.type is aiohttp.WSMsgType.TEXT:
+            if self.client.recorder is not None:
+                self.client.recorder.write(msg.data, self.socket.channels)
             await self.received_message(json.loads(msg.data))
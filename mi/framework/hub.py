@@ -0,0 +1,362 @@
+"""一つのWebSocket接続で受け取ったフレームを、複数のワーカープロセスに振り分ける仕組み"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import multiprocessing
+import time
+import zlib
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Connection
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, List, Optional, Set, Tuple, Union
+
+from mi.framework.router import Router
+from mi.utils import get_module_logger
+
+if TYPE_CHECKING:
+    from .client import Client
+
+__all__ = ('FanoutHub', 'HubSocket')
+
+Partitioner = Callable[[Dict[str, Any]], Optional[str]]
+
+
+def _partition_by_note(frame: Dict[str, Any]) -> Optional[str]:
+    body = frame.get('body')
+    if isinstance(body, dict) and isinstance(body.get('body'), dict):
+        return body['body'].get('id')
+    return None
+
+
+def _partition_by_user(frame: Dict[str, Any]) -> Optional[str]:
+    body = frame.get('body')
+    if isinstance(body, dict) and isinstance(inner := body.get('body'), dict):
+        user = inner.get('user')
+        # ユーザーが分からないフレームはノート等のIDで振り分けず、順番に振り分ける
+        return inner.get('userId') or (user.get('id') if isinstance(user, dict) else None)
+    return None
+
+
+PARTITIONERS: Dict[str, Partitioner] = {
+    'note': _partition_by_note,
+    'user': _partition_by_user,
+}
+
+
+class _PipeWriter:
+    """
+    Connection.sendをイベントループの外のスレッドで行います。
+    相手のパイプのバッファが一杯でも、送信を待つのはこのパイプだけでイベントループは止まりません
+
+    Attributes
+    ----------
+    blocked : float
+        送信を待った時間の合計(秒)
+    """
+
+    def __init__(self, conn: Connection):
+        self._conn: Connection = conn
+        self._queue: Deque[Any] = deque()
+        self._wakeup = asyncio.Event()
+        # 送信の順序を保つ為、一つのスレッドで送信する
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix='MI.py pipe')
+        self._task: asyncio.Task[None] = asyncio.create_task(self._run(), name='MI.py: pipe writer')
+        self._unsent: int = 0  # スレッドに渡したがまだ送信していないメッセージの数
+        self.blocked: float = 0.0
+
+    @property
+    def pending(self) -> int:
+        """送信を待っているメッセージの数"""
+        return len(self._queue) + self._unsent
+
+    def send(self, message: Any) -> None:
+        self._queue.append(message)
+        self._wakeup.set()
+
+    def _send_all(self, messages: List[Any]) -> None:
+        for message in messages:
+            started = time.perf_counter()
+            self._conn.send(message)
+            self.blocked += time.perf_counter() - started
+            self._unsent -= 1
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._queue:
+                messages = list(self._queue)
+                self._queue.clear()
+                self._unsent = len(messages)
+                try:
+                    await loop.run_in_executor(self._executor, self._send_all, messages)
+                except (EOFError, OSError, ValueError):
+                    return
+
+    def close(self) -> None:
+        self._task.cancel()
+        self._executor.shutdown(wait=False)
+
+
+class HubSocket:
+    """
+    ワーカープロセスでRouterから使えるWebSocketの代わり。送信内容はハブに転送されます
+    """
+
+    def __init__(self, writer: _PipeWriter, channels: Dict[str, str]):
+        self._writer: _PipeWriter = writer
+        self.channels: Dict[str, str] = channels
+
+    async def send_json(self, data: Dict[str, Any], **kwargs: Any) -> None:
+        self._writer.send(('send', data))
+
+    async def close(self, **kwargs: Any) -> bool:
+        return True
+
+
+class _WorkerHandle:
+    __slots__ = ('index', 'process', 'conn', 'writer', 'sent', 'processed', 'inflight')
+
+    def __init__(self, index: int, process: multiprocessing.Process, conn: Connection):
+        self.index: int = index
+        self.process: multiprocessing.Process = process
+        self.conn: Connection = conn
+        self.writer: _PipeWriter = _PipeWriter(conn)
+        self.sent: int = 0
+        self.processed: int = 0
+        self.inflight: Deque[Tuple[int, float]] = deque()
+
+
+async def _run_worker(conn: Connection, factory: Callable[[], Client], url: str, token: str,
+                      start_options: Dict[str, Any]) -> None:
+    client = factory()
+    client._configure(url, token, debug=start_options.get('debug', False),
+                      is_ayuskey=start_options.get('is_ayuskey', False))
+    await client.login(token)
+    state = client._connection
+    writer = _PipeWriter(conn)
+    client.dispatch('ready', HubSocket(writer, state.channels))
+
+    loop = asyncio.get_running_loop()
+    closed = loop.create_future()
+
+    def on_readable() -> None:
+        last: Optional[Tuple[int, float]] = None
+        try:
+            while conn.poll():
+                kind, *payload = conn.recv()
+                if kind == 'frame':
+                    seq, received_at, frame = payload
+                    state.parsers.route(frame['type'], frame)
+                    last = (seq, received_at)
+                elif kind == 'channels':
+                    state.channels.clear()
+                    state.channels.update(payload[0])
+        except (EOFError, OSError):
+            if not closed.done():
+                closed.set_result(None)
+            return
+        if last is not None:
+            writer.send(('ack', *last))
+
+    loop.add_reader(conn.fileno(), on_readable)
+    try:
+        await closed
+    finally:
+        loop.remove_reader(conn.fileno())
+        writer.close()
+
+
+def _worker_main(conn: Connection, factory: Callable[[], Client], url: str, token: str,
+                 start_options: Dict[str, Any]) -> None:
+    asyncio.run(_run_worker(conn, factory, url, token, start_options))
+
+
+class FanoutHub:
+    """
+    一つのプロセスだけがWebSocketに接続し、受け取ったフレームをパイプでN個のワーカープロセスに転送します。
+    ワーカーではfactoryで作成したClient(Bot)が通常通りConnectionStateでフレームを処理します
+
+    ワーカーがRouterでチャンネルに接続しようとした場合、ハブが同じチャンネルに一度だけ接続します
+
+    Parameters
+    ----------
+    factory : Callable[[], Client]
+        ワーカーで実行するClientを作成する関数。Botのクラス等、pickle可能な物である必要があります
+    workers : Optional[int], default=None
+        ワーカーの数。Noneの場合はCPUの数
+    partition : Union[str, Callable[[Dict[str, Any]], Optional[str]]], default='note'
+        フレームを振り分けるキー。 ``note`` はノートのID、 ``user`` はユーザーID毎(ユーザー毎の順序が保たれます)。
+        フレームを受け取りキーを返す関数も指定できます。キーが無いフレームは順番に振り分けられます
+    start_method : Optional[str], default=None
+        multiprocessingのstart method
+    """
+
+    def __init__(
+            self,
+            factory: Callable[[], Client],
+            *,
+            workers: Optional[int] = None,
+            partition: Union[str, Partitioner] = 'note',
+            start_method: Optional[str] = None
+    ):
+        self.factory: Callable[[], Client] = factory
+        self.worker_count: int = workers or multiprocessing.cpu_count()
+        self.partitioner: Partitioner = PARTITIONERS[partition] if isinstance(partition, str) else partition
+        self._context = multiprocessing.get_context(start_method)
+        self._workers: List[_WorkerHandle] = []
+        self._round_robin = itertools.cycle(range(self.worker_count))
+        self._wanted: Dict[str, Tuple[str, Optional[Dict[str, Any]]]] = {}  # ワーカーが接続を要求したチャンネル名とパラメータ
+        self._subscriptions: Dict[str, str] = {}  # チャンネル名とパラメータのキーと、ハブでの接続ID
+        self._router: Optional[Router] = None
+        self._tasks: Set[asyncio.Task[None]] = set()  # ワーカーから依頼された送信
+        self.counts: Counter = Counter()
+        self.client: Optional[Client] = None
+        self.logger = get_module_logger(__name__)
+
+    def _select(self, frame: Dict[str, Any]) -> _WorkerHandle:
+        key = self.partitioner(frame)
+        if key is None:
+            return self._workers[next(self._round_robin)]
+        return self._workers[zlib.crc32(key.encode()) % self.worker_count]
+
+    def route(self, frame_type: str, frame: Dict[str, Any]) -> bool:
+        """MisskeyWebSocketから受け取ったフレームをワーカーに転送します"""
+
+        self.counts[frame_type] += 1
+        worker = self._select(frame)
+        worker.sent += 1
+        received_at = time.time()
+        worker.inflight.append((worker.sent, received_at))
+        worker.writer.send(('frame', worker.sent, received_at, frame))
+        return True
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        ``Client.frame_stats`` の為に、FrameRouterと同じ形でtypeごとの転送したフレームの数を返します。
+        フレームはワーカーで処理される為、省略した数と未知のtypeの数は常に空です
+        """
+
+        return {'counts': dict(self.counts), 'skipped': {}, 'unknown': {}}
+
+    def lag(self) -> Dict[int, Dict[str, float]]:
+        """
+        ワーカーごとの遅延を返します
+
+        Returns
+        -------
+        Dict[int, Dict[str, float]]
+            ワーカーの番号と、未処理のフレームの数、最も古い未処理のフレームを受け取ってからの経過時間(秒)、
+            パイプが一杯で送信を待っているメッセージの数、送信を待った時間の合計(秒)
+        """
+
+        now = time.time()
+        return {
+            worker.index: {
+                'sent': worker.sent,
+                'processed': worker.processed,
+                'pending': worker.sent - worker.processed,
+                'delay': now - worker.inflight[0][1] if worker.inflight else 0.0,
+                'queued': worker.writer.pending,
+                'blocked': worker.writer.blocked,
+            }
+            for worker in self._workers
+        }
+
+    def _broadcast_channels(self) -> None:
+        channels = {channel_id: self._wanted[key][0] for key, channel_id in self._subscriptions.items()}
+        for worker in self._workers:
+            worker.writer.send(('channels', channels))
+
+    async def _subscribe(self, channel_name: str, params: Optional[Dict[str, Any]] = None) -> None:
+        # hashtag等はパラメータが異なれば別のチャンネルとして接続する
+        key = channel_name if params is None else f'{channel_name}:{json.dumps(params, sort_keys=True)}'
+        self._wanted.setdefault(key, (channel_name, params))
+        if key in self._subscriptions or self._router is None:
+            return
+        self._subscriptions[key] = await self._router._connect(channel_name, params)
+        self._broadcast_channels()
+
+    async def _on_connect(self, ws: Any) -> None:
+        self._router = Router(ws)
+        self._subscriptions = {}
+        for channel_name, params in list(self._wanted.values()):
+            await self._subscribe(channel_name, params)
+
+    def _on_worker_message(self, worker: _WorkerHandle) -> None:
+        try:
+            while worker.conn.poll():
+                kind, *payload = worker.conn.recv()
+                if kind == 'ack':
+                    seq, _ = payload
+                    worker.processed = seq
+                    while worker.inflight and worker.inflight[0][0] <= seq:
+                        worker.inflight.popleft()
+                elif kind == 'send':
+                    task = asyncio.create_task(self._forward(payload[0]), name='MI.py: hub forward')
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+        except (EOFError, OSError):
+            asyncio.get_running_loop().remove_reader(worker.conn.fileno())
+            self.logger.error(f'worker {worker.index} has stopped')
+
+    async def _forward(self, data: Dict[str, Any]) -> None:
+        if data.get('type') == 'connect':
+            await self._subscribe(data['body']['channel'], data['body'].get('params'))
+        elif self._router is not None:
+            await self._router.web_socket.send_json(data)
+
+    def _spawn(self, url: str, token: str, start_options: Dict[str, Any]) -> None:
+        loop = asyncio.get_running_loop()
+        for index in range(self.worker_count):
+            parent_conn, child_conn = self._context.Pipe()
+            process = self._context.Process(target=_worker_main, name=f'MI.py worker {index}', daemon=True,
+                                            args=(child_conn, self.factory, url, token, start_options))
+            process.start()
+            child_conn.close()
+            worker = _WorkerHandle(index, process, parent_conn)
+            self._workers.append(worker)
+            loop.add_reader(parent_conn.fileno(), self._on_worker_message, worker)
+
+    async def start(self, url: str, token: str, *, debug: bool = False, is_ayuskey: bool = False,
+                    timeout: int = 60) -> None:
+        """
+        ワーカーを起動し、ハブとしてWebSocketに接続します
+
+        Parameters
+        ----------
+        url: str
+            Misskey Instance Websocket URL (wss://example.com)
+        token: str
+            User Token
+        """
+
+        from .client import Client
+
+        self._spawn(url, token, {'debug': debug, 'is_ayuskey': is_ayuskey})
+        self.client = client = Client()
+        client._connection.parsers = self
+        client.add_listener(self._on_connect, 'on_ready')
+        client.add_listener(self._on_connect, 'on_reconnect')
+        try:
+            await client.start(url, token, debug=debug, is_ayuskey=is_ayuskey, timeout=timeout)
+        finally:
+            self.close()
+
+    def run(self, url: str, token: str, **kwargs: Any) -> None:
+        """startをasyncio.runで実行します"""
+        asyncio.run(self.start(url, token, **kwargs))
+
+    def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+        for worker in self._workers:
+            worker.writer.close()
+            worker.conn.close()
+            worker.process.join(timeout=5)
+        self._workers = []
@@ -1,9 +1,9 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Generator, Optional
+from typing import TYPE_CHECKING, Optional
 
 from mi.framework.models.user import User
-from mi.framework.router import Route
+from mi.framework.pagination import OffsetPaginator
 from mi.utils import remove_dict_empty
 from mi.wrapper.models.user import RawUser
 
@@ -14,53 +14,50 @@ __all__ = ('InstanceIterator',)
 
 
 class InstanceIterator:
-    def __init__(self, state: ConnectionState):
+    def __init__(self, state: Optional[ConnectionState] = None):
         self._state = state
 
-    async def get_users(self, limit: int = 10,
-                        *,
-                        offset: int = 0,
-                        sort: Optional[str] = None,
-                        state: str = 'all',
-                        origin: str = 'local',
-                        username: Optional[str] = None,
-                        hostname: Optional[str] = None,
-                        get_all: bool = False
-                        ) -> Generator[User]:
+    @staticmethod
+    def get_users(limit: int = 10,
+                  *,
+                  offset: int = 0,
+                  sort: Optional[str] = None,
+                  state: str = 'all',
+                  origin: str = 'local',
+                  username: Optional[str] = None,
+                  hostname: Optional[str] = None,
+                  get_all: bool = False,
+                  concurrency: int = 1,
+                  ordered: bool = True
+                  ) -> OffsetPaginator[User]:
         """
         Parameters
         ----------
         limit: int
+            get_allがFalseの場合は取得する件数、Trueの場合は一度のリクエストで取得する件数
         offset:int
+            取得を始める位置。失敗した場合は ``OffsetPaginator.checkpoint`` を渡すと続きから再開できます
         sort:str
         state:str
         origin:str
         username:str
         hostname:str
         get_all:bool
+        concurrency:int
+            get_allがTrueの場合に、同時に取得するページの数
+        ordered:bool
+            Falseの場合は、取得できたページから順に返します
 
         Returns
         -------
-        Iterator[User]
+        OffsetPaginator[User]
         """
-        args = remove_dict_empty({'limit': limit,
-                                  'offset': offset,
-                                  'sort': sort,
+        args = remove_dict_empty({'sort': sort,
                                   'state': state,
                                   'origin': origin,
                                   'username': username,
                                   'hostname': hostname
                                   })
-        res = await self._state.http.request(Route('POST', '/api/admin/show-users'), json=args, auth=True, lower=True)
-
-        if get_all:
-            while True:
-                for i in res:
-                    yield User(RawUser(i))
-                args['offset'] = args['offset'] + len(res)
-                res = await self._state.http.request(Route('POST', '/api/admin/show-users'), json=args, auth=True, lower=True)
-                if len(res) == 0:
-                    break
-        else:
-            for i in res:
-                yield User(RawUser(i))
+        return OffsetPaginator('/api/admin/show-users', args, lambda i: User(RawUser(i)),
+                               limit=None if get_all else limit, page_size=limit, offset=offset,
+                               concurrency=concurrency if get_all else 1, ordered=ordered)
@@ -0,0 +1,278 @@
+"""イベントを優先度ごとのレーンに振り分けて実行する仕組み"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Coroutine, Deque, Dict, List, Optional, Tuple
+
+from mi.utils import get_module_logger
+
+__all__ = ('EventLane', 'LaneStats', 'LaneScheduler', 'DEFAULT_LANES', 'DEFAULT_EVENT_LANES')
+
+DEFAULT_LANES: Dict[str, int] = {
+    'interactive': 16,
+    'default': 16,
+    'timeline': 4,
+}
+"""レーン名と同時実行数の初期値"""
+
+DEFAULT_EVENT_LANES: Dict[str, str] = {
+    'mention': 'interactive',
+    'reply': 'interactive',
+    'messaging_message': 'interactive',
+    'unread_messaging_message': 'interactive',
+    'follow': 'interactive',
+    'followed': 'interactive',
+    'user_follow': 'interactive',
+    'follow_request': 'interactive',
+    'reaction': 'interactive',
+    'renote': 'interactive',
+    'quote': 'interactive',
+    'poll_vote': 'interactive',
+    'follow_request_accepted': 'interactive',
+    'message': 'timeline',
+    'note': 'timeline',
+}
+"""イベント名(on_ を除いたもの)とレーン名の対応の初期値"""
+
+_Runner = Callable[..., Coroutine[Any, Any, Any]]
+
+
+class LaneStats:
+    """
+    レーンごとの待ち時間、実行時間の統計
+
+    Attributes
+    ----------
+    processed : int
+        処理が完了したイベントの数
+    max_wait : float
+        キューに積まれてから実行されるまでの最大の待ち時間(秒)
+    total_wait : float
+        待ち時間の合計(秒)
+    total_run : float
+        実行時間の合計(秒)
+    """
+
+    __slots__ = ('processed', 'max_wait', 'total_wait', 'total_run', '_samples')
+
+    def __init__(self, sample_size: int = 1024):
+        self.processed: int = 0
+        self.max_wait: float = 0.0
+        self.total_wait: float = 0.0
+        self.total_run: float = 0.0
+        self._samples: Deque[float] = deque(maxlen=sample_size)
+
+    def record(self, wait: float, run: float) -> None:
+        self.processed += 1
+        self.total_wait += wait
+        self.total_run += run
+        if wait > self.max_wait:
+            self.max_wait = wait
+        self._samples.append(wait)
+
+    def percentile(self, percent: float) -> float:
+        """
+        直近の待ち時間からパーセンタイルを求めます
+
+        Parameters
+        ----------
+        percent : float
+            0 から 100 までのパーセンタイル
+
+        Returns
+        -------
+        float
+            待ち時間(秒)
+        """
+
+        if not self._samples:
+            return 0.0
+        samples = sorted(self._samples)
+        index = min(len(samples) - 1, int(len(samples) * percent / 100))
+        return samples[index]
+
+    def to_dict(self) -> Dict[str, float]:
+        processed = self.processed or 1
+        return {
+            'processed': self.processed,
+            'avg_wait': self.total_wait / processed,
+            'max_wait': self.max_wait,
+            'p50_wait': self.percentile(50),
+            'p95_wait': self.percentile(95),
+            'p99_wait': self.percentile(99),
+            'avg_run': self.total_run / processed,
+        }
+
+
+class EventLane:
+    """
+    独立したキューと同時実行数を持つイベントの実行レーン
+
+    Parameters
+    ----------
+    name : str
+        レーン名
+    concurrency : int
+        同時に実行するイベントの上限
+    runner : Callable[..., Coroutine[Any, Any, Any]]
+        キューから取り出したイベントを実行するコルーチン関数
+    """
+
+    def __init__(self, name: str, concurrency: int, runner: _Runner):
+        if concurrency < 1:
+            raise ValueError('concurrency must be greater than 0')
+        self.name: str = name
+        self.concurrency: int = concurrency
+        self.stats: LaneStats = LaneStats()
+        self._runner: _Runner = runner
+        self._queue: Optional[asyncio.Queue[Tuple[Any, ...]]] = None
+        self._workers: List[asyncio.Task[Any]] = []
+        self._running: int = 0
+
+    @property
+    def pending(self) -> int:
+        """キューで実行を待っているイベントの数"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def running(self) -> int:
+        """実行中のイベントの数"""
+        return self._running
+
+    def _ensure_workers(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        for _ in range(self.concurrency - len(self._workers)):
+            self._workers.append(asyncio.create_task(self._worker(), name=f'MI.py: lane {self.name}'))
+
+    def put(self, coro: _Runner, event_name: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> asyncio.Future[Any]:
+        """
+        イベントをキューに積みます
+
+        Returns
+        -------
+        asyncio.Future[Any]
+            イベントの実行が完了した際に結果が設定されるFuture
+        """
+
+        self._ensure_workers()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((coro, event_name, args, kwargs, time.perf_counter(), future))
+        return future
+
+    async def _worker(self) -> None:
+        queue = self._queue
+        # _run_eventはキャンセルを握りつぶす為、closeされた後はキューが変わったことで終了する
+        while self._queue is queue:
+            coro, event_name, args, kwargs, enqueued_at, future = await queue.get()
+            started_at = time.perf_counter()
+            self._running += 1
+            try:
+                result = await self._runner(coro, event_name, *args, **kwargs)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:  # _run_eventが例外を握りつぶさない場合に備える
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self._running -= 1
+                self.stats.record(started_at - enqueued_at, time.perf_counter() - started_at)
+                queue.task_done()
+
+    def close(self) -> None:
+        """ワーカーを停止し、実行を待っているイベントを取り消します"""
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+        if self._queue is not None:
+            while not self._queue.empty():
+                self._queue.get_nowait()[-1].cancel()
+            self._queue = None
+
+
+class LaneScheduler:
+    """
+    イベント名を元にレーンを選択し、イベントを実行するスケジューラ
+
+    Parameters
+    ----------
+    runner : Callable[..., Coroutine[Any, Any, Any]]
+        イベントを実行するコルーチン関数
+    lanes : Optional[Dict[str, int]], default=None
+        レーン名と同時実行数。 ``DEFAULT_LANES`` を上書きします
+    event_lanes : Optional[Dict[str, str]], default=None
+        イベント名とレーン名の対応。 ``DEFAULT_EVENT_LANES`` を上書きします
+    default_lane : str, default='default'
+        対応が定義されていないイベントが入るレーン
+    """
+
+    def __init__(
+            self,
+            runner: _Runner,
+            *,
+            lanes: Optional[Dict[str, int]] = None,
+            event_lanes: Optional[Dict[str, str]] = None,
+            default_lane: str = 'default'
+    ):
+        lane_config = {**DEFAULT_LANES, **(lanes or {})}
+        if default_lane not in lane_config:
+            raise ValueError(f'{default_lane} is not defined in lanes')
+        self.lanes: Dict[str, EventLane] = {name: EventLane(name, concurrency, runner)
+                                            for name, concurrency in lane_config.items()}
+        self.event_lanes: Dict[str, str] = {**DEFAULT_EVENT_LANES, **(event_lanes or {})}
+        self.default_lane: str = default_lane
+        self.logger = get_module_logger(__name__)
+        for event_name, lane_name in self.event_lanes.items():
+            if lane_name not in self.lanes:
+                raise ValueError(f'lane {lane_name} for event {event_name} is not defined')
+
+    def get_lane(self, lane_key: str) -> EventLane:
+        """
+        イベント名に対応するレーンを返します
+
+        Parameters
+        ----------
+        lane_key : str
+            イベント名。 ``on_`` は付いていてもいなくても構いません
+        """
+
+        if lane_key.startswith('on_'):
+            lane_key = lane_key[3:]
+        return self.lanes[self.event_lanes.get(lane_key, self.default_lane)]
+
+    def schedule(
+            self,
+            lane_key: str,
+            coro: _Runner,
+            event_name: str,
+            args: Tuple[Any, ...],
+            kwargs: Dict[str, Any]
+    ) -> asyncio.Future[Any]:
+        return self.get_lane(lane_key).put(coro, event_name, args, kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        レーンごとの統計を返します
+
+        Returns
+        -------
+        Dict[str, Dict[str, float]]
+            レーン名と統計
+        """
+
+        return {
+            name: {**lane.stats.to_dict(), 'pending': lane.pending, 'running': lane.running}
+            for name, lane in self.lanes.items()
+        }
+
+    def close(self) -> None:
+        for lane in self.lanes.values():
+            lane.close()
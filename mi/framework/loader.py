@@ -0,0 +1,251 @@
+"""同じタイミングで要求されたユーザーを、一度の ``/api/users/show`` でまとめて取得する仕組み"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from mi.exception import NotFoundError
+from mi.framework.http import HTTPSession
+from mi.framework.models.user import User
+from mi.framework.router import Route
+from mi.utils import get_module_logger
+from mi.wrapper.models.user import RawUser
+
+__all__ = ('UserLoader', 'UserLoaderSession')
+
+
+class UserLoader:
+    """
+    ``load`` で要求されたユーザーIDを集め、同じループの周回(またはdelay秒)の間に要求された物を
+    ``userIds`` を指定した一度のリクエストで取得し、それぞれの呼び出し元に返します。
+    取得中のIDを再度要求した場合は同じリクエストの結果を待ち、取得してからttl秒の間は手元の結果を返します
+
+    Parameters
+    ----------
+    delay : float, default=0
+        最初の要求からリクエストを送信するまでに待つ時間(秒)。0の場合は現在のループの周回が終わった時点で送信します
+    ttl : float, default=5
+        取得したユーザーを再利用する時間(秒)。0の場合は再利用しません
+    batch_size : int, default=100
+        一度のリクエストで取得するIDの上限。これに達した場合は待たずに送信します
+    max_size : int, default=10000
+        保持するユーザーの上限
+
+    Attributes
+    ----------
+    requests : int
+        送信したリクエストの数
+    loaded : int
+        リクエストで取得したユーザーの数
+    hits : int
+        保持していた結果を返した回数
+    coalesced : int
+        取得を待っているIDが再度要求され、リクエストをまとめた回数
+    """
+
+    def __init__(self, *, delay: float = 0, ttl: float = 5, batch_size: int = 100, max_size: int = 10000):
+        if batch_size < 1:
+            raise ValueError('batch_size must be greater than 0')
+        self.delay: float = delay
+        self.ttl: float = ttl
+        self.batch_size: int = batch_size
+        self.max_size: int = max_size
+        self.requests: int = 0
+        self.loaded: int = 0
+        self.hits: int = 0
+        self.coalesced: int = 0
+        self._cache: OrderedDict[str, Tuple[float, User]] = OrderedDict()
+        self._batch: Dict[str, asyncio.Future[User]] = {}
+        self._inflight: Dict[str, asyncio.Future[User]] = {}
+        self._handle: Optional[asyncio.Handle] = None
+        self._tasks: Set[asyncio.Task[None]] = set()
+        self.logger = get_module_logger(__name__)
+
+    def configure(self, *, delay: Optional[float] = None, ttl: Optional[float] = None) -> None:
+        """
+        待ち時間と再利用する時間を変更します
+
+        Parameters
+        ----------
+        delay : Optional[float], default=None
+        ttl : Optional[float], default=None
+        """
+
+        if delay is not None:
+            self.delay = delay
+        if ttl is not None:
+            self.ttl = ttl
+            if ttl <= 0:
+                self._cache.clear()
+
+    def _get_cached(self, user_id: str) -> Optional[User]:
+        entry = self._cache.get(user_id)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._cache[user_id]
+            return None
+        return entry[1]
+
+    def prime(self, user: User) -> None:
+        """
+        取得済みのユーザーを登録し、ttl秒の間はリクエストせずに返すようにします
+
+        Parameters
+        ----------
+        user : User
+        """
+
+        if self.ttl <= 0:
+            return
+        self._cache[user.id] = (time.monotonic() + self.ttl, user)
+        self._cache.move_to_end(user.id)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def clear(self, user_id: Optional[str] = None) -> None:
+        """
+        保持しているユーザーを破棄します
+
+        Parameters
+        ----------
+        user_id : Optional[str], default=None
+            破棄するユーザーのID。Noneの場合は全て破棄します
+        """
+
+        if user_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(user_id, None)
+
+    async def load(self, user_id: str) -> User:
+        """
+        ユーザーを取得します。同じ周回で要求された他のユーザーとまとめてリクエストされます
+
+        Parameters
+        ----------
+        user_id : str
+
+        Returns
+        -------
+        User
+
+        Raises
+        ------
+        NotFoundError
+            ユーザーが存在しない場合
+        """
+
+        user = self._get_cached(user_id)
+        if user is not None:
+            self.hits += 1
+            return user
+        future = self._batch.get(user_id) or self._inflight.get(user_id)
+        if future is None:
+            future = self._enqueue(user_id)
+        else:
+            self.coalesced += 1
+        # 一つの呼び出し元がキャンセルされても、同じIDを待っている他の呼び出し元には影響させない
+        return await asyncio.shield(future)
+
+    async def load_many(self, user_ids: Iterable[str]) -> List[User]:
+        """
+        複数のユーザーを取得します
+
+        Parameters
+        ----------
+        user_ids : Iterable[str]
+
+        Returns
+        -------
+        List[User]
+            user_idsの順のユーザー。存在しないユーザーは含まれません
+        """
+
+        results = await asyncio.gather(*(self.load(user_id) for user_id in dict.fromkeys(user_ids)),
+                                       return_exceptions=True)
+        users: List[User] = []
+        for result in results:
+            if isinstance(result, NotFoundError):
+                continue
+            if isinstance(result, BaseException):
+                raise result
+            users.append(result)
+        return users
+
+    def _enqueue(self, user_id: str) -> asyncio.Future[User]:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[User] = loop.create_future()
+        self._batch[user_id] = future
+        if len(self._batch) >= self.batch_size:
+            self._dispatch()
+        elif self._handle is None:
+            if self.delay > 0:
+                self._handle = loop.call_later(self.delay, self._dispatch)
+            else:
+                self._handle = loop.call_soon(self._dispatch)
+        return future
+
+    def _dispatch(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        batch, self._batch = self._batch, {}
+        if not batch:
+            return
+        self._inflight.update(batch)
+        task = asyncio.create_task(self._fetch(batch), name='MI.py: user loader')
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, batch: Dict[str, asyncio.Future[User]]) -> None:
+        self.requests += 1
+        try:
+            data = await HTTPSession.request(Route('POST', '/api/users/show'), json={'userIds': list(batch)},
+                                             auth=True, lower=True)
+            if not isinstance(data, list):
+                raise TypeError(f'/api/users/show returned {type(data).__name__} for userIds')
+            for raw in data:
+                user = User(RawUser(raw))
+                self.loaded += 1
+                self.prime(user)
+                future = batch.get(user.id)
+                if future is not None and not future.done():
+                    future.set_result(user)
+            for user_id, future in batch.items():
+                if not future.done():
+                    future.set_exception(NotFoundError(f'user {user_id} was not found'))
+        except Exception as e:
+            self.logger.debug(f'failed to load {len(batch)} users: {e!r}')
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for user_id in batch:
+                self._inflight.pop(user_id, None)
+            # タスクがキャンセルされた場合も、待っている呼び出し元を残さない
+            for future in batch.values():
+                if not future.done():
+                    future.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns
+        -------
+        Dict[str, int]
+            リクエスト数、取得したユーザー数、保持していた結果を返した回数、まとめた回数、保持しているユーザー数
+        """
+
+        return {
+            'requests': self.requests,
+            'loaded': self.loaded,
+            'hits': self.hits,
+            'coalesced': self.coalesced,
+            'cached': len(self._cache),
+        }
+
+
+UserLoaderSession: UserLoader = UserLoader()
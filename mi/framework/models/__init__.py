@@ -4,4 +4,5 @@ from .drive import *
 from .emoji import *
 from .instance import *
 from .note import *
+from .notification import *
 from .user import *
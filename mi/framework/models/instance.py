@@ -104,7 +104,9 @@ class Instance:
                   origin: str = 'local',
                   username: Optional[str] = None,
                   hostname: Optional[str] = None,
-                  get_all: bool = False
+                  get_all: bool = False,
+                  concurrency: int = 1,
+                  ordered: bool = True
                   ) -> AsyncIterator[User]:
         """
 
@@ -118,10 +120,15 @@ class Instance:
         username:str
         hostname:str
         get_all:bool
+        concurrency:int
+            get_allがTrueの場合に、同時に取得するページの数
+        ordered:bool
+            Falseの場合は、取得できたページから順に返します
 
         Returns
         -------
         AsyncIterator[User]
         """
-        return self.__client.get_users(limit=limit, offset=offset, sort=sort, state=state, origin=origin, username=username,
-                                       hostname=hostname, get_all=get_all)
+        return self.__client.admin.get_users(limit=limit, offset=offset, sort=sort, state=state, origin=origin,
+                                             username=username, hostname=hostname, get_all=get_all,
+                                             concurrency=concurrency, ordered=ordered)
@@ -9,6 +9,8 @@ from mi.framework.models.drive import File
 from mi.framework.models.emoji import Emoji
 from mi.framework.models.user import User
 from mi.utils import emoji_count
+from mi.wrapper.file import MiFile
+from mi.wrapper.models.emoji import RawEmoji
 from mi.wrapper.models.note import RawNote, RawReaction, RawRenote
 from mi.wrapper.models.poll import RawPoll
 from mi.wrapper.models.reaction import RawNoteReaction
@@ -18,7 +20,8 @@ if TYPE_CHECKING:
     from mi.actions.note import NoteActions
     from mi.wrapper.reaction import ReactionManager
 
-__all__ = ('Note', 'Poll', 'Reaction', 'Follow', 'Header', 'File', 'Renote', 'NoteReaction')
+__all__ = ('Note', 'Poll', 'Reaction', 'Follow', 'Header', 'File', 'Renote', 'NoteReaction', 'NoteReacted', 'NoteDeleted',
+           'PollVoted')
 
 
 class Follow:
@@ -238,6 +241,76 @@ class Reaction:
         return manager.ClientActions().reaction
 
 
+class NoteReacted:
+    """
+    キャプチャしているノートにリアクションが付けられた、または外された際のイベント
+
+    Attributes
+    ----------
+    note_id : str
+        リアクションが付けられたノートのID
+    reaction : str
+        リアクション
+    user_id : Optional[str]
+        リアクションを付けたユーザーのID
+    emoji : Optional[Emoji]
+        カスタム絵文字の場合はその絵文字
+    note : Optional[Note]
+        キャプチャ時にノートが渡されていた場合は、更新済みのノート
+    """
+
+    def __init__(self, note_id: str, data: Dict[str, Any], note: Optional[Note] = None):
+        self.note_id: str = note_id
+        self.reaction: str = data['reaction']
+        self.user_id: Optional[str] = data.get('userId')
+        self.emoji: Optional[Emoji] = Emoji(RawEmoji(data['emoji'])) if data.get('emoji') else None
+        self.note: Optional[Note] = note
+
+
+class NoteDeleted:
+    """
+    キャプチャしているノートが削除された際のイベント
+
+    Attributes
+    ----------
+    note_id : str
+        削除されたノートのID
+    deleted_at : Optional[datetime]
+        削除された日時
+    note : Optional[Note]
+        キャプチャ時にノートが渡されていた場合は、そのノート
+    """
+
+    def __init__(self, note_id: str, data: Dict[str, Any], note: Optional[Note] = None):
+        self.note_id: str = note_id
+        self.deleted_at: Optional[datetime] = datetime.strptime(data['deletedAt'], '%Y-%m-%dT%H:%M:%S.%fZ') if data.get(
+            'deletedAt') else None
+        self.note: Optional[Note] = note
+
+
+class PollVoted:
+    """
+    キャプチャしているノートのアンケートに投票された際のイベント
+
+    Attributes
+    ----------
+    note_id : str
+        アンケートのノートのID
+    choice : int
+        投票された項目の番号
+    user_id : Optional[str]
+        投票したユーザーのID
+    note : Optional[Note]
+        キャプチャ時にノートが渡されていた場合は、更新済みのノート
+    """
+
+    def __init__(self, note_id: str, data: Dict[str, Any], note: Optional[Note] = None):
+        self.note_id: str = note_id
+        self.choice: int = data['choice']
+        self.user_id: Optional[str] = data.get('userId')
+        self.note: Optional[Note] = note
+
+
 class Note:
     def __init__(self, raw_data: RawNote):
         self.__raw_data: RawNote = raw_data
@@ -409,8 +482,7 @@ class Note:
         poll : Optional[Poll], optional
             アンケート, by default None
         """
-        if file_ids is None:
-            file_ids = []
+        files = [MiFile(file_id=file_id) for file_id in file_ids or []]
         return await self.__client.note.send(
             content,
             visibility=self.visibility,
@@ -423,7 +495,7 @@ class Note:
             reply_id=self.id,
             renote_id=renote_id,
             channel_id=channel_id,
-            file_ids=file_ids,
+            files=files,
             poll=poll
         )
 
@@ -438,3 +510,20 @@ class Note:
         """
 
         return emoji_count(self.content)
+
+    def _update_reaction(self, reaction: str, delta: int) -> None:
+        """noteUpdatedを元にリアクションの数を更新します"""
+
+        reactions = self.__raw_data.reactions
+        count = reactions.get(reaction, 0) + delta
+        if count > 0:
+            reactions[reaction] = count
+        else:
+            reactions.pop(reaction, None)
+
+    def _update_poll(self, choice: int) -> None:
+        """noteUpdatedを元にアンケートの投票数を更新します"""
+
+        poll = self.__raw_data.poll
+        if poll is not None and poll.choices and 0 <= choice < len(poll.choices):
+            poll.choices[choice].votes += 1
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from mi.framework.models.note import Note
+from mi.framework.models.user import User
+from mi.wrapper.models.notification import RawNotification
+
+__all__ = ('Notification',)
+
+
+class Notification:
+    """
+    通知
+
+    ``type`` によって存在する属性が異なります。例えばreactionの場合は ``reaction`` と ``note`` 、
+    pollVoteの場合は ``choice`` と ``note`` が存在します
+    """
+
+    def __init__(self, raw_data: RawNotification):
+        self.__raw_data: RawNotification = raw_data
+
+    @property
+    def id(self) -> str:
+        return self.__raw_data.id
+
+    @property
+    def created_at(self) -> Optional[datetime]:
+        return self.__raw_data.created_at
+
+    @property
+    def type(self) -> str:
+        return self.__raw_data.type
+
+    @property
+    def is_read(self) -> bool:
+        return self.__raw_data.is_read
+
+    @property
+    def user_id(self) -> Optional[str]:
+        return self.__raw_data.user_id
+
+    @property
+    def user(self) -> Optional[User]:
+        return User(self.__raw_data.user) if self.__raw_data.user else None
+
+    @property
+    def note(self) -> Optional[Note]:
+        return Note(self.__raw_data.note) if self.__raw_data.note else None
+
+    @property
+    def reaction(self) -> Optional[str]:
+        return self.__raw_data.reaction
+
+    @property
+    def choice(self) -> Optional[int]:
+        return self.__raw_data.choice
+
+    @property
+    def invitation(self) -> Optional[Dict[str, Any]]:
+        return self.__raw_data.invitation
+
+    @property
+    def body(self) -> Optional[str]:
+        return self.__raw_data.body
+
+    @property
+    def header(self) -> Optional[str]:
+        return self.__raw_data.header
+
+    @property
+    def icon(self) -> Optional[str]:
+        return self.__raw_data.icon
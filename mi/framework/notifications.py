@@ -0,0 +1,110 @@
+"""通知の既読をまとめて送信する仕組み"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Dict, List, Optional
+
+from mi.framework.http import HTTPSession
+from mi.framework.router import Route
+from mi.utils import get_module_logger
+
+__all__ = ('NotificationReadBatcher',)
+
+
+class NotificationReadBatcher:
+    """
+    既読にする通知のIDを集め、一定の間隔ごとに一度の ``/api/notifications/read`` でまとめて既読にします
+
+    Parameters
+    ----------
+    interval : float, default=1
+        既読を送信する間隔(秒)
+    batch_size : int, default=100
+        一度のリクエストで送信するIDの上限
+
+    Attributes
+    ----------
+    requests : int
+        送信したリクエストの数
+    acknowledged : int
+        既読にした通知の数
+    """
+
+    def __init__(self, *, interval: float = 1, batch_size: int = 100):
+        self.interval: float = interval
+        self.batch_size: int = batch_size
+        self.requests: int = 0
+        self.acknowledged: int = 0
+        self._pending: Dict[str, None] = {}
+        self._mark_all: bool = False
+        self._task: Optional[asyncio.Task[None]] = None
+        self.logger = get_module_logger(__name__)
+
+    @property
+    def pending(self) -> int:
+        """送信を待っている通知の数"""
+        return len(self._pending)
+
+    def add(self, notification_id: str) -> None:
+        """
+        通知を既読にする対象に追加します。次の送信でまとめて既読になります
+
+        Parameters
+        ----------
+        notification_id : str
+        """
+
+        self._pending[notification_id] = None
+        self._schedule()
+
+    def mark_all(self) -> None:
+        """次の送信で ``/api/notifications/mark-all-as-read`` を使い、全ての通知を既読にします"""
+
+        self._mark_all = True
+        self._schedule()
+
+    def _schedule(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_later(), name='MI.py: notification read')
+
+    async def _flush_later(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+            # 送信中に追加された物は、このタスクが動いている間は_scheduleされない為ここで次の間隔を待つ
+            if not self._pending and not self._mark_all:
+                return
+
+    async def flush(self) -> None:
+        """待っている既読をすぐに送信します"""
+
+        if self._mark_all:
+            self._mark_all = False
+            self._pending.clear()
+            self.requests += 1
+            try:
+                await HTTPSession.request(Route('POST', '/api/notifications/mark-all-as-read'), json={}, auth=True)
+            except Exception as e:
+                self.logger.error(f'failed to mark all notifications as read: {e!r}')
+            return
+
+        ids: List[str] = list(self._pending)
+        self._pending.clear()
+        for i in range(0, len(ids), self.batch_size):
+            chunk = ids[i:i + self.batch_size]
+            self.requests += 1
+            try:
+                await HTTPSession.request(Route('POST', '/api/notifications/read'), json={'notificationIds': chunk},
+                                          auth=True)
+            except Exception as e:
+                self.logger.error(f'failed to mark notifications as read: {e!r}')
+                continue
+            self.acknowledged += len(chunk)
+
+    async def close(self) -> None:
+        """送信を待っている既読を送信して停止します"""
+
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        await self.flush()
@@ -0,0 +1,141 @@
+"""タイムラインのノートが処理しきれない程届いた際に、間引いて処理する仕組み"""
+
+from __future__ import annotations
+
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from mi.utils import get_module_logger
+
+__all__ = ('OverloadController',)
+
+
+def _parse_created_at(created_at: str) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(created_at.replace('Z', '+00:00')).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+
+class OverloadController:
+    """
+    タイムラインのノートの遅延(サーバーの ``createdAt`` と現在時刻の差)とキューの長さを監視し、
+    閾値を超えた場合はN件に1件だけノートを処理するように切り替えます。
+    遅延とキューが閾値の半分(初期値)を下回ると自動的に元に戻ります
+
+    間引くのはタイムラインのノートだけで、メンション、チャット、フォロー等は間引きません
+
+    Parameters
+    ----------
+    queue_depth : Callable[[], int]
+        タイムラインのイベントの待ち数を返す関数
+    max_lag : float, default=30
+        過負荷と判断する遅延(秒)
+    max_queue : int, default=1000
+        過負荷と判断するキューの長さ
+    sample_rate : int, default=10
+        過負荷の間、何件に1件ノートを処理するか
+    recover_lag : Optional[float], default=None
+        過負荷から回復したと判断する遅延(秒)。Noneの場合は ``max_lag`` の半分
+    recover_queue : Optional[int], default=None
+        過負荷から回復したと判断するキューの長さ。Noneの場合は ``max_queue`` の半分
+    smoothing : float, default=0.1
+        遅延の指数移動平均の係数
+
+    Attributes
+    ----------
+    overloaded : bool
+        現在過負荷と判断しているか
+    lag : float
+        遅延の移動平均(秒)
+    admitted : int
+        通常通り処理したノートの数
+    sampled : int
+        過負荷の間に処理したノートの数
+    shed : int
+        過負荷の為に破棄したノートの数
+    episodes : int
+        過負荷になった回数
+    """
+
+    def __init__(
+            self,
+            queue_depth: Callable[[], int],
+            *,
+            max_lag: float = 30,
+            max_queue: int = 1000,
+            sample_rate: int = 10,
+            recover_lag: Optional[float] = None,
+            recover_queue: Optional[int] = None,
+            smoothing: float = 0.1
+    ):
+        if sample_rate < 1:
+            raise ValueError('sample_rate must be greater than 0')
+        self._queue_depth: Callable[[], int] = queue_depth
+        self.max_lag: float = max_lag
+        self.max_queue: int = max_queue
+        self.sample_rate: int = sample_rate
+        self.recover_lag: float = max_lag / 2 if recover_lag is None else recover_lag
+        self.recover_queue: int = max_queue // 2 if recover_queue is None else recover_queue
+        self.smoothing: float = smoothing
+        self.overloaded: bool = False
+        self.lag: float = 0.0
+        self.admitted: int = 0
+        self.sampled: int = 0
+        self.shed: int = 0
+        self.episodes: int = 0
+        self._counter: int = 0
+        self.logger = get_module_logger(__name__)
+
+    def _update(self, note: Dict[str, Any]) -> None:
+        created_at = _parse_created_at(note.get('createdAt'))
+        if created_at is not None:
+            self.lag += self.smoothing * (max(0.0, time.time() - created_at) - self.lag)
+        depth = self._queue_depth()
+        if not self.overloaded and (self.lag > self.max_lag or depth > self.max_queue):
+            self.overloaded = True
+            self.episodes += 1
+            self._counter = 0
+            self.logger.warning(f'overloaded (lag: {self.lag:.1f}s, queue: {depth}). '
+                                f'sampling 1/{self.sample_rate} timeline notes')
+        elif self.overloaded and self.lag <= self.recover_lag and depth <= self.recover_queue:
+            self.overloaded = False
+            self.logger.info(f'recovered from overload (lag: {self.lag:.1f}s, queue: {depth}, shed: {self.shed})')
+
+    def admit(self, note: Dict[str, Any]) -> bool:
+        """
+        タイムラインのノートを処理するべきかを返します
+
+        Parameters
+        ----------
+        note : Dict[str, Any]
+            受信したままのノートのデータ
+
+        Returns
+        -------
+        bool
+            処理するべきノートか否か
+        """
+
+        self._update(note)
+        if not self.overloaded:
+            self.admitted += 1
+            return True
+        self._counter += 1
+        if self._counter % self.sample_rate == 0:
+            self.sampled += 1
+            return True
+        self.shed += 1
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'overloaded': self.overloaded,
+            'lag': self.lag,
+            'queue': self._queue_depth(),
+            'admitted': self.admitted,
+            'sampled': self.sampled,
+            'shed': self.shed,
+            'episodes': self.episodes,
+        }
@@ -0,0 +1,321 @@
+"""sinceId / untilId や offset で辿るエンドポイントを、次のページを先読みしながら一件ずつ返す仕組み"""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, Generator, Generic, List, Optional, Tuple, TypeVar, Union
+
+from mi.framework.http import HTTPSession
+from mi.framework.router import Route
+
+__all__ = ('CursorPaginator', 'OffsetPaginator')
+
+T = TypeVar('T')
+
+DateLike = Union[datetime, int, None]
+
+MIN_ID = '0'  # Misskeyのどの形式のIDよりも小さいID
+
+
+def _to_millis(value: DateLike) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
+    return int(value)
+
+
+def _created_millis(item: Dict[str, Any]) -> Optional[int]:
+    created_at = item.get('created_at') or item.get('createdAt')
+    if not created_at:
+        return None
+    return _to_millis(datetime.strptime(created_at, '%Y-%m-%dT%H:%M:%S.%fZ'))
+
+
+class CursorPaginator(Generic[T]):
+    """
+    sinceId / untilId で辿るエンドポイントのページを順に取得し、一件ずつ返します。
+    現在のページを返している間に次のページのリクエストを送信しておき、保持するのは最大で二ページ分です。
+
+    ``async for`` で一件ずつ取得でき、 ``await`` した場合は全てをlistで返します
+
+    Parameters
+    ----------
+    path : str
+        ``/api/users/notes`` 等のエンドポイント
+    params : Dict[str, Any]
+        sinceId, untilId, limit以外のパラメーター
+    converter : Callable[[Dict[str, Any]], T]
+        レスポンスの一件をモデルに変換する関数
+    limit : Optional[int], default=None
+        取得する件数の上限。Noneの場合は最後まで取得します
+    page_size : int, default=100
+        一度のリクエストで取得する件数
+    direction : str, default='older'
+        ``older`` は新しい物から古い物へ(untilId)、 ``newer`` は古い物から新しい物へ(sinceId)辿ります。
+        ``newer`` でsince_idとsince_dateが無い場合は、最も古い物から辿ります
+    since_id : Optional[str], default=None
+    until_id : Optional[str], default=None
+    since_date : Optional[Union[datetime, int]], default=None
+        この時刻より後に作成された物だけを返します。intの場合はUNIX時間(ミリ秒)
+    until_date : Optional[Union[datetime, int]], default=None
+        この時刻より前に作成された物だけを返します
+    prefetch : bool, default=True
+        Falseの場合は、現在のページを返し終えてから次のページを取得します
+    lower : bool, default=True
+        Falseの場合は、レスポンスのキーをsnake_caseに変換せずconverterに渡します
+    """
+
+    def __init__(self, path: str, params: Dict[str, Any], converter: Callable[[Dict[str, Any]], T], *,
+                 limit: Optional[int] = None, page_size: int = 100, direction: str = 'older',
+                 since_id: Optional[str] = None, until_id: Optional[str] = None, since_date: DateLike = None,
+                 until_date: DateLike = None, prefetch: bool = True, lower: bool = True):
+        if direction not in ('older', 'newer'):
+            raise ValueError("direction must be 'older' or 'newer'")
+        if page_size < 1:
+            raise ValueError('page_size must be greater than 0')
+        self.path: str = path
+        self.params: Dict[str, Any] = params
+        self.converter: Callable[[Dict[str, Any]], T] = converter
+        self.limit: Optional[int] = limit
+        self.page_size: int = page_size
+        self.direction: str = direction
+        self.since_id: Optional[str] = since_id
+        self.until_id: Optional[str] = until_id
+        self.since_date: Optional[int] = _to_millis(since_date)
+        self.until_date: Optional[int] = _to_millis(until_date)
+        self.prefetch: bool = prefetch
+        self.lower: bool = lower
+        self.pages: int = 0
+        self.cursor: Optional[str] = None  # 最後に返した物のID。中断した場合はここから再開できます
+
+    def _first_params(self) -> Dict[str, Any]:
+        params = dict(self.params)
+        params['sinceId'] = self.since_id
+        params['untilId'] = self.until_id
+        # IDの指定が無い場合は時刻で起点を決める
+        if self.direction == 'older' and self.until_id is None:
+            params['untilDate'] = self.until_date
+        if self.direction == 'newer' and self.since_id is None:
+            if self.since_date is None:
+                # 起点が無いと新しい物から返される為、最も小さいIDから辿る(sinceDate=0は送信時に取り除かれる)
+                params['sinceId'] = MIN_ID
+            else:
+                params['sinceDate'] = self.since_date
+        return params
+
+    def _next_params(self, cursor: str) -> Dict[str, Any]:
+        params = dict(self.params)
+        if self.direction == 'older':
+            params['untilId'] = cursor
+            params['sinceId'] = self.since_id
+        else:
+            params['sinceId'] = cursor
+            params['untilId'] = self.until_id
+        return params
+
+    async def _fetch(self, params: Dict[str, Any], remaining: Optional[int]) -> Tuple[List[Dict[str, Any]], int]:
+        requested = self.page_size if remaining is None else max(1, min(self.page_size, remaining))
+        params['limit'] = requested
+        self.pages += 1
+        page = await HTTPSession.request(Route('POST', self.path), json=params, auth=True, lower=self.lower)
+        return page or [], requested
+
+    def _in_range(self, item: Dict[str, Any]) -> Optional[bool]:
+        """範囲内ならTrue、辿る方向の先が範囲外ならNone(以降は全て範囲外)、手前が範囲外ならFalse"""
+
+        created = _created_millis(item) if self.since_date is not None or self.until_date is not None else None
+        if created is None:
+            return True
+        if self.since_date is not None and created <= self.since_date:
+            return None if self.direction == 'older' else False
+        if self.until_date is not None and created >= self.until_date:
+            return False if self.direction == 'older' else None
+        return True
+
+    async def _iterate(self) -> AsyncIterator[T]:
+        remaining = self.limit
+        if remaining is not None and remaining <= 0:
+            return
+        task: Optional[asyncio.Task[Tuple[List[Dict[str, Any]], int]]] = asyncio.ensure_future(
+            self._fetch(self._first_params(), remaining))
+        try:
+            while task is not None:
+                page, requested = await task
+                task = None
+                if not page:
+                    break
+                # エンドポイントによって並び順が異なる為、辿る方向に並べ直す
+                page.sort(key=lambda i: i['id'], reverse=self.direction == 'older')
+                cursor = page[-1]['id']
+                exhausted = len(page) < requested
+                if not exhausted and self.prefetch:
+                    # 範囲外の物を読み飛ばした場合、足りない分は次のページで取得する
+                    ahead = None if remaining is None else max(remaining - len(page), 1)
+                    task = asyncio.ensure_future(self._fetch(self._next_params(cursor), ahead))
+                for item in page:
+                    in_range = self._in_range(item)
+                    if in_range is None:
+                        return
+                    if not in_range:
+                        continue
+                    self.cursor = item['id']
+                    yield self.converter(item)
+                    if remaining is not None:
+                        remaining -= 1
+                        if remaining <= 0:
+                            return
+                if exhausted:
+                    break
+                if task is None:
+                    task = asyncio.ensure_future(self._fetch(self._next_params(cursor), remaining))
+        finally:
+            if task is not None and not task.done():
+                task.cancel()
+
+    def __aiter__(self) -> AsyncIterator[T]:
+        return self._iterate()
+
+    async def flatten(self) -> List[T]:
+        """全てを取得してlistで返します"""
+
+        return [item async for item in self]
+
+    def __await__(self) -> Generator[Any, None, List[T]]:
+        return self.flatten().__await__()
+
+
+class OffsetPaginator(Generic[T]):
+    """
+    offset / limit で辿るエンドポイントを、複数のページを並行して取得しながら一件ずつ返します。
+    offsetのページは互いに独立しているため、最大でconcurrency個のページを同時に取得し、
+    最初に件数が足りないページが返ってきた時点でそれより後のページの取得をやめます。
+
+    途中でリクエストが失敗した場合は例外が送出されます。 ``checkpoint`` には取りこぼし無く返し終えた位置が入っているため、
+    ``offset=paginator.checkpoint`` を指定して作り直すと続きから再開できます。
+    取得中に件数が変わると、並行して取得したページの間で重複や抜けが出ることがあります
+
+    Parameters
+    ----------
+    path : str
+        ``/api/admin/show-users`` 等のエンドポイント
+    params : Dict[str, Any]
+        offset, limit以外のパラメーター
+    converter : Callable[[Dict[str, Any]], T]
+        レスポンスの一件をモデルに変換する関数
+    limit : Optional[int], default=None
+        取得する件数の上限。Noneの場合は最後まで取得します
+    page_size : int, default=100
+        一度のリクエストで取得する件数
+    offset : int, default=0
+        取得を始める位置
+    concurrency : int, default=1
+        同時に取得するページの数。1の場合は一ページずつ順に取得します
+    ordered : bool, default=True
+        Trueの場合はoffset順に返します。Falseの場合は取得できたページから順に返します
+    """
+
+    def __init__(self, path: str, params: Dict[str, Any], converter: Callable[[Dict[str, Any]], T], *,
+                 limit: Optional[int] = None, page_size: int = 100, offset: int = 0, concurrency: int = 1,
+                 ordered: bool = True):
+        if page_size < 1:
+            raise ValueError('page_size must be greater than 0')
+        if concurrency < 1:
+            raise ValueError('concurrency must be greater than 0')
+        if offset < 0:
+            raise ValueError('offset must not be negative')
+        self.path: str = path
+        self.params: Dict[str, Any] = params
+        self.converter: Callable[[Dict[str, Any]], T] = converter
+        self.limit: Optional[int] = limit
+        self.page_size: int = page_size
+        self.offset: int = offset
+        self.concurrency: int = concurrency
+        self.ordered: bool = ordered
+        self.pages: int = 0
+        self.checkpoint: int = offset  # この位置より前は全て返し終えています
+
+    async def _fetch(self, offset: int, limit: int) -> List[Dict[str, Any]]:
+        params = dict(self.params)
+        params['offset'] = offset
+        params['limit'] = limit
+        self.pages += 1
+        page = await HTTPSession.request(Route('POST', self.path), json=params, auth=True, lower=True)
+        return page or []
+
+    async def _iterate(self) -> AsyncIterator[T]:
+        end = None if self.limit is None else self.offset + max(self.limit, 0)
+        self.checkpoint = self.offset
+        next_offset = self.offset
+        stop: Optional[int] = None  # 件数が足りないページで分かった、データの終わり
+        sizes: Dict[int, int] = {}
+        pending: Dict[asyncio.Future[List[Dict[str, Any]]], int] = {}
+        completed: Dict[int, List[Dict[str, Any]]] = {}  # 取得したがまだ返していないページ
+        finished: Dict[int, int] = {}  # 順不同の場合に、返し終えたページの件数
+
+        def launch() -> None:
+            nonlocal next_offset
+            # 返していないページも数え、保持するのは最大でconcurrencyページ分にする
+            while stop is None and len(pending) + len(completed) < self.concurrency and (
+                    end is None or next_offset < end):
+                size = self.page_size if end is None else min(self.page_size, end - next_offset)
+                sizes[next_offset] = size
+                pending[asyncio.ensure_future(self._fetch(next_offset, size))] = next_offset
+                next_offset += size
+
+        try:
+            launch()
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=pending.__getitem__):
+                    if task not in pending:
+                        continue  # 同時に終わったページで、データの終わりより後だと分かった
+                    offset = pending.pop(task)
+                    page = task.result()
+                    if stop is not None and offset >= stop:
+                        continue
+                    if len(page) < sizes[offset]:
+                        stop = offset + len(page) if stop is None else min(stop, offset + len(page))
+                        for other, other_offset in list(pending.items()):
+                            if other_offset >= stop:
+                                other.cancel()
+                                del pending[other]
+                        for other_offset in [i for i in completed if i >= stop]:
+                            del completed[other_offset]
+                    completed[offset] = page
+                launch()
+
+                if self.ordered:
+                    while self.checkpoint in completed:
+                        offset = self.checkpoint
+                        page = completed.pop(offset)
+                        launch()
+                        for index, item in enumerate(page, 1):
+                            self.checkpoint = offset + index
+                            yield self.converter(item)
+                else:
+                    for offset in sorted(completed):
+                        page = completed.pop(offset)
+                        launch()
+                        for item in page:
+                            yield self.converter(item)
+                        finished[offset] = len(page)
+                        while self.checkpoint in finished:
+                            self.checkpoint += finished.pop(self.checkpoint)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def __aiter__(self) -> AsyncIterator[T]:
+        return self._iterate()
+
+    async def flatten(self) -> List[T]:
+        """全てを取得してlistで返します"""
+
+        return [item async for item in self]
+
+    def __await__(self) -> Generator[Any, None, List[T]]:
+        return self.flatten().__await__()
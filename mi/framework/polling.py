@@ -0,0 +1,139 @@
+"""WebSocketが使えない環境の為の、REST APIをポーリングしてイベントを受け取る仕組み"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+
+from mi.framework.http import HTTPSession
+from mi.framework.resume import CHANNEL_TIMELINES
+from mi.framework.router import Route
+from mi.utils import get_module_logger
+
+if TYPE_CHECKING:
+    from .client import Client
+
+__all__ = ('PollingSocket', 'PollingEventSource', 'POLLING_ENDPOINTS')
+
+POLLING_ENDPOINTS: Dict[str, List[Tuple[str, str]]] = {
+    name: [timeline] for name, timeline in CHANNEL_TIMELINES.items()
+}
+POLLING_ENDPOINTS['main'] = [CHANNEL_TIMELINES['main'], ('/api/i/notifications', 'notification')]
+"""チャンネル名と、ポーリングするエンドポイントとフレームのtypeの対応"""
+
+
+class PollingSocket:
+    """
+    Routerから使えるWebSocketの代わり。接続したチャンネルを記録し、ポーリングの対象にします
+
+    Attributes
+    ----------
+    channels : Dict[str, str]
+        チャンネルに接続した際のIDとチャンネル名
+    """
+
+    def __init__(self, channels: Dict[str, str]):
+        self.channels: Dict[str, str] = channels
+        self.closed: bool = False
+
+    async def send_json(self, data: Dict[str, Any], **kwargs: Any) -> None:
+        body = data.get('body', {})
+        if data.get('type') == 'disconnect':
+            self.channels.pop(body.get('id'), None)
+        # connectはRouterがchannelsに記録する為、subNote等のその他の物はポーリングでは扱えない為何もしない
+
+    async def close(self, **kwargs: Any) -> bool:
+        self.closed = True
+        return True
+
+
+class PollingEventSource:
+    """
+    タイムライン、メンション、通知のエンドポイントを ``sinceId`` を使ってポーリングし、
+    WebSocketと同じ形のフレームをConnectionStateに渡します
+
+    新しいノートが届くと間隔を短くし、届かない間は間隔を長くします
+
+    Parameters
+    ----------
+    socket : PollingSocket
+    client : Client
+    min_interval : float, default=2
+        ポーリングの最短の間隔(秒)
+    max_interval : float, default=30
+        ポーリングの最長の間隔(秒)
+    """
+
+    def __init__(self, socket: PollingSocket, client: Client, *, min_interval: float = 2, max_interval: float = 30):
+        self.socket: PollingSocket = socket
+        self.client: Client = client
+        self.min_interval: float = min_interval
+        self.max_interval: float = max_interval
+        self.interval: float = min_interval
+        self.requests: int = 0
+        self._since_ids: Dict[str, Optional[str]] = {}
+        self._initialized: Set[str] = set()
+        self._connection = client._connection
+        self.logger = get_module_logger(__name__)
+
+    @classmethod
+    async def from_client(cls, client: Client, *, timeout: int = 60, event_name: str = 'ready'):
+        client._connection.channels.clear()
+        socket = PollingSocket(client._connection.channels)
+        ws = cls(socket, client, min_interval=client.options.get('polling_min_interval', 2),
+                 max_interval=client.options.get('polling_max_interval', 30))
+        client.dispatch(event_name, socket)
+        return ws
+
+    async def _fetch(self, endpoint: str) -> List[Dict[str, Any]]:
+        initialized = endpoint in self._initialized
+        # 初回は起点となるIDを取得するだけにする。初回が空だった場合は、以降sinceId無しで全て取得する
+        data = {'sinceId': self._since_ids.get(endpoint), 'limit': 100} if initialized else {'limit': 1}
+        self.requests += 1
+        res = await HTTPSession.request(Route('POST', endpoint), json=data, auth=True) or []
+        res = sorted(res, key=lambda item: (item['createdAt'], item['id']))
+        if res:
+            self._since_ids[endpoint] = res[-1]['id']
+        self._initialized.add(endpoint)
+        return res if initialized else []
+
+    async def poll_once(self) -> int:
+        """
+        接続されている全てのチャンネルのエンドポイントを一度ずつ取得します。
+        同じエンドポイントを使うチャンネルが複数ある場合も、リクエストは一度だけ行います
+
+        Returns
+        -------
+        int
+            新しく取得した物の数
+        """
+
+        subscribers: Dict[Tuple[str, str], List[str]] = {}
+        for channel_id, channel_name in list(self.socket.channels.items()):
+            for endpoint in POLLING_ENDPOINTS.get(channel_name, ()):
+                subscribers.setdefault(endpoint, []).append(channel_id)
+        if not subscribers:
+            return 0
+
+        endpoints = list(subscribers)
+        results = await asyncio.gather(*[self._fetch(endpoint) for endpoint, _ in endpoints], return_exceptions=True)
+        count = 0
+        for (endpoint, frame_type), result in zip(endpoints, results):
+            if isinstance(result, BaseException):
+                self.logger.error(f'polling {endpoint} failed: {result!r}')
+                continue
+            count += len(result)
+            for item in result:
+                for channel_id in subscribers[(endpoint, frame_type)]:
+                    self._connection.parsers.route('channel', {
+                        'type': 'channel',
+                        'body': {'id': channel_id, 'type': frame_type, 'body': item}
+                    })
+        return count
+
+    async def poll_event(self, *, timeout: int = 60):
+        await asyncio.sleep(self.interval)
+        if await self.poll_once():
+            self.interval = max(self.min_interval, self.interval / 2)
+        else:
+            self.interval = min(self.max_interval, self.interval * 1.5)
@@ -0,0 +1,228 @@
+"""WebSocketで受信したフレームを記録し、後から同じ順序、間隔で再生する仕組み"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import queue
+import threading
+import time
+from typing import IO, TYPE_CHECKING, Any, Dict, Iterator, Optional, Tuple, Union
+
+from mi.utils import get_module_logger
+
+if TYPE_CHECKING:
+    from mi.framework.state import ConnectionState
+
+__all__ = ('FrameRecorder', 'FrameReplayer', 'iter_frames')
+
+
+def _open(path: str, mode: str, compress: Optional[bool]) -> IO[str]:
+    if compress is None:
+        compress = path.endswith('.gz')
+    if compress:
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class FrameRecorder:
+    """
+    受信したフレームを受信時刻と共に一行ずつ追記します。
+    一行は ``{"t": 受信時刻, "f": 受信したJSONの文字列}`` で、接続しているチャンネルが変わった場合は
+    ``{"t": 時刻, "channels": {ID: チャンネル名}}`` が記録されます。
+    シリアライズと書き込みは専用のスレッドで行い、イベントループを止めません
+
+    Parameters
+    ----------
+    path : str
+        記録するファイル
+    compress : Optional[bool], default=None
+        gzipで圧縮するか。Noneの場合はpathが ``.gz`` で終わる場合に圧縮します
+
+    Attributes
+    ----------
+    frames : int
+        記録したフレームの数
+    """
+
+    def __init__(self, path: str, *, compress: Optional[bool] = None):
+        self.path: str = path
+        self.frames: int = 0
+        self._file: IO[str] = _open(path, 'a', compress)
+        self._channels: Dict[str, str] = {}
+        # (受信時刻, フレーム, チャンネル)、flushを待つEvent、または終了を表すNone
+        self._queue: queue.SimpleQueue[Union[Tuple[float, str, Optional[Dict[str, str]]], threading.Event, None]] = \
+            queue.SimpleQueue()
+        self._closed: bool = False
+        self.logger = get_module_logger(__name__)
+        self._thread: threading.Thread = threading.Thread(target=self._run, name='MI.py: frame recorder', daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        file = self._file
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                if isinstance(item, threading.Event):
+                    file.flush()
+                    item.set()
+                    continue
+                received_at, data, channels = item
+                if channels is not None:
+                    file.write(json.dumps({'t': received_at, 'channels': channels}, separators=(',', ':')) + '\n')
+                # 改行等を含むフレームで行が壊れないよう、文字列としてエスケープする
+                file.write(json.dumps({'t': received_at, 'f': data}, separators=(',', ':')) + '\n')
+        except Exception as e:
+            self.logger.error(f'failed to record frames to {self.path}: {e!r}')
+        finally:
+            file.close()
+
+    def write(self, data: str, channels: Optional[Dict[str, str]] = None) -> None:
+        """
+        フレームを記録します
+
+        Parameters
+        ----------
+        data : str
+            受信したままのJSONの文字列
+        channels : Optional[Dict[str, str]], default=None
+            現在接続しているチャンネルのIDとチャンネル名
+        """
+
+        if self._closed:
+            return
+        changed = None
+        if channels is not None and channels != self._channels:
+            changed = self._channels = dict(channels)
+        self._queue.put((time.time(), data, changed))
+        self.frames += 1
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        それまでに記録したフレームが書き込まれるまで待ちます
+
+        Parameters
+        ----------
+        timeout : Optional[float], default=None
+
+        Returns
+        -------
+        bool
+            書き込まれたか
+        """
+
+        if self._closed:
+            return True
+        flushed = threading.Event()
+        self._queue.put(flushed)
+        return flushed.wait(timeout)
+
+    def close(self) -> None:
+        """残りのフレームを書き込んでからファイルを閉じます"""
+
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+
+def iter_frames(path: str, *, compress: Optional[bool] = None) -> Iterator[Tuple[float, str, Any]]:
+    """
+    記録したファイルを先頭から読み込みます
+
+    Parameters
+    ----------
+    path : str
+        FrameRecorderで記録したファイル
+    compress : Optional[bool], default=None
+        gzipで圧縮されているか。Noneの場合はpathが ``.gz`` で終わる場合に圧縮されているとみなします
+
+    Returns
+    -------
+    Iterator[Tuple[float, str, Any]]
+        受信時刻、種類( ``frame`` または ``channels`` )、内容
+    """
+
+    with _open(path, 'r', compress) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if 'f' in record:
+                frame = record['f']
+                # 以前の形式ではフレームがそのまま埋め込まれている
+                yield record['t'], 'frame', json.loads(frame) if isinstance(frame, str) else frame
+            else:
+                yield record['t'], 'channels', record['channels']
+
+
+class FrameReplayer:
+    """
+    FrameRecorderで記録したフレームをConnectionStateに渡し、受信した時と同じようにイベントを発火させます
+
+    Parameters
+    ----------
+    path : str
+        FrameRecorderで記録したファイル
+    state : ConnectionState
+        フレームを渡す先。通常は ``client._connection``
+    speed : Optional[float], default=1
+        再生速度。2の場合は2倍速、Noneの場合は待たずにできるだけ速く再生します
+    compress : Optional[bool], default=None
+        gzipで圧縮されているか
+
+    Attributes
+    ----------
+    frames : int
+        再生したフレームの数
+    elapsed : float
+        再生にかかった時間(秒)
+    """
+
+    def __init__(self, path: str, state: ConnectionState, *, speed: Optional[float] = 1,
+                 compress: Optional[bool] = None):
+        if speed is not None and speed <= 0:
+            raise ValueError('speed must be greater than 0')
+        self.path: str = path
+        self.speed: Optional[float] = speed
+        self.compress: Optional[bool] = compress
+        self.frames: int = 0
+        self.elapsed: float = 0.0
+        self._state: ConnectionState = state
+        self.logger = get_module_logger(__name__)
+
+    async def replay(self) -> int:
+        """
+        ファイルの最後まで再生します
+
+        Returns
+        -------
+        int
+            再生したフレームの数
+        """
+
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        first: Optional[float] = None
+        for received_at, kind, content in iter_frames(self.path, compress=self.compress):
+            if kind == 'channels':
+                self._state.channels.clear()
+                self._state.channels.update(content)
+                continue
+            if first is None:
+                first = received_at
+            if self.speed is not None:
+                delay = started_at + (received_at - first) / self.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif self.frames % 100 == 0:
+                await asyncio.sleep(0)  # イベントの実行を止めないように、定期的にイベントループに制御を戻す
+            self._state.parsers.route(content['type'], content)
+            self.frames += 1
+        self.elapsed = loop.time() - started_at
+        self.logger.debug('replayed %s frames in %.3fs', self.frames, self.elapsed)
+        return self.frames
@@ -0,0 +1,179 @@
+"""再接続時に、切断されていた間のノートをREST APIで取得し直す仕組み"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from mi.framework.http import HTTPSession
+from mi.framework.router import Route
+from mi.utils import get_module_logger
+
+if TYPE_CHECKING:
+    from mi.framework.state import ConnectionState
+
+__all__ = ('ResumeTracker', 'CHANNEL_TIMELINES')
+
+CHANNEL_TIMELINES: Dict[str, Tuple[str, str]] = {
+    'main': ('/api/notes/mentions', 'mention'),
+    'homeTimeline': ('/api/notes/timeline', 'note'),
+    'localTimeline': ('/api/notes/local-timeline', 'note'),
+    'hybridTimeline': ('/api/notes/hybrid-timeline', 'note'),
+    'globalTimeline': ('/api/notes/global-timeline', 'note'),
+}
+"""チャンネル名と、そのチャンネルのノートを取得できるエンドポイント、フレームのtypeの対応"""
+
+
+class ResumeTracker:
+    """
+    チャンネルごとに最後に受信したノートのIDを記録し、再接続後に取りこぼしたノートを取得します
+
+    Parameters
+    ----------
+    state : ConnectionState
+        取得したノートを渡す先
+    max_notes : int, default=100
+        一つのチャンネルで再取得するノートの上限
+    max_age : Optional[float], default=None
+        再取得するノートの古さの上限(秒)。Noneの場合は制限しません
+    subscribe_timeout : float, default=10
+        再接続後、チャンネルに再度接続されるのを待つ時間(秒)
+    dedupe_size : int, default=2048
+        重複の確認の為に記憶しておくノートの数
+    """
+
+    def __init__(
+            self,
+            state: ConnectionState,
+            *,
+            max_notes: int = 100,
+            max_age: Optional[float] = None,
+            subscribe_timeout: float = 10,
+            dedupe_size: int = 2048
+    ):
+        self._state: ConnectionState = state
+        self.max_notes: int = max_notes
+        self.max_age: Optional[float] = max_age
+        self.subscribe_timeout: float = subscribe_timeout
+        self.dedupe_size: int = dedupe_size
+        self.last_seen: Dict[str, str] = {}
+        self.backfilled: int = 0
+        self._seen: OrderedDict[Tuple[str, str], None] = OrderedDict()
+        self.logger = get_module_logger(__name__)
+
+    def _mark(self, frame_type: str, note_id: str) -> bool:
+        """ノートを既読にします。既に受け取っていた場合はFalseを返します"""
+
+        key = (frame_type, note_id)
+        if key in self._seen:
+            return False
+        self._seen[key] = None
+        if len(self._seen) > self.dedupe_size:
+            self._seen.popitem(last=False)
+        return True
+
+    def observe(self, channel_id: Optional[str], frame_type: str, body: Any) -> bool:
+        """
+        ストリームで受信したチャンネルのフレームを記録します
+
+        Parameters
+        ----------
+        channel_id : Optional[str]
+            チャンネルに接続した際のID
+        frame_type : str
+            フレームのtype
+        body : Any
+            フレームのbody
+
+        Returns
+        -------
+        bool
+            処理するべきフレームか否か。再取得したノートと重複する場合はFalse
+        """
+
+        channel_name = self._state.channels.get(channel_id)
+        timeline = CHANNEL_TIMELINES.get(channel_name)
+        if timeline is None or timeline[1] != frame_type or not isinstance(body, dict) or 'id' not in body:
+            return True
+        self.last_seen[channel_name] = body['id']
+        return self._mark(frame_type, body['id'])
+
+    async def _wait_subscribed(self, channel_name: str) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.subscribe_timeout
+        while channel_name not in self._state.channels.values() and loop.time() < deadline:
+            await asyncio.sleep(0.1)
+
+    async def _fetch(self, endpoint: str, since_id: str) -> List[Dict[str, Any]]:
+        notes: List[Dict[str, Any]] = []
+        oldest = datetime.utcnow() - timedelta(seconds=self.max_age) if self.max_age is not None else None
+        while len(notes) < self.max_notes:
+            limit = min(100, self.max_notes - len(notes))
+            data = {'sinceId': since_id, 'limit': limit}
+            res = await HTTPSession.request(Route('POST', endpoint), json=data, auth=True)
+            if not res:
+                break
+            res = sorted(res, key=lambda note: (note['createdAt'], note['id']))
+            since_id = res[-1]['id']
+            if oldest is not None:
+                res = [note for note in res
+                       if datetime.strptime(note['createdAt'], '%Y-%m-%dT%H:%M:%S.%fZ') >= oldest]
+            notes.extend(res)
+            if len(res) < limit:
+                break
+        return notes[:self.max_notes]
+
+    async def backfill_channel(self, channel_name: str) -> int:
+        """
+        チャンネルで最後に受信したノート以降のノートを取得し、受信順にイベントを発火させます
+
+        Parameters
+        ----------
+        channel_name : str
+            main, globalTimeline等のチャンネル名
+
+        Returns
+        -------
+        int
+            発火させたノートの数
+        """
+
+        since_id = self.last_seen.get(channel_name)
+        if since_id is None or channel_name not in CHANNEL_TIMELINES:
+            return 0
+        endpoint, frame_type = CHANNEL_TIMELINES[channel_name]
+        await self._wait_subscribed(channel_name)
+        count = 0
+        for note in await self._fetch(endpoint, since_id):
+            if self.last_seen.get(channel_name, '') < note['id']:
+                self.last_seen[channel_name] = note['id']
+            if not self._mark(frame_type, note['id']):
+                continue
+            count += 1
+            if self._state.is_observed(frame_type):
+                self._state.channel_parsers.route(frame_type, note)
+        self.backfilled += count
+        self.logger.debug('backfilled %s notes in %s', count, channel_name)
+        return count
+
+    async def backfill(self) -> int:
+        """
+        全てのチャンネルの取りこぼしたノートを取得します
+
+        Returns
+        -------
+        int
+            発火させたノートの数
+        """
+
+        results = await asyncio.gather(*[self.backfill_channel(name) for name in list(self.last_seen)],
+                                       return_exceptions=True)
+        count = 0
+        for result in results:
+            if isinstance(result, BaseException):
+                self.logger.error(f'backfill failed: {result!r}')
+            else:
+                count += result
+        return count
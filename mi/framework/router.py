@@ -2,15 +2,20 @@
 
 from __future__ import annotations
 
+import asyncio
 import uuid
-from typing import TYPE_CHECKING, Iterable, Literal
+from collections import Counter, OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Literal, Optional, Union
 
 from mi import config
+from mi.utils import get_module_logger
 
 if TYPE_CHECKING:
     from aiohttp.client_ws import ClientWebSocketResponse
 
-__all__ = ['Router', 'Route']
+    from mi.framework.models.note import Note
+
+__all__ = ['Router', 'Route', 'FrameRouter', 'NoteCaptureManager']
 
 
 class Route:
@@ -20,6 +25,63 @@ class Route:
         self.url = config.i.origin_uri + path
 
 
+class FrameRouter:
+    """
+    WebSocketで受け取ったフレームを、typeの値(noteUpdated等のキャメルケースのまま)を元にハンドラーに振り分けます
+
+    Attributes
+    ----------
+    handlers : Dict[str, Callable[[Any], Any]]
+        フレームのtypeとハンドラーの対応
+    counts : Counter[str]
+        typeごとの処理したフレームの数
+    skipped : Counter[str]
+        リスナーが存在しない為に処理を省略したフレームの数
+    unknown : Counter[str]
+        対応するハンドラーが存在しなかったフレームの数
+    """
+
+    __slots__ = ('handlers', 'counts', 'skipped', 'unknown')
+
+    def __init__(self, handlers: Dict[str, Callable[[Any], Any]]):
+        self.handlers: Dict[str, Callable[[Any], Any]] = handlers
+        self.counts: Counter[str] = Counter()
+        self.skipped: Counter[str] = Counter()
+        self.unknown: Counter[str] = Counter()
+
+    def route(self, frame_type: str, payload: Any) -> bool:
+        """
+        フレームをハンドラーに渡します
+
+        Parameters
+        ----------
+        frame_type : str
+            フレームのtype
+        payload : Any
+            ハンドラーに渡すデータ
+
+        Returns
+        -------
+        bool
+            ハンドラーが存在したか否か
+        """
+
+        handler = self.handlers.get(frame_type)
+        if handler is None:
+            self.unknown[frame_type] += 1
+            return False
+        self.counts[frame_type] += 1
+        handler(payload)
+        return True
+
+    def skip(self, frame_type: str) -> None:
+        """処理を省略したフレームを記録します"""
+        self.skipped[frame_type] += 1
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {'counts': dict(self.counts), 'skipped': dict(self.skipped), 'unknown': dict(self.unknown)}
+
+
 class Router:
     """
     Attributes
@@ -39,13 +101,32 @@ class Router:
         WebSocketでHomeTimeLineに接続します
     local_time_line:
         WebSocketでLocalTimeLineに接続します
+    connect_hashtag:
+        指定したハッシュタグのノートだけを受け取るチャンネルに接続します
+    connect_antenna:
+        アンテナのチャンネルに接続します
+    connect_user_list:
+        リストのタイムラインのチャンネルに接続します
+    connect_channel_timeline:
+        Misskeyのチャンネルのタイムラインに接続します
+    disconnect_channel:
+        接続したチャンネルから切断します
     capture_message:
         与えられたメッセージを元にnote idを取得し、そのメッセージをon_message等の監視対象に追加します
+    release_message:
+        capture_messageで追加したノートを監視対象から外します
     """
 
     def __init__(self, web_socket: ClientWebSocketResponse):
         self.web_socket: ClientWebSocketResponse = web_socket
 
+    def _register(self, channel_id: str, channel_name: str) -> None:
+        """接続したチャンネルをWebSocketに記録します。再接続時の取りこぼしの取得に使われます"""
+
+        channels = getattr(self.web_socket, 'channels', None)
+        if channels is not None:
+            channels[channel_id] = channel_name
+
     async def connect_channel(self, channel_list: Iterable[Literal['global', 'main', 'home', 'local']]) -> None:
         """
         与えられたlistを元にチャンネルに接続します
@@ -65,18 +146,118 @@ class Router:
         try:
             for channel in channel_list:
                 get_channel = channel_dict[channel]
+                channel_id = f"{uuid.uuid4()}"
                 await self.web_socket.send_json({
                     "type": "connect",
                     "body": {
                         "channel": f"{get_channel}",
-                        "id": f"{uuid.uuid4()}",
+                        "id": channel_id,
                     },
                 }
                 )
+                self._register(channel_id, get_channel)
 
         except KeyError:
             pass
 
+    async def _connect(self, channel_name: str, params: Optional[Dict[str, Any]] = None) -> str:
+        channel_id = f"{uuid.uuid4()}"
+        body: Dict[str, Any] = {"channel": channel_name, "id": channel_id}
+        if params is not None:
+            body["params"] = params
+        await self.web_socket.send_json({"type": "connect", "body": body})
+        self._register(channel_id, channel_name)
+        return channel_id
+
+    async def connect_hashtag(self, q: Iterable[Union[str, Iterable[str]]]) -> str:
+        """
+        指定したハッシュタグを含むノートだけを受け取るチャンネルに接続します。
+        絞り込みはサーバー側で行われる為、globalに接続して絞り込むよりも受信するデータが少なくなります
+
+        Parameters
+        ----------
+        q : Iterable[Union[str, Iterable[str]]]
+            ハッシュタグの条件。要素のいずれかに一致するノートを受け取ります。
+            要素がlistの場合はその全てのハッシュタグを含むノートに一致します。
+            例: ``['misskey', ['mi', 'py']]`` は ``#misskey`` または ``#mi と #py`` を含むノート
+
+        Returns
+        -------
+        str
+            チャンネルに接続した際のID
+        """
+
+        query: List[List[str]] = [
+            [tag.lstrip('#') for tag in ([group] if isinstance(group, str) else group)] for group in q
+        ]
+        return await self._connect("hashtag", {"q": query})
+
+    async def connect_antenna(self, antenna_id: str) -> str:
+        """
+        アンテナのチャンネルに接続します
+
+        Parameters
+        ----------
+        antenna_id : str
+            アンテナのID
+
+        Returns
+        -------
+        str
+            チャンネルに接続した際のID
+        """
+
+        return await self._connect("antenna", {"antennaId": antenna_id})
+
+    async def connect_user_list(self, list_id: str) -> str:
+        """
+        リストのタイムラインのチャンネルに接続します
+
+        Parameters
+        ----------
+        list_id : str
+            リストのID
+
+        Returns
+        -------
+        str
+            チャンネルに接続した際のID
+        """
+
+        return await self._connect("userList", {"listId": list_id})
+
+    async def connect_channel_timeline(self, channel_id: str) -> str:
+        """
+        Misskeyのチャンネルのタイムラインに接続します
+
+        Parameters
+        ----------
+        channel_id : str
+            MisskeyのチャンネルのID
+
+        Returns
+        -------
+        str
+            チャンネルに接続した際のID
+        """
+
+        return await self._connect("channel", {"channelId": channel_id})
+
+    async def disconnect_channel(self, channel_id: str) -> None:
+        """
+        接続したチャンネルから切断します
+
+        Parameters
+        ----------
+        channel_id : str
+            チャンネルに接続した際のID
+        """
+
+        await self.web_socket.send_json({"type": "disconnect", "body": {"id": channel_id}})
+        channels = getattr(self.web_socket, 'channels', None)
+        if channels is not None:
+            channels.pop(channel_id, None)
+
     async def capture_message(self, message_id: str) -> None:
         """
         与えられたメッセージを元にnote idを取得し、そのメッセージをon_message等の監視対象に追加します
@@ -89,3 +270,201 @@ class Router:
         await self.web_socket.send_json(
             {"type": "subNote", "body": {"id": f"{message_id}"}}
         )
+
+    async def release_message(self, message_id: str) -> None:
+        """
+        capture_messageで監視対象に追加したノートを監視対象から外します
+
+        Parameters
+        ----------
+        message_id : str
+        """
+
+        await self.web_socket.send_json(
+            {"type": "unsubNote", "body": {"id": f"{message_id}"}}
+        )
+
+
+class NoteCaptureManager:
+    """
+    ノートのキャプチャ(subNote)を参照カウントで管理します。
+    同時にキャプチャするノートの数が上限を超えた場合、最も使われていないノートのキャプチャを解除します
+
+    Parameters
+    ----------
+    get_socket : Callable[[], Optional[ClientWebSocketResponse]]
+        現在のWebSocketを返す関数
+    max_captures : int, default=1000
+        同時にキャプチャするノートの上限
+
+    Attributes
+    ----------
+    evicted : int
+        上限を超えた為にキャプチャを解除した数
+    dropped : int
+        予約したキャプチャが上限を超えて溜まった為に、送信せずに破棄した数
+    """
+
+    def __init__(self, get_socket: Callable[[], Optional[ClientWebSocketResponse]], *, max_captures: int = 1000):
+        self._get_socket: Callable[[], Optional[ClientWebSocketResponse]] = get_socket
+        self.max_captures: int = max_captures
+        self.evicted: int = 0
+        self.dropped: int = 0
+        self._refs: OrderedDict[str, int] = OrderedDict()
+        self._notes: Dict[str, Note] = {}
+        self._scheduled_captures: OrderedDict[str, Optional[Note]] = OrderedDict()
+        self._scheduled_releases: Dict[str, bool] = {}  # ノートのIDとforce
+        self._worker: Optional[asyncio.Task[None]] = None
+        self.logger = get_module_logger(__name__)
+
+    def __len__(self) -> int:
+        return len(self._refs)
+
+    def __contains__(self, note_id: str) -> bool:
+        return note_id in self._refs
+
+    def _router(self) -> Optional[Router]:
+        socket = self._get_socket()
+        return Router(socket) if socket is not None else None
+
+    def get_note(self, note_id: str) -> Optional[Note]:
+        """
+        キャプチャしているノートを返します
+
+        Parameters
+        ----------
+        note_id : str
+
+        Returns
+        -------
+        Optional[Note]
+            キャプチャ時にNoteが渡されていない場合はNone
+        """
+
+        if note_id in self._refs:
+            self._refs.move_to_end(note_id)
+        return self._notes.get(note_id)
+
+    async def capture(self, note_id: str, note: Optional[Note] = None) -> None:
+        """
+        ノートをキャプチャします。既にキャプチャしている場合は参照カウントを増やします
+
+        Parameters
+        ----------
+        note_id : str
+        note : Optional[Note], default=None
+            noteUpdatedを受け取った際に更新するノート
+        """
+
+        if note is not None:
+            self._notes[note_id] = note
+        if note_id in self._refs:
+            self._refs[note_id] += 1
+            self._refs.move_to_end(note_id)
+            return
+
+        self._refs[note_id] = 1
+        while len(self._refs) > self.max_captures:
+            evicted_id, _ = self._refs.popitem(last=False)
+            self._notes.pop(evicted_id, None)
+            self.evicted += 1
+            await self._send_release(evicted_id)
+        if (router := self._router()) is not None:
+            await router.capture_message(note_id)
+
+    async def release(self, note_id: str, *, force: bool = False) -> None:
+        """
+        参照カウントを減らし、0になった場合はキャプチャを解除します
+
+        Parameters
+        ----------
+        note_id : str
+        force : bool, default=False
+            参照カウントに関わらずキャプチャを解除するか
+        """
+
+        if note_id not in self._refs:
+            return
+        self._refs[note_id] -= 1
+        if self._refs[note_id] > 0 and not force:
+            return
+        del self._refs[note_id]
+        self._notes.pop(note_id, None)
+        await self._send_release(note_id)
+
+    async def _send_release(self, note_id: str) -> None:
+        if (router := self._router()) is not None:
+            await router.release_message(note_id)
+
+    def schedule_capture(self, note_id: str, note: Optional[Note] = None) -> None:
+        """
+        captureを予約します。予約は一つのタスクで順に送信され、
+        送信を待っている物がmax_capturesを超えた場合は古い物から破棄します
+
+        Parameters
+        ----------
+        note_id : str
+        note : Optional[Note], default=None
+        """
+
+        self._scheduled_captures[note_id] = note
+        self._scheduled_captures.move_to_end(note_id)
+        while len(self._scheduled_captures) > self.max_captures:
+            # 送信しても上限を超えてすぐに解除される物
+            self._scheduled_captures.popitem(last=False)
+            self.dropped += 1
+        self._start_worker()
+
+    def schedule_release(self, note_id: str, *, force: bool = False) -> None:
+        """
+        releaseを予約します。まだ送信していないcaptureがある場合は、それを取り消します
+
+        Parameters
+        ----------
+        note_id : str
+        force : bool, default=False
+        """
+
+        if note_id in self._scheduled_captures:
+            del self._scheduled_captures[note_id]
+            if not force:
+                return
+        self._scheduled_releases[note_id] = self._scheduled_releases.get(note_id, False) or force
+        self._start_worker()
+
+    def _start_worker(self) -> None:
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run_scheduled(), name='MI.py: note captures')
+
+    async def _run_scheduled(self) -> None:
+        try:
+            while self._scheduled_releases or self._scheduled_captures:
+                try:
+                    if self._scheduled_releases:
+                        note_id, force = next(iter(self._scheduled_releases.items()))
+                        del self._scheduled_releases[note_id]
+                        await self.release(note_id, force=force)
+                    else:
+                        note_id, note = self._scheduled_captures.popitem(last=False)
+                        await self.capture(note_id, note)
+                except Exception as e:
+                    self.logger.error(f'failed to update note captures: {e!r}')
+        finally:
+            self._worker = None
+
+    def close(self) -> None:
+        """予約したcaptureとreleaseを破棄します"""
+
+        self._scheduled_captures.clear()
+        self._scheduled_releases.clear()
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+    async def resubscribe(self) -> None:
+        """再接続した際に、キャプチャしている全てのノートを再度キャプチャします"""
+
+        if (router := self._router()) is None:
+            return
+        for note_id in list(self._refs):
+            await router.capture_message(note_id)
@@ -2,34 +2,119 @@ from __future__ import annotations
 
 import asyncio
 import inspect
-from typing import TYPE_CHECKING, Any, Callable, Dict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
 
+from mi.framework.filters import FilterSet
 from mi.framework.models.chat import Chat
 from mi.framework.models.emoji import Emoji
-from mi.framework.models.note import Note, Reaction
+from mi.framework.models.notification import Notification
+from mi.framework.models.note import Note, NoteDeleted, NoteReacted, PollVoted, Reaction
 from mi.framework.models.user import FollowRequest, User
-from mi.utils import get_module_logger, str_lower, upper_to_lower
+from mi.framework.overload import OverloadController
+from mi.framework.resume import ResumeTracker
+from mi.framework.router import FrameRouter, NoteCaptureManager
+from mi.utils import get_module_logger, upper_to_lower
 from mi.wrapper.models.chat import RawChat
+from mi.wrapper.models.lazy import LazyRaw
 from mi.wrapper.models.note import RawNote, RawReaction
+from mi.wrapper.models.notification import RawNotification
 from mi.wrapper.models.user import RawUser
 
 if TYPE_CHECKING:
     from mi.framework.client import Client
     from mi.types import ChatPayload, NotePayload
 
+PARSER_EVENTS: Dict[str, Tuple[str, ...]] = {
+    'note': ('message',),
+    'reply': ('message',),
+    'mention': ('mention',),
+    'follow': ('user_follow',),
+    'followed': ('follow',),
+    'receiveFollowRequest': ('follow_request',),
+    'meUpdated': ('me_updated',),
+    'driveFileCreated': ('drive_file_created',),
+    'messagingMessage': ('message',),
+    'unreadMessagingMessage': ('message',),
+    'notification': ('notification', 'reaction', 'quote', 'poll_vote', 'poll_ended', 'follow_request_accepted',
+                     'group_invited', 'app_notification'),
+    'unreadNotification': ('unread_notification',),
+    'renote': ('renote',),
+    'unfollow': ('unfollow',),
+    'emojiAdded': ('emoji_add',),
+    'noteUpdated': ('note_reacted', 'note_unreacted', 'poll_voted', 'note_deleted'),
+}
+"""フレームのtypeと、そのパーサーが発火させる可能性のあるイベント名の対応"""
+
+NOTIFICATION_PARSERS: Tuple[str, ...] = (
+    'reaction', 'quote', 'pollVote', 'pollEnded', 'followRequestAccepted', 'groupInvited', 'app'
+)
+"""
+種類ごとのイベントを発火させる通知のtype。
+follow, mention, reply, renote, receiveFollowRequest はmainチャンネルに専用のフレームが届く為、
+重複しないように ``on_notification`` だけを発火させます
+"""
+
+
+def _to_wire_type(parser_name: str) -> str:
+    """parse_ を除いたパーサー名をWebSocketで使われるキャメルケースのtypeに変換します"""
+
+    head, *tail = parser_name.split('_')
+    return head + ''.join(i.capitalize() for i in tail)
+
 
 class ConnectionState:
-    def __init__(self, dispatch: Callable[..., Any], loop: asyncio.AbstractEventLoop, client: Client):
+    def __init__(self, dispatch: Callable[..., Any], loop: asyncio.AbstractEventLoop, client: Client, **options: Any):
         self.client: Client = client
         self.dispatch = dispatch
         self.logger = get_module_logger(__name__)
         self.loop: asyncio.AbstractEventLoop = loop
-        self.parsers = parsers = {}
-        for attr, func in inspect.getmembers(self):
-            if attr.startswith('parse'):
-                parsers[attr[6:].upper()] = func
+        self.channels: Dict[str, str] = {}  # チャンネルに接続した際のIDとチャンネル名
+        self.resume: Optional[ResumeTracker] = None
+        if options.get('resume'):
+            self.resume = ResumeTracker(self, max_notes=options.get('resume_max_notes', 100),
+                                        max_age=options.get('resume_max_age'))
+        self.captures: NoteCaptureManager = NoteCaptureManager(
+            lambda: client.ws.socket if client.ws is not None else None,
+            max_captures=options.get('max_captures', 1000)
+        )
+        self.auto_capture: bool = options.get('auto_capture', False)
+        self.filters: FilterSet = FilterSet()
+        self.overload: Optional[OverloadController] = None
+        if options.get('overload'):
+            self.overload = OverloadController(
+                lambda: client._lanes.get_lane('note').pending,
+                max_lag=options.get('overload_max_lag', 30),
+                max_queue=options.get('overload_max_queue', 1000),
+                sample_rate=options.get('overload_sample_rate', 10)
+            )
+        handlers = {_to_wire_type(attr[6:]): func for attr, func in inspect.getmembers(self)
+                    if attr.startswith('parse_')}
+        self.parsers: FrameRouter = FrameRouter(handlers)
+        self.channel_parsers: FrameRouter = FrameRouter(handlers)
+
+    def is_observed(self, frame_type: str) -> bool:
+        """
+        パーサーが発火させるイベントを受け取るリスナーが存在するかを返します
+
+        Parameters
+        ----------
+        frame_type : str
+            noteUpdated等のフレームのtype
+
+        Returns
+        -------
+        bool
+            リスナーが存在する、または対応するイベントが不明な場合はTrue
+        """
+
+        events = PARSER_EVENTS.get(frame_type)
+        if events is None:
+            return True
+        return any(self.client.is_listening(event) for event in events)
 
     def parse_emoji_added(self, message: Dict[str, Any]):
+        if not self.is_observed('emojiAdded'):
+            return
         self.dispatch('emoji_add', Emoji(message['body']['emoji']))
 
     def parse_channel(self, message: Dict[str, Any]) -> None:
@@ -42,20 +127,49 @@ class ConnectionState:
         message : Dict[str, Any]
             Received message
         """
-        base_msg = upper_to_lower(message['body'])
-        channel_type = str_lower(base_msg.get('type'))
-        self.logger.debug(f'ChannelType: {channel_type}')
-        self.logger.debug(f'recv event type: {channel_type}')
-        getattr(self, f'parse_{channel_type}')(base_msg['body'])
+        base_msg = message['body']
+        channel_type = base_msg.get('type')
+        if self.resume is not None and not self.resume.observe(base_msg.get('id'), channel_type, base_msg.get('body')):
+            return
+        if not self.is_observed(channel_type):
+            self.channel_parsers.skip(channel_type)
+            return
+        if channel_type == 'note':
+            if self.filters and not self.filters.accept(self.channels.get(base_msg.get('id')), base_msg.get('body')):
+                self.channel_parsers.skip(channel_type)
+                return
+            if self.overload is not None and not self.overload.admit(base_msg.get('body')):
+                self.channel_parsers.skip(channel_type)
+                return
+        self.logger.debug('recv event type: %s', channel_type)
+        self.channel_parsers.route(channel_type, base_msg.get('body'))
+
+    def frame_stats(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """
+        typeごとに受信したフレームの数を返します
+
+        Returns
+        -------
+        Dict[str, Dict[str, Dict[str, int]]]
+            ``frames`` にWebSocketのフレーム、 ``channel`` にチャンネルのフレームの統計
+        """
+
+        return {'frames': self.parsers.stats(), 'channel': self.channel_parsers.stats()}
+
+    def parse_renote(self, message: NotePayload):
+        """
+        自分のノートがRenoteされた際のイベントを解析する関数
+        """
 
-    def parse_renote(self, message: Dict[str, Any]):
-        pass
+        self.dispatch('renote', Note(LazyRaw(RawNote, message)))
 
     def parse_unfollow(self, message: Dict[str, Any]):
         """
         フォローを解除した際のイベントを解析する関数
         """
 
+        self.dispatch('unfollow', User(LazyRaw(RawUser, message)))
+
     def parse_signin(self, message: Dict[str, Any]):
         """
         ログインが発生した際のイベント
@@ -66,79 +180,91 @@ class ConnectionState:
         フォローリクエストを受け取った際のイベントを解析する関数
         """
 
-        self.dispatch('follow_request', FollowRequest(message))
+        self.dispatch('follow_request', FollowRequest(upper_to_lower(message)))
 
     def parse_me_updated(self, message: Dict[str, Any]):
-        self.dispatch('me_updated', User(RawUser(message)))
+        self.dispatch('me_updated', User(LazyRaw(RawUser, message)))
 
     def parse_read_all_announcements(self, message: Dict[str, Any]) -> None:
-        pass  # TODO: 実装
+        self.dispatch('read_all_announcements')
 
     def parse_reply(self, message: NotePayload) -> None:
         """
         リプライ
         """
-        self.dispatch('message', Note(RawNote(message)))
+        self.dispatch('message', Note(LazyRaw(RawNote, message)), lane_key='reply')
 
     def parse_follow(self, message: Dict[str, Any]) -> None:
         """
         ユーザーをフォローした際のイベントを解析する関数
         """
 
-        self.dispatch('user_follow', User(RawUser(message)))
+        self.dispatch('user_follow', User(LazyRaw(RawUser, message)))
 
     def parse_followed(self, message: Dict[str, Any]) -> None:
         """
         フォローイベントを解析する関数
         """
 
-        self.dispatch('follow', User(RawUser(message)))
+        self.dispatch('follow', User(LazyRaw(RawUser, message)))
 
     def parse_mention(self, message: Dict[str, Any]) -> None:
         """
         メンションイベントを解析する関数
         """
 
-        self.dispatch('mention', Note(RawNote(message)))
+        self.dispatch('mention', Note(LazyRaw(RawNote, message)))
 
     def parse_drive_file_created(self, message: Dict[str, Any]) -> None:
-        self.dispatch('drive_file_created', message)
+        self.dispatch('drive_file_created', upper_to_lower(message))
 
     def parse_read_all_unread_mentions(self, message: Dict[str, Any]) -> None:
-        pass  # TODO:実装
+        self.dispatch('read_all_unread_mentions')
 
     def parse_read_all_unread_specified_notes(self, message: Dict[str, Any]) -> None:
-        pass  # TODO:実装
+        self.dispatch('read_all_unread_specified_notes')
 
     def parse_read_all_channels(self, message: Dict[str, Any]) -> None:
-        pass  # TODO:実装
+        self.dispatch('read_all_channels')
 
     def parse_read_all_notifications(self, message: Dict[str, Any]) -> None:
-        pass  # TODO:実装
+        self.dispatch('read_all_notifications')
 
     def parse_url_upload_finished(self, message: Dict[str, Any]) -> None:
-        pass # TODO:実装
+        """
+        URLからのアップロードが完了した際のイベントを解析する関数
+        """
 
-    def parse_unread_mention(self, message: Dict[str, Any]) -> None:
-        pass
+        self.dispatch('url_upload_finished', message.get('marker'), upper_to_lower(message.get('file') or {}))
 
-    def parse_unread_specified_note(self, message: Dict[str, Any]) -> None:
-        pass
+    def parse_unread_mention(self, message: str) -> None:
+        """
+        未読のメンションが届いた際のイベントを解析する関数。bodyはノートのIDです
+        """
+
+        self.dispatch('unread_mention', message)
+
+    def parse_unread_specified_note(self, message: str) -> None:
+        """
+        未読のダイレクト投稿が届いた際のイベントを解析する関数。bodyはノートのIDです
+        """
+
+        self.dispatch('unread_specified_note', message)
 
     def parse_read_all_messaging_messages(self, message: Dict[str, Any]) -> None:
-        pass
+        self.dispatch('read_all_messaging_messages')
 
     def parse_messaging_message(self, message: ChatPayload) -> None:
         """
         チャットが来た際のデータを処理する関数
         """
-        self.dispatch('message', Chat(RawChat(message)))
+        self.dispatch('message', Chat(LazyRaw(RawChat, message)), lane_key='messaging_message')
 
     def parse_unread_messaging_message(self, message: Dict[str, Any]) -> None:
         """
         チャットが既読になっていない場合のデータを処理する関数
         """
-        self.dispatch('message', Chat(RawChat(message)))
+        self.dispatch('message', Chat(LazyRaw(RawChat, message)), lane_key='unread_messaging_message')
 
     def parse_notification(self, message: Dict[str, Any]) -> None:
         """
@@ -150,16 +276,52 @@ class ConnectionState:
             Received message
         """
 
-        accept_type = ['reaction']
-        notification_type = str_lower(message['type'])
-        if notification_type in accept_type:
-            getattr(self, f'parse_{notification_type}')(message)
+        self.dispatch('notification', Notification(LazyRaw(RawNotification, message)))
+        notification_type = message['type']
+        if notification_type in NOTIFICATION_PARSERS:
+            self.channel_parsers.handlers[notification_type](message)
 
     def parse_follow_request_accepted(self, message: Dict[str, Any]) -> None:
-        pass
+        """
+        送ったフォローリクエストが承認された際の通知を解析する関数
+        """
+
+        self.dispatch('follow_request_accepted', Notification(LazyRaw(RawNotification, message)))
 
     def parse_poll_vote(self, message: Dict[str, Any]) -> None:
-        pass  # TODO: 実装
+        """
+        自分のアンケートに投票された際の通知を解析する関数
+        """
+
+        self.dispatch('poll_vote', Notification(LazyRaw(RawNotification, message)))
+
+    def parse_poll_ended(self, message: Dict[str, Any]) -> None:
+        """
+        投票したアンケートが終了した際の通知を解析する関数
+        """
+
+        self.dispatch('poll_ended', Notification(LazyRaw(RawNotification, message)))
+
+    def parse_quote(self, message: Dict[str, Any]) -> None:
+        """
+        自分のノートが引用された際の通知を解析する関数
+        """
+
+        self.dispatch('quote', Notification(LazyRaw(RawNotification, message)))
+
+    def parse_group_invited(self, message: Dict[str, Any]) -> None:
+        """
+        グループに招待された際の通知を解析する関数
+        """
+
+        self.dispatch('group_invited', Notification(LazyRaw(RawNotification, message)))
+
+    def parse_app(self, message: Dict[str, Any]) -> None:
+        """
+        アプリケーションからの通知を解析する関数
+        """
+
+        self.dispatch('app_notification', Notification(LazyRaw(RawNotification, message)))
 
     def parse_unread_notification(self, message: Dict[str, Any]) -> None:
         """
@@ -170,19 +332,48 @@ class ConnectionState:
         message : Dict[str, Any]
             Received message
         """
-        # notification_type = str_lower(message['type'])
-        # getattr(self, f'parse_{notification_type}')(message)
+
+        self.dispatch('unread_notification', Notification(LazyRaw(RawNotification, message)))
 
     def parse_reaction(self, message: Dict[str, Any]) -> None:
         """
         リアクションに関する情報を解析する関数
         """
-        self.dispatch('reaction', Reaction(RawReaction(message)))
+        self.dispatch('reaction', Reaction(LazyRaw(RawReaction, message)))
 
     def parse_note(self, message: NotePayload) -> None:
         """
         ノートイベントを解析する関数
         """
-        note = Note(RawNote(message))
-        # Router(self.http.ws).capture_message(note.id) TODO: capture message
+        if not self.client.is_listening('message'):
+            return
+        note = Note(LazyRaw(RawNote, message))
+        if self.auto_capture:
+            self.captures.schedule_capture(message['id'], note)
         self.client._on_message(note)
+
+    def parse_note_updated(self, message: Dict[str, Any]) -> None:
+        """
+        キャプチャしているノートの更新を解析し、キャッシュしているノートを更新してイベントを発火させる関数
+        """
+
+        base_msg = message['body']
+        note_id, update_type, body = base_msg['id'], base_msg['type'], base_msg.get('body') or {}
+        note = self.captures.get_note(note_id)
+        # キャプチャしているノートは、リスナーが無くても最新の状態に保つ
+        if update_type in ('reacted', 'unreacted'):
+            if note is not None:
+                note._update_reaction(body['reaction'], 1 if update_type == 'reacted' else -1)
+            if self.client.is_listening(f'note_{update_type}'):
+                self.dispatch(f'note_{update_type}', NoteReacted(note_id, body, note))
+        elif update_type == 'pollVoted':
+            if note is not None:
+                note._update_poll(body['choice'])
+            if self.client.is_listening('poll_voted'):
+                self.dispatch('poll_voted', PollVoted(note_id, body, note))
+        elif update_type == 'deleted':
+            self.captures.schedule_release(note_id, force=True)
+            if self.client.is_listening('note_deleted'):
+                self.dispatch('note_deleted', NoteDeleted(note_id, body, note))
+        else:
+            self.logger.debug('unknown noteUpdated type: %s', update_type)
@@ -0,0 +1,267 @@
+"""HTTPClientの通信部分。aiohttpを使う物と、ソケットを使わずにメモリ上で完結する物"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from mi import exception
+from mi.abc.transport import AbstractSocket, AbstractTransport
+from mi.framework.gateway import MisskeyClientWebSocketResponse
+
+__all__ = ('AiohttpTransport', 'InMemoryTransport', 'InMemorySocket', 'Responses')
+
+Handler = Callable[[Dict[str, Any]], Union[Any, Awaitable[Any]]]
+
+
+async def json_or_text(response: aiohttp.ClientResponse):
+    text = await response.text(encoding='utf-8')
+    try:
+        if 'application/json' in response.headers['Content-Type']:
+            return json.loads(text)
+    except KeyError:
+        pass
+
+
+class AiohttpTransport(AbstractTransport):
+    """
+    aiohttp.ClientSessionを使って実際に通信します
+    """
+
+    def __init__(self):
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self) -> None:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(ws_response_class=MisskeyClientWebSocketResponse)
+
+    async def request(self, method: str, url: str, *, headers: Dict[str, str], **kwargs: Any) -> Tuple[int, Any]:
+        async with self.session.request(method, url, headers=headers, **kwargs) as res:
+            return res.status, await json_or_text(res)
+
+    async def ws_connect(self, url: str, *, headers: Dict[str, str], compress: int = 0) -> AbstractSocket:
+        kwargs = {
+            'autoclose': False,
+            'max_msg_size': 0,
+            'timeout': 30.0,
+            'headers': headers,
+            'compress': compress
+        }
+        try:
+            return await self.session.ws_connect(url, **kwargs)
+        except aiohttp.client_exceptions.ClientConnectorError:
+            raise exception.ClientConnectorError()
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+
+
+class InMemorySocket(AbstractSocket):
+    """
+    InMemoryTransportのws_connectが返すWebSocketの代わり
+
+    Attributes
+    ----------
+    sent : List[Any]
+        Botが送信したデータ
+    """
+
+    def __init__(self, url: str):
+        self.url: str = url
+        self.channels: Dict[str, str] = {}
+        self.sent: List[Any] = []
+        self.closed: bool = False
+        self._queue: asyncio.Queue[Any] = asyncio.Queue()
+
+    def push(self, frame: Union[Dict[str, Any], str]) -> None:
+        """
+        Botが受信するフレームを追加します
+
+        Parameters
+        ----------
+        frame : Union[Dict[str, Any], str]
+            フレーム、またはJSONの文字列
+        """
+
+        data = frame if isinstance(frame, str) else json.dumps(frame)
+        self._queue.put_nowait(aiohttp.WSMessage(aiohttp.WSMsgType.TEXT, data, None))
+
+    def push_channel(self, channel_name: str, frame_type: str, body: Any) -> int:
+        """
+        Botがチャンネルに接続している場合、そのチャンネルのフレームを追加します
+
+        Parameters
+        ----------
+        channel_name : str
+            main, globalTimeline等のチャンネル名
+        frame_type : str
+            note, mention等のフレームのtype
+        body : Any
+            フレームのbody
+
+        Returns
+        -------
+        int
+            追加したフレームの数
+        """
+
+        count = 0
+        for channel_id, name in list(self.channels.items()):
+            if name == channel_name:
+                self.push({'type': 'channel', 'body': {'id': channel_id, 'type': frame_type, 'body': body}})
+                count += 1
+        return count
+
+    async def receive(self, timeout: Optional[float] = None) -> Any:
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+    async def send_json(self, data: Any, **kwargs: Any) -> None:
+        self.sent.append(data)
+
+    async def close(self, **kwargs: Any) -> bool:
+        if not self.closed:
+            self.closed = True
+            self._queue.put_nowait(aiohttp.http.WS_CLOSED_MESSAGE)
+        return True
+
+
+class Responses:
+    """
+    InMemoryTransportに登録する、順に返すレスポンス。
+    先頭から順に返し、最後の物は繰り返し返します。渡したiterableは変更しません
+
+    Parameters
+    ----------
+    responses : Iterable[Any]
+        レスポンス。関数や ``(ステータスコード, レスポンス)`` のtupleも指定できます
+    """
+
+    def __init__(self, responses: Iterable[Any]):
+        self._responses: List[Any] = list(responses)
+
+    def next(self) -> Any:
+        """次のレスポンスを返します。空の場合はNone"""
+
+        if len(self._responses) > 1:
+            return self._responses.pop(0)
+        return self._responses[0] if self._responses else None
+
+
+class InMemoryTransport(AbstractTransport):
+    """
+    ソケットを使わず、登録したハンドラーや記録したレスポンスを返します。
+    テストやマイクロベンチマークで、ネットワークの影響を受けずにBotを動かす為に使います
+
+    Parameters
+    ----------
+    handlers : Optional[Dict[str, Any]], default=None
+        ``/api/i`` 等のパスと、レスポンス。詳細は ``route`` を参照してください
+
+    Attributes
+    ----------
+    requests : List[Tuple[str, str, Any]]
+        受け取ったリクエストのメソッド、パス、body
+    sockets : List[InMemorySocket]
+        ws_connectで作成したWebSocket
+    """
+
+    def __init__(self, handlers: Optional[Dict[str, Any]] = None):
+        self.handlers: Dict[str, Any] = {}
+        self.requests: List[Tuple[str, str, Any]] = []
+        self.sockets: List[InMemorySocket] = []
+        self._connected: Optional[asyncio.Event] = None
+        for path, handler in (handlers or {}).items():
+            self.route(path, handler)
+
+    @classmethod
+    def from_fixtures(cls, path: str) -> InMemoryTransport:
+        """
+        パスとレスポンスを記録したJSONファイルから作成します
+
+        Parameters
+        ----------
+        path : str
+            ``{"/api/i": {...}, "/api/notes/create": {"__responses__": [{...}, {...}]}}`` の形のJSONファイル。
+            ``__responses__`` のみを持つobjectは ``Responses`` として登録し、それ以外はそのまま返します
+
+        Returns
+        -------
+        InMemoryTransport
+        """
+
+        with open(path, encoding='utf-8') as f:
+            fixtures = json.load(f)
+        return cls({
+            path: Responses(fixture['__responses__'])
+            if isinstance(fixture, dict) and list(fixture) == ['__responses__'] else fixture
+            for path, fixture in fixtures.items()
+        })
+
+    def route(self, path: str, handler: Any) -> None:
+        """
+        パスに対するレスポンスを登録します
+
+        Parameters
+        ----------
+        path : str
+            ``/api/notes/create`` 等のパス
+        handler : Any
+            リクエストのbodyを受け取る関数(コルーチン関数も可)、固定のレスポンス、または ``Responses`` 。
+            listは一つのレスポンスとしてそのまま返します。
+            ``(ステータスコード, レスポンス)`` のtupleを返すとステータスコードを指定できます
+        """
+
+        self.handlers[path] = handler
+
+    @property
+    def socket(self) -> Optional[InMemorySocket]:
+        """最後に作成したWebSocket"""
+        return self.sockets[-1] if self.sockets else None
+
+    async def wait_connected(self, timeout: float = 10) -> InMemorySocket:
+        """WebSocketが作成されるまで待ちます"""
+
+        async def wait() -> None:
+            while self.socket is None or self.socket.closed:
+                self._connected = asyncio.Event()
+                await self._connected.wait()
+
+        await asyncio.wait_for(wait(), timeout)
+        return self.socket
+
+    async def start(self) -> None:
+        pass
+
+    async def request(self, method: str, url: str, *, headers: Dict[str, str], **kwargs: Any) -> Tuple[int, Any]:
+        path = urlsplit(url).path
+        body = kwargs.get('json', kwargs.get('data'))
+        self.requests.append((method, path, body))
+        if path not in self.handlers:
+            return 404, {'error': {'message': f'no handler for {path}'}}
+        result = self.handlers[path]
+        if isinstance(result, Responses):
+            result = result.next()
+        if callable(result):
+            result = result(body or {})
+            if inspect.isawaitable(result):
+                result = await result
+        if isinstance(result, tuple):
+            return result
+        return (204, None) if result is None else (200, result)
+
+    async def ws_connect(self, url: str, *, headers: Dict[str, str], compress: int = 0) -> AbstractSocket:
+        socket = InMemorySocket(url)
+        self.sockets.append(socket)
+        if self._connected is not None:
+            self._connected.set()
+        return socket
+
+    async def close(self) -> None:
+        for socket in self.sockets:
+            await socket.close()
@@ -0,0 +1,20 @@
+"""
+mi.testing
+
+ローカルでBotを動かし、ベンチマークやテストを行う為のMisskeyの代わり
+"""
+
+from .load import LoadGenerator, LoadReport
+from .payloads import make_id, make_note, make_notification, make_user
+from .server import ApiError, FakeMisskey
+
+__all__ = (
+    'FakeMisskey',
+    'ApiError',
+    'LoadGenerator',
+    'LoadReport',
+    'make_id',
+    'make_user',
+    'make_note',
+    'make_notification',
+)
@@ -0,0 +1,183 @@
+"""FakeMisskeyを使って、Botにノートやメンションを一定の頻度で送り、応答までの時間を計測する仕組み"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from mi.testing.payloads import make_note, make_notification, make_user
+from mi.testing.server import FakeMisskey
+
+__all__ = ('LoadGenerator', 'LoadReport')
+
+
+class LoadReport:
+    """
+    LoadGeneratorの結果
+
+    Attributes
+    ----------
+    duration : float
+        負荷をかけた時間(秒)
+    sent : Counter
+        種類ごとの送信したフレームの数
+    latencies : List[float]
+        メンション等を送信してから、Botが返信またはリアクションするまでの時間(秒)
+    """
+
+    def __init__(self, duration: float, sent: Counter, latencies: List[float]):
+        self.duration: float = duration
+        self.sent: Counter = sent
+        self.latencies: List[float] = latencies
+
+    @property
+    def throughput(self) -> float:
+        """一秒あたりの応答数"""
+        return len(self.latencies) / self.duration if self.duration else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """
+        応答時間のパーセンタイルを返します
+
+        Parameters
+        ----------
+        percent : float
+            0 から 100 までのパーセンタイル
+
+        Returns
+        -------
+        float
+            応答時間(秒)
+        """
+
+        if not self.latencies:
+            return 0.0
+        samples = sorted(self.latencies)
+        return samples[min(len(samples) - 1, int(len(samples) * percent / 100))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'duration': self.duration,
+            'sent': dict(self.sent),
+            'responses': len(self.latencies),
+            'throughput': self.throughput,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': max(self.latencies, default=0.0),
+        }
+
+
+class LoadGenerator:
+    """
+    タイムラインのノート、メンション、通知を指定した頻度で送信し、
+    Botがメンションに返信またはリアクションするまでの時間を計測します
+
+    Parameters
+    ----------
+    server : FakeMisskey
+    note_rate : float, default=50
+        一秒あたりに ``timeline`` に送信するノートの数
+    mention_rate : float, default=5
+        一秒あたりに ``main`` に送信するメンションの数
+    notification_rate : float, default=0
+        一秒あたりに ``main`` に送信するリアクションの通知の数
+    timeline : str, default='globalTimeline'
+        ノートを送信するチャンネル
+    """
+
+    def __init__(
+            self,
+            server: FakeMisskey,
+            *,
+            note_rate: float = 50,
+            mention_rate: float = 5,
+            notification_rate: float = 0,
+            timeline: str = 'globalTimeline'
+    ):
+        self.server: FakeMisskey = server
+        self.note_rate: float = note_rate
+        self.mention_rate: float = mention_rate
+        self.notification_rate: float = notification_rate
+        self.timeline: str = timeline
+        self._users: List[Dict[str, Any]] = [make_user() for _ in range(32)]
+        self._pending: Dict[str, float] = {}
+        self._latencies: List[float] = []
+        self._sent: Counter = Counter()
+        server.add_api_listener(self._on_api)
+
+    def _on_api(self, endpoint: str, body: Dict[str, Any]) -> None:
+        if endpoint == 'notes/create':
+            note_id = body.get('replyId')
+        elif endpoint == 'notes/reactions/create':
+            note_id = body.get('noteId')
+        else:
+            return
+        sent_at = self._pending.pop(note_id, None)
+        if sent_at is not None:
+            self._latencies.append(time.perf_counter() - sent_at)
+
+    def _user(self) -> Dict[str, Any]:
+        return self._users[sum(self._sent.values()) % len(self._users)]
+
+    async def _emit(self, kind: str) -> None:
+        if kind == 'note':
+            await self.server.publish(self.timeline, 'note', make_note('hello world', user=self._user()))
+        elif kind == 'mention':
+            note = make_note(f'@{self.server.user["username"]} ping', user=self._user())
+            self._pending[note['id']] = time.perf_counter()
+            await self.server.publish('main', 'mention', note)
+        elif kind == 'notification':
+            note = make_note('hello', user=self.server.user)
+            await self.server.publish('main', 'notification',
+                                      make_notification('reaction', user=self._user(), note=note, reaction='👍'))
+        self._sent[kind] += 1
+
+    async def _produce(self, kind: str, rate: float, deadline: float) -> None:
+        loop = asyncio.get_running_loop()
+        interval = 1 / rate
+        next_at = loop.time()
+        while next_at < deadline:
+            await self._emit(kind)
+            next_at += interval
+            # 遅れた場合は間隔を詰めて送信し、指定した頻度を保つ
+            delay = next_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    async def run(self, duration: float, *, drain: float = 2, wait_for: Optional[List[str]] = None) -> LoadReport:
+        """
+        負荷をかけ、結果を返します
+
+        Parameters
+        ----------
+        duration : float
+            負荷をかける時間(秒)
+        drain : float, default=2
+            送信を終えた後、応答を待つ時間(秒)
+        wait_for : Optional[List[str]], default=None
+            開始する前に、Botが接続するのを待つチャンネル。Noneの場合は ``main`` と ``timeline``
+
+        Returns
+        -------
+        LoadReport
+        """
+
+        channels = [channel for channel, rate in (('main', self.mention_rate + self.notification_rate),
+                                                  (self.timeline, self.note_rate)) if rate]
+        for channel in wait_for if wait_for is not None else channels:
+            await self.server.wait_for_channel(channel)
+
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        deadline = started_at + duration
+        producers = [self._produce(kind, rate, deadline) for kind, rate in (
+            ('note', self.note_rate), ('mention', self.mention_rate), ('notification', self.notification_rate)
+        ) if rate > 0]
+        await asyncio.gather(*producers)
+        drain_deadline = loop.time() + drain
+        while self._pending and loop.time() < drain_deadline:
+            await asyncio.sleep(0.01)
+        return LoadReport(loop.time() - started_at, self._sent, self._latencies)
@@ -0,0 +1,158 @@
+"""Misskeyが送信するのと同じ形(キャメルケース)のペイロードを作成する関数"""
+
+from __future__ import annotations
+
+import itertools
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+__all__ = ('make_id', 'make_user', 'make_note', 'make_notification')
+
+_counter = itertools.count()
+
+
+def make_id() -> str:
+    """作成順に辞書順で並ぶ、Misskeyのaidに似たIDを作成します"""
+
+    return f'{int(time.time() * 1000):011x}{next(_counter) % 0x100000:05x}'
+
+
+def _now() -> str:
+    return datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def make_user(
+        user_id: Optional[str] = None,
+        *,
+        username: Optional[str] = None,
+        host: Optional[str] = None,
+        is_bot: bool = False
+) -> Dict[str, Any]:
+    """
+    UserPayloadの形のユーザーを作成します
+
+    Parameters
+    ----------
+    user_id : Optional[str], default=None
+        ユーザーのID。Noneの場合は作成します
+    username : Optional[str], default=None
+        ユーザー名。Noneの場合はIDを元に作成します
+    host : Optional[str], default=None
+        リモートのユーザーの場合はホスト
+    is_bot : bool, default=False
+
+    Returns
+    -------
+    Dict[str, Any]
+    """
+
+    user_id = user_id or make_id()
+    return {
+        'id': user_id,
+        'name': None,
+        'username': username or f'user_{user_id[-6:]}',
+        'host': host,
+        'avatarUrl': f'https://example.com/avatar/{user_id}',
+        'avatarBlurhash': None,
+        'avatarColor': None,
+        'isAdmin': False,
+        'isBot': is_bot,
+        'isCat': False,
+        'emojis': [],
+        'onlineStatus': 'online',
+    }
+
+
+def make_note(
+        text: Optional[str] = 'hello',
+        *,
+        note_id: Optional[str] = None,
+        user: Optional[Dict[str, Any]] = None,
+        reply_id: Optional[str] = None,
+        renote_id: Optional[str] = None,
+        cw: Optional[str] = None,
+        visibility: str = 'public',
+        file_ids: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    NotePayloadの形のノートを作成します
+
+    Parameters
+    ----------
+    text : Optional[str], default='hello'
+    note_id : Optional[str], default=None
+        ノートのID。Noneの場合は作成します
+    user : Optional[Dict[str, Any]], default=None
+        投稿者。Noneの場合は make_user で作成します
+    reply_id : Optional[str], default=None
+    renote_id : Optional[str], default=None
+    cw : Optional[str], default=None
+    visibility : str, default='public'
+    file_ids : Optional[List[str]], default=None
+
+    Returns
+    -------
+    Dict[str, Any]
+    """
+
+    user = user or make_user()
+    return {
+        'id': note_id or make_id(),
+        'createdAt': _now(),
+        'userId': user['id'],
+        'user': user,
+        'text': text,
+        'cw': cw,
+        'visibility': visibility,
+        'renoteCount': 0,
+        'repliesCount': 0,
+        'reactions': {},
+        'reactionEmojis': [],
+        'emojis': [],
+        'fileIds': file_ids or [],
+        'files': [],
+        'replyId': reply_id,
+        'renoteId': renote_id,
+    }
+
+
+def make_notification(
+        notification_type: str,
+        *,
+        user: Optional[Dict[str, Any]] = None,
+        note: Optional[Dict[str, Any]] = None,
+        **extra: Any
+) -> Dict[str, Any]:
+    """
+    NotificationPayloadの形の通知を作成します
+
+    Parameters
+    ----------
+    notification_type : str
+        reaction, pollVote等の通知の種類
+    user : Optional[Dict[str, Any]], default=None
+        通知の元になったユーザー。Noneの場合は make_user で作成します
+    note : Optional[Dict[str, Any]], default=None
+        通知の対象のノート
+    **extra : Any
+        ``reaction`` や ``choice`` 等、通知の種類ごとの値
+
+    Returns
+    -------
+    Dict[str, Any]
+    """
+
+    user = user or make_user()
+    notification: Dict[str, Any] = {
+        'id': make_id(),
+        'createdAt': _now(),
+        'type': notification_type,
+        'isRead': False,
+        'userId': user['id'],
+        'user': user,
+        **extra,
+    }
+    if note is not None:
+        notification['note'] = note
+    return notification
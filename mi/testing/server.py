@@ -0,0 +1,303 @@
+"""aiohttpのテストサーバーを使った、ローカルで動作するMisskeyの代わり"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Union
+
+from aiohttp import WSMsgType, web
+from aiohttp.test_utils import TestServer
+
+from mi.testing.payloads import make_note, make_user
+
+__all__ = ('FakeMisskey', 'ApiError')
+
+ApiHandler = Callable[[Dict[str, Any]], Union[Any, Awaitable[Any]]]
+ApiListener = Callable[[str, Dict[str, Any]], None]
+
+
+class ApiError(Exception):
+    """ハンドラーからエラーのレスポンスを返す為の例外"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status: int = status
+        self.message: str = message
+
+
+class _StreamConnection:
+    __slots__ = ('ws', 'channels', 'captured')
+
+    def __init__(self, ws: web.WebSocketResponse):
+        self.ws: web.WebSocketResponse = ws
+        self.channels: Dict[str, str] = {}  # 接続IDとチャンネル名
+        self.captured: Set[str] = set()
+
+
+class FakeMisskey:
+    """
+    Botを実際に動かせる程度に、Misskeyのストリーミングと REST API を再現するサーバー
+
+    ``/streaming`` ではconnect, disconnect, subNote, unsubNoteを受け付け、 ``publish`` で
+    接続しているチャンネルにフレームを送信します。REST APIは ``/api/i`` , ``/api/notes/create`` ,
+    ``/api/notes/show`` , ``/api/notes/reactions/create`` 等に対応しており、 ``route`` で追加や上書きができます
+
+    Parameters
+    ----------
+    token : str, default='token'
+        受け付けるトークン
+    user : Optional[Dict[str, Any]], default=None
+        トークンに対応するユーザー。Noneの場合はBotのユーザーを作成します
+    host : str, default='127.0.0.1'
+    port : Optional[int], default=None
+        Noneの場合は空いているポートを使用します
+
+    Attributes
+    ----------
+    notes : Dict[str, Dict[str, Any]]
+        作成されたノート
+    requests : Counter
+        エンドポイントごとのリクエスト数
+    """
+
+    def __init__(self, *, token: str = 'token', user: Optional[Dict[str, Any]] = None, host: str = '127.0.0.1',
+                 port: Optional[int] = None):
+        self.token: str = token
+        self.user: Dict[str, Any] = user or make_user(username='bot', is_bot=True)
+        self.notes: Dict[str, Dict[str, Any]] = {}
+        self.requests: Counter = Counter()
+        self._reactions: Dict[str, str] = {}  # ユーザーが付けたリアクション
+        self.handlers: Dict[str, ApiHandler] = {
+            'i': lambda body: self.user,
+            'users/show': self._users_show,
+            'notes/create': self._notes_create,
+            'notes/show': self._notes_show,
+            'notes/delete': self._notes_delete,
+            'notes/reactions/create': self._reactions_create,
+            'notes/reactions/delete': self._reactions_delete,
+            'notifications/read': lambda body: None,
+            'notifications/mark-all-as-read': lambda body: None,
+        }
+        self._listeners: List[ApiListener] = []
+        self._connections: List[_StreamConnection] = []
+        self._subscribed: Optional[asyncio.Event] = None
+        app = web.Application()
+        app.router.add_get('/streaming', self._streaming)
+        app.router.add_post('/api/{endpoint:.+}', self._api)
+        self.server: TestServer = TestServer(app, host=host, port=port)
+
+    @property
+    def url(self) -> str:
+        """Client.startに渡すWebSocketのURL"""
+        return str(self.server.make_url('/streaming')).replace('http', 'ws', 1)
+
+    @property
+    def origin(self) -> str:
+        return str(self.server.make_url('')).rstrip('/')
+
+    async def start(self) -> FakeMisskey:
+        await self.server.start_server()
+        return self
+
+    async def close(self) -> None:
+        for connection in list(self._connections):
+            await connection.ws.close()
+        await self.server.close()
+
+    async def __aenter__(self) -> FakeMisskey:
+        return await self.start()
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    # REST API
+
+    def route(self, endpoint: str, handler: ApiHandler) -> None:
+        """
+        REST APIのハンドラーを追加、または上書きします
+
+        Parameters
+        ----------
+        endpoint : str
+            ``/api/`` を除いたエンドポイント。例: ``notes/create``
+        handler : Callable[[Dict[str, Any]], Any]
+            リクエストのbodyを受け取り、レスポンスを返す関数(コルーチン関数も可)。
+            Noneを返した場合は204を返します。 ``ApiError`` を送出するとエラーを返します
+        """
+
+        self.handlers[endpoint] = handler
+
+    def add_api_listener(self, listener: ApiListener) -> None:
+        """
+        REST APIへのリクエストを受け取る度に呼ばれる関数を追加します
+
+        Parameters
+        ----------
+        listener : Callable[[str, Dict[str, Any]], None]
+            エンドポイントとリクエストのbodyを受け取る関数
+        """
+
+        self._listeners.append(listener)
+
+    async def _api(self, request: web.Request) -> web.StreamResponse:
+        endpoint = request.match_info['endpoint']
+        body = await request.json() if request.can_read_body else {}
+        if body.get('i') != self.token:
+            return web.json_response({'error': {'message': 'Credential required.'}}, status=401)
+        self.requests[endpoint] += 1
+        for listener in self._listeners:
+            listener(endpoint, body)
+        handler = self.handlers.get(endpoint)
+        if handler is None:
+            return web.json_response({'error': {'message': f'No such endpoint: {endpoint}'}}, status=404)
+        try:
+            result = handler(body)
+            if inspect.isawaitable(result):
+                result = await result
+        except ApiError as e:
+            return web.json_response({'error': {'message': e.message}}, status=e.status)
+        if result is None:
+            return web.Response(status=204)
+        return web.json_response(result)
+
+    def _users_show(self, body: Dict[str, Any]) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        if 'userIds' in body:
+            return [self.user if user_id == self.user['id'] else make_user(user_id) for user_id in body['userIds']]
+        if body.get('userId') in (None, self.user['id']) and body.get('username') in (None, self.user['username']):
+            return self.user
+        return make_user(body.get('userId'), username=body.get('username'), host=body.get('host'))
+
+    def _notes_create(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        note = make_note(body.get('text'), user=self.user, reply_id=body.get('replyId'),
+                         renote_id=body.get('renoteId'), cw=body.get('cw'),
+                         visibility=body.get('visibility', 'public'), file_ids=body.get('fileIds'))
+        self.notes[note['id']] = note
+        return {'createdNote': note}
+
+    def _get_note(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        note = self.notes.get(body.get('noteId'))
+        if note is None:
+            raise ApiError(404, 'No such note.')
+        return note
+
+    def _notes_show(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        return self._get_note(body)
+
+    async def _notes_delete(self, body: Dict[str, Any]) -> None:
+        note = self.notes.pop(self._get_note(body)['id'])
+        await self.publish_note_updated(note['id'], 'deleted', {'deletedAt': note['createdAt']})
+
+    async def _reactions_create(self, body: Dict[str, Any]) -> None:
+        note_id, reaction = body.get('noteId'), body.get('reaction')
+        if note_id in self.notes:
+            reactions = self.notes[note_id]['reactions']
+            reactions[reaction] = reactions.get(reaction, 0) + 1
+        self._reactions[note_id] = reaction
+        await self.publish_note_updated(note_id, 'reacted', {'reaction': reaction, 'userId': self.user['id']})
+
+    async def _reactions_delete(self, body: Dict[str, Any]) -> None:
+        note_id = body.get('noteId')
+        reaction = self._reactions.pop(note_id, None)
+        if reaction is None:
+            raise ApiError(400, 'You have not reacted to this note.')
+        if note_id in self.notes:
+            reactions = self.notes[note_id]['reactions']
+            reactions[reaction] = reactions.get(reaction, 1) - 1
+            if reactions[reaction] <= 0:
+                del reactions[reaction]
+        await self.publish_note_updated(note_id, 'unreacted', {'reaction': reaction, 'userId': self.user['id']})
+
+    # ストリーミング
+
+    def subscribers(self, channel_name: str) -> int:
+        """チャンネルに接続している数を返します"""
+
+        return sum(channel_name in connection.channels.values() for connection in self._connections)
+
+    async def wait_for_channel(self, channel_name: str, *, timeout: float = 10) -> None:
+        """
+        いずれかのクライアントがチャンネルに接続するまで待ちます
+
+        Parameters
+        ----------
+        channel_name : str
+            main, globalTimeline等のチャンネル名
+        timeout : float, default=10
+        """
+
+        async def wait() -> None:
+            while not self.subscribers(channel_name):
+                self._subscribed = asyncio.Event()
+                await self._subscribed.wait()
+
+        await asyncio.wait_for(wait(), timeout)
+
+    async def _streaming(self, request: web.Request) -> web.WebSocketResponse:
+        if request.query.get('i') != self.token:
+            raise web.HTTPUnauthorized()
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        connection = _StreamConnection(ws)
+        self._connections.append(connection)
+        try:
+            async for msg in ws:
+                if msg.type is not WSMsgType.TEXT:
+                    continue
+                data = json.loads(msg.data)
+                body = data.get('body') or {}
+                if data.get('type') == 'connect':
+                    connection.channels[body['id']] = body['channel']
+                    if self._subscribed is not None:
+                        self._subscribed.set()
+                elif data.get('type') == 'disconnect':
+                    connection.channels.pop(body.get('id'), None)
+                elif data.get('type') in ('subNote', 's'):
+                    connection.captured.add(body.get('id'))
+                elif data.get('type') in ('unsubNote', 'un'):
+                    connection.captured.discard(body.get('id'))
+        finally:
+            self._connections.remove(connection)
+        return ws
+
+    async def publish(self, channel_name: str, frame_type: str, body: Any) -> int:
+        """
+        チャンネルに接続している全てのクライアントにフレームを送信します
+
+        Parameters
+        ----------
+        channel_name : str
+            main, globalTimeline等のチャンネル名
+        frame_type : str
+            note, mention, notification等のフレームのtype
+        body : Any
+            フレームのbody
+
+        Returns
+        -------
+        int
+            送信した数
+        """
+
+        count = 0
+        for connection in list(self._connections):
+            for channel_id, name in list(connection.channels.items()):
+                if name != channel_name:
+                    continue
+                frame = {'type': 'channel', 'body': {'id': channel_id, 'type': frame_type, 'body': body}}
+                await connection.ws.send_str(json.dumps(frame))
+                count += 1
+        return count
+
+    async def publish_note_updated(self, note_id: str, update_type: str, body: Dict[str, Any]) -> int:
+        """ノートをキャプチャしているクライアントにnoteUpdatedを送信します"""
+
+        frame = json.dumps({'type': 'noteUpdated', 'body': {'id': note_id, 'type': update_type, 'body': body}})
+        count = 0
+        for connection in list(self._connections):
+            if note_id in connection.captured:
+                await connection.ws.send_str(frame)
+                count += 1
+        return count
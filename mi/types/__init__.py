@@ -8,6 +8,7 @@ from .drive import FilePayload, FolderPayload, PropertiesPayload
 from .emoji import EmojiPayload
 from .instance import FeaturesPayload, InstancePayload, MetaPayload, OptionalInstance, OptionalMeta
 from .note import GeoPayload, NotePayload, OptionalReaction, PollPayload, ReactionPayload, RenotePayload
+from .notification import NotificationPayload
 from .reaction import NoteReactionPayload
 from .user import ChannelPayload, FieldContentPayload, OptionalUser, PinnedNotePayload, PinnedPagePayload, UserPayload
 
@@ -30,6 +31,7 @@ __all__ = (
     'PinnedNotePayload',
     'OptionalUser',
     'NoteReactionPayload',
+    'NotificationPayload',
     'EmojiPayload',
     'FeaturesPayload',
     'MetaPayload',
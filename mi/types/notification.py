@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, Optional, TypedDict
+
+if TYPE_CHECKING:
+    from mi.types import NotePayload, UserPayload
+
+__all__ = ('NotificationPayload',)
+
+
+class OptionalNotification(TypedDict, total=False):
+    user_id: Optional[str]
+    user: UserPayload
+    note: NotePayload
+    reaction: str
+    choice: int
+    invitation: Dict[str, Any]
+    body: str
+    header: Optional[str]
+    icon: Optional[str]
+
+
+class NotificationPayload(OptionalNotification):
+    id: str
+    created_at: str
+    type: str
+    is_read: bool
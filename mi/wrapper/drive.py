@@ -5,6 +5,7 @@ from typing import List, Optional
 from mi.exception import InvalidParameters
 from mi.framework.http import HTTPSession
 from mi.framework.models.drive import File, Folder
+from mi.framework.pagination import CursorPaginator
 from mi.framework.router import Route
 from mi.utils import remove_dict_empty
 from mi.wrapper.models.drive import RawFile, RawFolder
@@ -86,6 +87,38 @@ class FileManager:
         res = await HTTPSession.request(Route('POST', '/api/drive/files'), json=data, auth=True, lower=True)
         return [File(RawFile(i)) for i in res]
 
+    @staticmethod
+    def iter_files(
+            *,
+            limit: Optional[int] = None,
+            direction: str = 'older',
+            since_id: Optional[str] = None,
+            until_id: Optional[str] = None,
+            folder_id: Optional[str] = None,
+            file_type: Optional[str] = None
+    ) -> CursorPaginator[File]:
+        """
+        ファイルを、次のページを先読みしながら一件ずつ取得します
+
+        Parameters
+        ----------
+        limit : Optional[int], default=None
+            取得する上限。Noneの場合は全て取得します
+        direction : str, default='older'
+        since_id : Optional[str], default=None
+        until_id : Optional[str], default=None
+        folder_id : Optional[str], default=None
+        file_type : Optional[str], default=None
+
+        Returns
+        -------
+        CursorPaginator[File]
+        """
+
+        return CursorPaginator('/api/drive/files', {'folderId': folder_id, 'type': file_type},
+                               lambda i: File(RawFile(i)), limit=limit, direction=direction, since_id=since_id,
+                               until_id=until_id)
+
 
 class FolderManager:
     def __init__(self, folder_id: Optional[str] = None):
@@ -156,6 +189,28 @@ class FolderManager:
         res = await HTTPSession.request(Route('POST', '/api/drive/files'), json=data, auth=True, lower=True)
         return [File(RawFile(i)) for i in res]
 
+    def iter_files(self, *, limit: Optional[int] = None, direction: str = 'older', since_id: Optional[str] = None,
+                   until_id: Optional[str] = None, file_type: Optional[str] = None) -> CursorPaginator[File]:
+        """
+        フォルダーの中のファイルを、次のページを先読みしながら一件ずつ取得します
+
+        Parameters
+        ----------
+        limit : Optional[int], default=None
+            取得する上限。Noneの場合は全て取得します
+        direction : str, default='older'
+        since_id : Optional[str], default=None
+        until_id : Optional[str], default=None
+        file_type : Optional[str], default=None
+
+        Returns
+        -------
+        CursorPaginator[File]
+        """
+
+        return FileManager.iter_files(limit=limit, direction=direction, since_id=since_id, until_id=until_id,
+                                      folder_id=self.__folder_id, file_type=file_type)
+
 
 class DriveManager:
     def __init__(self):
@@ -186,3 +241,26 @@ class DriveManager:
         }
         data = await HTTPSession.request(Route('POST', '/api/drive/folders'), json=data, lower=True, auth=True)
         return [Folder(RawFolder(i)) for i in data]
+
+    def iter_folders(self, *, limit: Optional[int] = None, direction: str = 'older', since_id: Optional[str] = None,
+                     until_id: Optional[str] = None, folder_id: Optional[str] = None) -> CursorPaginator[Folder]:
+        """
+        フォルダーを、次のページを先読みしながら一件ずつ取得します
+
+        Parameters
+        ----------
+        limit : Optional[int], default=None
+            取得する上限。Noneの場合は全て取得します
+        direction : str, default='older'
+        since_id : Optional[str], default=None
+        until_id : Optional[str], default=None
+        folder_id : Optional[str], default=None
+            指定すると、そのフォルダーの中のフォルダーを取得します
+
+        Returns
+        -------
+        CursorPaginator[Folder]
+        """
+
+        return CursorPaginator('/api/drive/folders', {'folderId': folder_id}, lambda i: Folder(RawFolder(i)),
+                               limit=limit, direction=direction, since_id=since_id, until_id=until_id)
@@ -4,6 +4,7 @@ from .drive import *
 from .emoji import *
 from .instance import *
 from .note import *
+from .notification import *
 from .poll import *
 from .reaction import *
 from .user import *
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+
+from mi.utils import upper_to_lower
+
+__all__ = ('LazyRaw',)
+
+R = TypeVar('R')
+
+
+class LazyRaw(Generic[R]):
+    """
+    Rawモデルの生成を属性に初めてアクセスされるまで遅延させるラッパー
+
+    Parameters
+    ----------
+    factory : Callable[[Dict[str, Any]], R]
+        RawNote等のRawモデルのクラス
+    payload : Dict[str, Any]
+        WebSocketから受け取ったままのデータ
+    lower : bool, default=True
+        Rawモデルを生成する前にpayloadのkeyを ``upper_to_lower`` で変換するか
+    """
+
+    __slots__ = ('__factory', '__payload', '__lower', '__raw')
+
+    def __init__(self, factory: Callable[[Dict[str, Any]], R], payload: Dict[str, Any], *, lower: bool = True):
+        self.__factory: Callable[[Dict[str, Any]], R] = factory
+        self.__payload: Dict[str, Any] = payload
+        self.__lower: bool = lower
+        self.__raw: Optional[R] = None
+
+    @property
+    def payload(self) -> Dict[str, Any]:
+        """変換前のデータ"""
+        return self.__payload
+
+    @property
+    def is_loaded(self) -> bool:
+        """Rawモデルが既に生成されているか"""
+        return self.__raw is not None
+
+    def load(self) -> R:
+        """
+        Rawモデルを生成して返します。二回目以降は生成済みの物を返します
+
+        Returns
+        -------
+        R
+            生成したRawモデル
+        """
+
+        if self.__raw is None:
+            payload = upper_to_lower(self.__payload) if self.__lower else self.__payload
+            self.__raw = self.__factory(payload)
+        return self.__raw
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.load(), name)
+
+    def __repr__(self) -> str:
+        factory_name = getattr(self.__factory, '__name__', repr(self.__factory))
+        return f'<LazyRaw {factory_name} loaded={self.is_loaded}>'
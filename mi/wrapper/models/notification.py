@@ -0,0 +1,52 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from mi.types.notification import NotificationPayload
+from mi.wrapper.models.note import RawNote
+from mi.wrapper.models.user import RawUser
+
+__all__ = ('RawNotification',)
+
+
+class RawNotification:
+    """
+    Attributes
+    ----------
+    id : str
+    created_at : Optional[datetime]
+    type : str
+        follow, mention, reply, renote, quote, reaction, pollVote, pollEnded, receiveFollowRequest,
+        followRequestAccepted, groupInvited, app のいずれか
+    is_read : bool
+    user_id : Optional[str]
+    user : Optional[RawUser]
+    note : Optional[RawNote]
+    reaction : Optional[str]
+    choice : Optional[int]
+        pollVoteの場合は投票された項目の番号
+    invitation : Optional[Dict[str, Any]]
+        groupInvitedの場合は招待
+    body : Optional[str]
+        appの場合は通知の本文
+    header : Optional[str]
+    icon : Optional[str]
+    """
+
+    __slots__ = ('id', 'created_at', 'type', 'is_read', 'user_id', 'user', 'note', 'reaction', 'choice', 'invitation',
+                 'body', 'header', 'icon')
+
+    def __init__(self, data: NotificationPayload):
+        self.id: str = data['id']
+        self.created_at: Optional[datetime] = datetime.strptime(data['created_at'], '%Y-%m-%dT%H:%M:%S.%fZ') if data.get(
+            'created_at') else None
+        self.type: str = data['type']
+        self.is_read: bool = bool(data.get('is_read'))
+        self.user_id: Optional[str] = data.get('user_id')
+        self.user: Optional[RawUser] = RawUser(data['user']) if data.get('user') else None
+        self.note: Optional[RawNote] = RawNote(data['note']) if data.get('note') else None
+        self.reaction: Optional[str] = data.get('reaction')
+        self.choice: Optional[int] = data.get('choice')
+        self.invitation: Optional[Dict[str, Any]] = data.get('invitation')
+        self.body: Optional[str] = data.get('body')
+        self.header: Optional[str] = data.get('header')
+        self.icon: Optional[str] = data.get('icon')
@@ -45,6 +45,7 @@ packages = [
     'mi.wrapper.models',
     'mi.types',
     'mi.actions',
+    'mi.testing',
 ]
 
 setup(
@@ -0,0 +1,35 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+
+import pytest
+
+from mi import config
+from mi.framework.http import HTTPSession
+from mi.framework.transport import AiohttpTransport
+from mi.testing import FakeMisskey
+
+
+@pytest.fixture
+def run_with_fake():
+    """FakeMisskeyを起動し、AiohttpTransportで実際に通信した状態でコルーチン関数を実行します"""
+
+    transport, token, origin = HTTPSession.transport, HTTPSession.token, config.i.origin_uri
+
+    def run(func: Callable[[FakeMisskey], Awaitable[Any]]) -> Any:
+        async def main() -> Any:
+            async with FakeMisskey() as fake:
+                HTTPSession.set_transport(AiohttpTransport())
+                HTTPSession.token = fake.token
+                config.i.origin_uri = fake.origin
+                await HTTPSession.transport.start()
+                try:
+                    return await func(fake)
+                finally:
+                    await HTTPSession.transport.close()
+
+        return asyncio.run(main())
+
+    yield run
+    HTTPSession.set_transport(transport)
+    HTTPSession.token = token
+    config.i.origin_uri = origin
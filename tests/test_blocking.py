@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+from mi.ext import commands
+from mi.framework.blocking import HandlerProfiler
+
+
+def test_nested_handlers_are_not_counted_twice():
+    profiler = HandlerProfiler(True)
+
+    async def command():
+        time.sleep(0.05)
+
+    async def on_mention():
+        time.sleep(0.01)
+        await profiler.run(command)
+        await asyncio.sleep(0)
+
+    asyncio.run(profiler.run(on_mention))
+    stats = profiler.stats()
+    outer = stats[profiler.handler_name(on_mention)]
+    inner = stats[profiler.handler_name(command)]
+    assert inner['blocking'] >= 0.05
+    assert 0.01 <= outer['blocking'] < 0.04
+
+
+def test_handlers_are_not_measured_by_default():
+    async def main():
+        bot = commands.Bot()
+        await bot._profiler.run(asyncio.sleep, 0)
+        return bot.handler_stats()
+
+    assert asyncio.run(main()) == {}
+
+
+class Offloaded(commands.Cog):
+    @commands.mention_command(text='render', executor='thread')
+    @staticmethod
+    def render(ctx):
+        return 'rendered'
+
+
+def test_static_executor_command_is_callable():
+    command = Offloaded.__cog_commands__[0]
+    assert command.callback(None) == 'rendered'
+
+
+def test_close_shuts_down_executors():
+    async def main():
+        bot = commands.Bot()
+        executor = bot.executors.get('thread')
+        await bot.close()
+        return executor
+
+    assert asyncio.run(main())._shutdown
@@ -0,0 +1,29 @@
+import asyncio
+
+from mi.framework.router import NoteCaptureManager
+
+
+class _Socket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, data):
+        self.sent.append((data['type'], data['body']['id']))
+
+
+def test_scheduled_captures_are_bounded_and_sent_in_order():
+    async def main():
+        socket = _Socket()
+        captures = NoteCaptureManager(lambda: socket, max_captures=3)
+        for i in range(5):
+            captures.schedule_capture(f'n{i}')
+        captures.schedule_release('n3')
+        captures.schedule_release('n2', force=True)
+        assert captures.dropped == 2
+        while captures._worker is not None:
+            await asyncio.sleep(0)
+        return socket.sent, list(captures._refs)
+
+    sent, captured = asyncio.run(main())
+    assert sent == [('subNote', 'n4')]
+    assert captured == ['n4']
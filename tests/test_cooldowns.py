@@ -0,0 +1,26 @@
+from mi.ext.commands.cooldowns import Cooldown
+
+
+def test_bucket_refills_after_window():
+    cooldown = Cooldown(1, 10)
+    assert cooldown.update_rate_limit('a', now=0) is None
+    assert cooldown.update_rate_limit('a', now=5) == 5
+    assert cooldown.update_rate_limit('a', now=20) is None
+    assert cooldown.update_rate_limit('a', now=25) == 5
+    assert cooldown.update_rate_limit('a', now=100) is None
+
+
+def test_bucket_refills_behind_live_bucket():
+    cooldown = Cooldown(1, 10)
+    assert cooldown.update_rate_limit('a', now=0) is None
+    assert cooldown.update_rate_limit('b', now=5) is None
+    # bは期限内の為、aは先頭からの破棄では取り除かれない
+    assert cooldown.update_rate_limit('a', now=12) is None
+    assert cooldown.update_rate_limit('a', now=13) == 9
+
+
+def test_retry_after_is_positive_within_window():
+    cooldown = Cooldown(2, 10)
+    assert cooldown.update_rate_limit('a', now=0) is None
+    assert cooldown.update_rate_limit('a', now=1) is None
+    assert cooldown.update_rate_limit('a', now=3) == 7
@@ -0,0 +1,54 @@
+import json
+from datetime import datetime, timedelta
+
+from mi.framework.export import NoteExporter
+from mi.testing import make_note
+
+
+def _notes(count):
+    base = datetime(2024, 1, 1)
+    notes = []
+    for i in range(count):
+        note = make_note(f'n{i}')
+        note['createdAt'] = (base + timedelta(minutes=i)).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+        notes.append(note)
+    return notes
+
+
+def _route_notes(fake, notes):
+    def users_notes(body):
+        until = body.get('untilId')
+        selected = [note for note in notes if until is None or note['id'] < until]
+        return list(reversed(selected))[:body.get('limit', 10)]
+
+    fake.route('users/notes', users_notes)
+
+
+def test_export_over_aiohttp(run_with_fake, tmp_path):
+    notes = _notes(250)
+    path = str(tmp_path / 'notes.jsonl')
+
+    async def main(fake):
+        _route_notes(fake, notes)
+        return await NoteExporter('user', path, page_size=100).run()
+
+    stats = run_with_fake(main)
+    with open(path, encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f]
+    assert stats.notes == 250
+    assert sorted(line['id'] for line in lines) == sorted(note['id'] for note in notes)
+    # キーはsnake_caseに変換せず、受け取ったまま書き出す
+    assert 'createdAt' in lines[0]
+    assert not (tmp_path / 'notes.jsonl.checkpoint').exists()
+
+
+def test_export_without_windows(run_with_fake, tmp_path):
+    path = str(tmp_path / 'notes.jsonl')
+
+    async def main(fake):
+        _route_notes(fake, [])
+        return await NoteExporter('user', path, since_date=2000, until_date=1000, windows=2).run()
+
+    stats = run_with_fake(main)
+    assert stats.windows == 0
+    assert stats.notes == 0
@@ -0,0 +1,49 @@
+import asyncio
+import multiprocessing
+
+from mi.framework.client import Client
+from mi.framework.hub import FanoutHub, _WorkerHandle
+
+
+class _Process:
+    def join(self, timeout=None):
+        pass
+
+
+class _Socket:
+    def __init__(self):
+        self.sent = asyncio.Event()
+
+    async def send_json(self, data):
+        self.sent.set()
+        await asyncio.Event().wait()  # 送信が終わらないWebSocket
+
+
+class _Router:
+    def __init__(self):
+        self.web_socket = _Socket()
+
+
+def test_frame_stats_and_forward_tasks():
+    async def main():
+        hub = FanoutHub(Client, workers=1)
+        parent, child = multiprocessing.Pipe()
+        worker = _WorkerHandle(0, _Process(), parent)
+        hub._workers = [worker]
+        client = Client()
+        client._connection.parsers = hub
+        hub.route('channel', {'type': 'channel', 'body': {'id': '1', 'type': 'note', 'body': {'id': 'n'}}})
+        assert client.frame_stats()['frames']['counts'] == {'channel': 1}
+
+        hub._router = _Router()
+        child.send(('send', {'type': 'subNote', 'body': {'id': 'n'}}))
+        hub._on_worker_message(worker)
+        await asyncio.wait_for(hub._router.web_socket.sent.wait(), 5)
+        tasks = set(hub._tasks)
+        assert len(tasks) == 1
+        hub.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        assert all(task.cancelled() for task in tasks) and not hub._tasks
+        child.close()
+
+    asyncio.run(main())
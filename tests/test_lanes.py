@@ -0,0 +1,27 @@
+import asyncio
+
+from mi.framework.client import Client
+
+
+def test_close_stops_lanes_and_cancels_waiting_events():
+    async def main():
+        client = Client(lanes={'default': 1})
+        started = asyncio.Event()
+
+        async def handler():
+            started.set()
+            await asyncio.Event().wait()
+
+        running = client._lanes.schedule('custom', handler, 'custom', (), {})
+        waiting = client._lanes.schedule('custom', handler, 'custom', (), {})
+        await asyncio.wait_for(started.wait(), 5)
+        await client.close()
+        await asyncio.gather(running, waiting, return_exceptions=True)
+        await asyncio.sleep(0)
+        leftover = asyncio.all_tasks() - {asyncio.current_task()}
+        return running.done(), waiting.cancelled(), leftover, client.lane_stats()['default']
+
+    running, waiting, leftover, stats = asyncio.run(main())
+    assert running and waiting
+    assert not leftover
+    assert stats['pending'] == 0
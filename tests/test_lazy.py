@@ -0,0 +1,97 @@
+import asyncio
+import sys
+
+import pytest
+
+from mi.exception import ExtensionFailed
+from mi.ext import commands
+from mi.ext.commands.lazy import scan_extension
+
+SINGLE = '''
+from mi.ext import commands
+
+
+class Ping(commands.Cog):
+    @commands.mention_command(text='ping')
+    async def ping(self, ctx):
+        pass
+
+
+def setup(bot):
+    bot.add_cog(Ping())
+'''
+
+USES_SUBMODULE = '''
+from lazy_pkg.shared import Shared
+
+
+def setup(bot):
+    bot.add_cog(Shared())
+'''
+
+SHARED = '''
+from mi.ext import commands
+
+
+class Shared(commands.Cog):
+    @commands.mention_command(text='shared')
+    async def shared(self, ctx):
+        pass
+'''
+
+
+@pytest.fixture
+def extensions(tmp_path, monkeypatch):
+    package = tmp_path / 'lazy_pkg'
+    package.mkdir()
+    (package / '__init__.py').write_text('')
+    (package / 'single.py').write_text(SINGLE)
+    (package / 'uses_submodule.py').write_text(USES_SUBMODULE)
+    (package / 'shared.py').write_text(SHARED)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield package
+    for key in [key for key in sys.modules if key.split('.')[0] == 'lazy_pkg']:
+        del sys.modules[key]
+
+
+def test_scan_falls_back_when_commands_may_live_elsewhere(extensions):
+    manifest = scan_extension('lazy_pkg.single')
+    assert manifest is not None and manifest.commands == [('text', 'ping')]
+    assert scan_extension('lazy_pkg.uses_submodule') is None
+    assert scan_extension('lazy_pkg') is None
+
+
+def test_failed_lazy_load_keeps_placeholders(extensions):
+    broken = SINGLE.replace('bot.add_cog(Ping())', 'raise RuntimeError("broken")')
+    (extensions / 'broken.py').write_text(broken)
+
+    async def main():
+        bot = commands.Bot()
+        bot.load_extension('lazy_pkg.broken', lazy=True)
+        extension = bot._get_lazy_extension('lazy_pkg.broken')
+        assert extension is not None
+        with pytest.raises(ExtensionFailed):
+            extension.load('command ping')
+        assert bot._get_lazy_extension('lazy_pkg.broken') is extension
+        assert [cmd.key for cmd in bot.all_commands] == ['ping']
+
+        (extensions / 'broken.py').write_text(SINGLE)
+        sys.modules.pop('lazy_pkg.broken', None)
+        extension.load('command ping')
+        assert bot._get_lazy_extension('lazy_pkg.broken') is None
+        assert [cmd.func.callback.__module__ for cmd in bot.all_commands] == ['lazy_pkg.broken']
+
+    asyncio.run(main())
+
+
+def test_reload_imports_immediately(extensions):
+    async def main():
+        bot = commands.Bot(lazy_extensions=True)
+        bot.load_extension('lazy_pkg.single')
+        bot._get_lazy_extension('lazy_pkg.single').load('command ping')
+        bot.reload_extension('lazy_pkg.single')
+        assert bot._get_lazy_extension('lazy_pkg.single') is None
+        assert bot.extension_stats()['lazy_pkg.single']['loaded']
+        assert [cmd.func.callback.__module__ for cmd in bot.all_commands] == ['lazy_pkg.single']
+
+    asyncio.run(main())
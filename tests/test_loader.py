@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+from mi.exception import NotFoundError
+from mi.framework.loader import UserLoader
+
+
+def test_loads_are_batched(run_with_fake):
+    async def main(fake):
+        loader = UserLoader()
+        users = await asyncio.gather(*(loader.load(f'user{i}') for i in range(150)))
+        return [user.id for user in users], fake.requests['users/show']
+
+    ids, requests = run_with_fake(main)
+    assert ids == [f'user{i}' for i in range(150)]
+    assert requests == 2
+
+
+def test_missing_user_raises_not_found(run_with_fake):
+    async def main(fake):
+        fake.route('users/show', lambda body: [])
+        with pytest.raises(NotFoundError):
+            await UserLoader().load('missing')
+
+    run_with_fake(main)
+
+
+def test_unexpected_response_does_not_hang(run_with_fake):
+    async def main(fake):
+        fake.route('users/show', lambda body: {'id': 'user'})
+        loader = UserLoader()
+        results = await asyncio.wait_for(
+            asyncio.gather(loader.load('a'), loader.load('b'), return_exceptions=True), 2)
+        return results, loader._inflight
+
+    results, inflight = run_with_fake(main)
+    assert all(isinstance(result, TypeError) for result in results)
+    assert not inflight
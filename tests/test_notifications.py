@@ -0,0 +1,53 @@
+import asyncio
+
+from mi.framework.client import Client
+from mi.framework.notifications import NotificationReadBatcher
+from mi.testing import ApiError
+
+
+def test_ids_added_during_flush_are_sent(run_with_fake):
+    async def main(fake):
+        read = []
+
+        async def notifications_read(body):
+            await asyncio.sleep(0.2)
+            read.extend(body['notificationIds'])
+
+        fake.route('notifications/read', notifications_read)
+        batcher = NotificationReadBatcher(interval=0.05)
+        batcher.add('a')
+        await asyncio.sleep(0.1)  # 'a'の送信中
+        batcher.add('b')
+        await asyncio.sleep(0.6)
+        return read, batcher.pending
+
+    read, pending = run_with_fake(main)
+    assert read == ['a', 'b']
+    assert pending == 0
+
+
+def test_mark_all_failure_is_logged(run_with_fake):
+    async def main(fake):
+        def mark_all(body):
+            raise ApiError(500, 'boom')
+
+        fake.route('notifications/mark-all-as-read', mark_all)
+        batcher = NotificationReadBatcher(interval=0.01)
+        batcher.mark_all()
+        await asyncio.sleep(0.05)
+        return batcher._task
+
+    task = run_with_fake(main)
+    assert task.done() and task.exception() is None
+
+
+def test_client_close_flushes_reads(run_with_fake):
+    async def main(fake):
+        read = []
+        fake.route('notifications/read', lambda body: read.extend(body['notificationIds']))
+        client = Client(notification_read_interval=60)
+        client.read_notification('a')
+        await client.close()
+        return read
+
+    assert run_with_fake(main) == ['a']
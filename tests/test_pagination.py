@@ -0,0 +1,22 @@
+from mi.framework.pagination import CursorPaginator
+from mi.testing import make_note
+
+
+def test_newer_without_start_walks_every_page(run_with_fake):
+    notes = sorted((make_note(f'n{i}') for i in range(25)), key=lambda note: note['id'])
+
+    def drive_files(body):
+        # Misskeyと同じく、sinceIdが無い場合は新しい物から返す
+        since = body.get('sinceId')
+        if since is None:
+            return list(reversed(notes))[:body['limit']]
+        return [note for note in notes if note['id'] > since][:body['limit']]
+
+    async def main(fake):
+        fake.route('drive/files', drive_files)
+        paginator = CursorPaginator('/api/drive/files', {}, lambda i: i['id'], page_size=10, direction='newer')
+        return await paginator.flatten(), paginator.pages
+
+    ids, pages = run_with_fake(main)
+    assert ids == [note['id'] for note in notes]
+    assert pages == 3
@@ -0,0 +1,26 @@
+import json
+
+from mi.framework.recorder import FrameRecorder, iter_frames
+
+
+def test_frames_with_newlines_keep_one_record_per_line(tmp_path):
+    path = str(tmp_path / 'frames.jsonl')
+    frame = {'type': 'channel', 'body': {'id': '1', 'type': 'note', 'body': {'text': 'a\nb'}}}
+    recorder = FrameRecorder(path)
+    recorder.write(json.dumps(frame, indent=2), {'1': 'main'})
+    recorder.write(json.dumps(frame), {'1': 'main'})
+    assert recorder.flush(5)
+    recorder.close()
+
+    with open(path, encoding='utf-8') as f:
+        assert len(f.readlines()) == 3
+    records = list(iter_frames(path))
+    assert [kind for _, kind, _ in records] == ['channels', 'frame', 'frame']
+    assert records[0][2] == {'1': 'main'}
+    assert records[1][2] == frame and records[2][2] == frame
+
+
+def test_reads_frames_embedded_by_older_versions(tmp_path):
+    path = tmp_path / 'old.jsonl'
+    path.write_text('{"t":1.5,"f":{"type":"noteUpdated","body":{}}}\n')
+    assert list(iter_frames(str(path))) == [(1.5, 'frame', {'type': 'noteUpdated', 'body': {}})]
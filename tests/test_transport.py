@@ -0,0 +1,29 @@
+import asyncio
+import json
+
+from mi.framework.transport import InMemoryTransport, Responses
+
+
+def _request(transport, path):
+    return asyncio.run(transport.request('POST', f'https://example.com{path}', headers={}, json={}))
+
+
+def test_lists_are_returned_as_is():
+    timeline = [{'id': 'a'}, {'id': 'b'}]
+    transport = InMemoryTransport({'/api/notes/timeline': timeline})
+    assert _request(transport, '/api/notes/timeline') == (200, timeline)
+    assert _request(transport, '/api/notes/timeline') == (200, timeline)
+    assert timeline == [{'id': 'a'}, {'id': 'b'}]
+
+
+def test_responses_are_returned_in_order_without_touching_the_fixture(tmp_path):
+    created = [{'id': 'a'}, {'id': 'b'}]
+    transport = InMemoryTransport({'/api/notes/create': Responses(created)})
+    assert [_request(transport, '/api/notes/create')[1] for _ in range(3)] == [{'id': 'a'}, {'id': 'b'}, {'id': 'b'}]
+    assert created == [{'id': 'a'}, {'id': 'b'}]
+
+    path = tmp_path / 'fixtures.json'
+    path.write_text(json.dumps({'/api/notes/create': {'__responses__': created}, '/api/notes/timeline': created}))
+    transport = InMemoryTransport.from_fixtures(str(path))
+    assert [_request(transport, '/api/notes/create')[1] for _ in range(2)] == created
+    assert _request(transport, '/api/notes/timeline')[1] == created